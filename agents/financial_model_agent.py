@@ -10,6 +10,7 @@ from tools.calculator import run_calculation
 
 # Data fetching tools
 from tools.fa import get_beta
+from tools.executor import offload
 
 
 financial_model_agent = Agent(
@@ -47,7 +48,7 @@ financial_model_agent = Agent(
         list_available_models,
         get_model_details,
         run_calculation,
-        get_beta,
+        offload(get_beta),
         AgentTool(agent=market_news_analyzer),
     ]
 )
@@ -11,6 +11,8 @@ from tools.fa import (
     get_major_shareholders,
     get_insider_transactions,
 )
+from tools.executor import offload
+from tools.prefetch import get_fundamental_snapshot, prefetch_requested_ticker
 from tools.server_time import get_current_time_string
 from tools.calculator import run_calculation
 from tools.model_inspector import list_available_models, get_model_details
@@ -26,7 +28,8 @@ agent = Agent(
     instruction=(
 "You are a specialist in fundamental analysis and financial modeling. Your goal is to provide a comprehensive assessment of a company's financial health, valuation, and competitive position. Your analysis must include a dedicated 'Business Risk Analysis' section."
 "\n\n**First, call `get_current_time_string` to determine the current date.** Use this information to decide which years and quarters are most relevant for your analysis."
-"\n\n1. **Financial Health & Advanced Metrics:** You MUST call `get_advanced_financial_metrics` to perform a deeper diagnostic."
+"\n\n**Then, call `get_fundamental_snapshot` once.** It returns the company information, financial summary, advanced metrics, analyst recommendations and recent news together. Only call the individual tools (e.g., `get_income_statement`) for data the snapshot does not cover."
+"\n\n1. **Financial Health & Advanced Metrics:** Base a deeper diagnostic on the `advanced_metrics` entry of the snapshot. Only call `get_advanced_financial_metrics` if that entry holds an \"error\"."
 "\n   - **ROIC vs WACC:** You should aim to calculate the **WACC** (Weighted Average Cost of Capital) using the available models (e.g., call `run_calculation` with `WACC` model). Compare ROIC to WACC to judge if the company is creating value (ROIC > WACC) or destroying it."
 "\n   - **Free Cash Flow (FCF):** Prioritize FCF over Net Income as a measure of real profitability."
 "\n   - **Altman Z-Score:** Use this to flag potential bankruptcy or financial distress risk immediately."
@@ -41,19 +44,21 @@ agent = Agent(
     
     tools=[
         get_current_time_string,
-        get_company_info,
-        get_financial_summary,
-        get_advanced_financial_metrics,
-        get_analyst_recommendations,
-        get_income_statement,
-        get_balance_sheet,
-        get_cash_flow,
-        get_major_shareholders,
-        get_insider_transactions,
+        get_fundamental_snapshot,
+        offload(get_company_info),
+        offload(get_financial_summary),
+        offload(get_advanced_financial_metrics),
+        offload(get_analyst_recommendations),
+        offload(get_income_statement),
+        offload(get_balance_sheet),
+        offload(get_cash_flow),
+        offload(get_major_shareholders),
+        offload(get_insider_transactions),
         run_calculation,
         list_available_models,
         get_model_details,
         AgentTool(agent=MarketNewsAnalyzer),
         AgentTool(agent=StockNewsAnalyzer),
-    ]
+    ],
+    before_agent_callback=prefetch_requested_ticker,
 )
\ No newline at end of file
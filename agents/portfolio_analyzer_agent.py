@@ -1,9 +1,20 @@
+import os
+
 from google.adk.agents import Agent
 from google.adk.tools.agent_tool import AgentTool
 
 from agents.single_asset_analyzer_agent import agent as single_asset_analyzer_agent
 from tools.account import get_current_portfolio
-from tools.portfolio_math import get_portfolio_analysis
+from tools.portfolio_math import get_portfolio_analysis, get_portfolio_risk
+from tools.ta import get_risk_metrics_batch
+from tools.executor import offload
+from tools.portfolio_pipeline import HoldingsAnalyzer
+
+holdings_analyzer = HoldingsAnalyzer(
+    single_asset_analyzer_agent,
+    concurrency=int(os.environ.get("PORTFOLIO_ANALYSIS_CONCURRENCY", "4")),
+    timeout=float(os.environ.get("PORTFOLIO_ANALYSIS_TIMEOUT", "600")),
+)
 
 agent = Agent(
     name="PortfolioAnalyzer",
@@ -16,21 +27,29 @@ agent = Agent(
         "2. **Scientific Analysis:** **You MUST call `get_portfolio_analysis` using the retrieved tickers and market values.**"
         "\n   - **Concentration Risk (HHI):** If HHI > 2500, warn the user about excessive concentration. Suggest diversification if the portfolio is 'drifting' too much into a single asset."
         "\n   - **Correlation Matrix:** Identify 'Significant Pairs' with correlation > 0.7. Warn the user that these assets move together, increasing risk during market downturns."
+        "\n   - **Correlation Clusters:** For large portfolios the matrix is replaced by `correlation_clusters`, groups of holdings that move together with their combined weight. Discuss the heaviest clusters rather than listing pairs one by one."
         "\n   - **Weight Distribution:** Analyze if the current weights align with a healthy, diversified strategy."
+        "\n   - **Portfolio Risk:** Call `get_portfolio_risk` with the same holdings. Report the annual volatility, the 1-day 95% VaR and CVaR (historical and parametric, as a share and an amount), and the diversification ratio. "
+        "Use `risk_contributions` to name the holdings whose risk share is well above their weight; they are the first candidates to trim."
+        "\n   - **Per-Holding Risk:** Call `get_risk_metrics_batch` once with all stock tickers to compare Volatility, Beta, Sharpe and MDD across holdings."
         "\n"
-        "3. **Individual Asset Deep-Dive:** For each major stock asset, call the `single_asset_analyzer_agent` for a comprehensive diagnostic (Fundamental & Technical)."
+        "3. **Individual Asset Deep-Dive:** Call `analyze_holdings` **once** with the tickers of all major stock assets to get a comprehensive diagnostic (Fundamental & Technical) of each, run in parallel. "
+        "Only call `SingleAssetAnalyzer` directly to follow up on a single holding."
         "\n"
         "4. **Rebalancing Plan:** Synthesize the mathematical portfolio analysis with individual asset findings."
         "\n   - Recommend 'increase weight', 'decrease weight', or 'maintain weight' for each asset."
         "\n   - **Actionable Steps:** If recommending a buy, verify sufficient cash. If not, specify which asset to sell to fund it (e.g., 'Sell 5 shares of High-Correlation Asset A to buy Asset B')."
         "\n"
-        "5. **Justification:** Provide detailed reasons for each change, citing ROIC, Sharpe Ratio, or Correlation levels as evidence."
+        "5. **Justification:** Provide detailed reasons for each change, citing ROIC, Sharpe Ratio, Correlation levels, or risk contribution as evidence."
         "\n"
         "6. If the user asks for an explanation of a technical term (e.g., 'What is HHI?' or 'What is Correlation?'), provide a concise definition and explain its relevance to their specific portfolio."
     ),
     tools=[
         get_current_portfolio,
-        get_portfolio_analysis,
+        offload(get_portfolio_analysis),
+        offload(get_portfolio_risk),
+        offload(get_risk_metrics_batch, max_concurrency=4),
+        holdings_analyzer.analyze_holdings,
         AgentTool(agent=single_asset_analyzer_agent),
     ],
 )
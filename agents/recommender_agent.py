@@ -3,6 +3,7 @@ from google.adk.tools.agent_tool import AgentTool
 
 from agents.single_asset_analyzer_agent import agent as single_asset_analyzer_agent
 from tools.screener import run_screener_query, get_technical_indicator
+from tools.executor import offload
 import math
 
 agent = Agent(
@@ -24,8 +25,8 @@ agent = Agent(
         "6. If the user asks for an explanation of a technical term or concept you used in your analysis (e.g., 'What is a P/E ratio?') or a company-specific technology (e.g., 'What is CUDA?'), provide a concise definition and briefly explain how it influenced your analysis or recommendation."
     ),
     tools=[
-        run_screener_query,
-        get_technical_indicator,
+        offload(run_screener_query),
+        offload(get_technical_indicator),
         AgentTool(agent=single_asset_analyzer_agent),
     ],
 )
@@ -1,3 +1,5 @@
+import os
+
 from google.adk.agents import Agent
 from google.adk.tools.agent_tool import AgentTool
 
@@ -22,7 +24,27 @@ from agents.formatter_agent import agent as formatter_agent, formatter_agent_pub
 # Other tools
 from apis.notion import create_notion_page
 from tools.server_time import get_current_time_string
+from tools.executor import offload
+
 
+# Replies are compiled into Block Kit by apis/blockkit.py. Set USE_LLM_FORMATTER
+# to hand the final markdown to the FormatterAgent model instead.
+USE_LLM_FORMATTER = os.environ.get("USE_LLM_FORMATTER", "false").lower() in ("1", "true", "yes")
+
+if USE_LLM_FORMATTER:
+    FORMATTING_GOAL = ", and delegate the final formatting to a sub-agent"
+    OUTPUT_WORKFLOW = (
+        "Your final step is ALWAYS to delegate the content you've prepared (as a markdown string) to the `FormatterAgent`. "
+        "The `FormatterAgent` handles the final response. Your job is done after delegating.\n"
+    )
+    DELIVER_STEP = "**Delegate this {} to the `FormatterAgent`.** (Your job is done)."
+else:
+    FORMATTING_GOAL = " in markdown"
+    OUTPUT_WORKFLOW = (
+        "Your final response is ALWAYS the content you've prepared, as a markdown string. It is converted into Slack formatting automatically. "
+        "Use `#`/`##` headers, `-` bullet lists, `Key: value` lines and markdown tables where they help readability.\n"
+    )
+    DELIVER_STEP = "**Return this {} as your final response.** (Your job is done)."
 
 # Define the primary agent with a full toolset for use in DMs
 agent = Agent(
@@ -31,11 +53,10 @@ agent = Agent(
     description="A master financial agent that orchestrates tasks by delegating to a team of specialist agents.",
     instruction=(
         "You are a master financial agent, an orchestrator. Your primary goal is to follow established workflows, "
-        "generate content, and delegate the final formatting to a sub-agent. You must respond in the same language as the user's query.\n"
+        f"generate content{FORMATTING_GOAL}. You must respond in the same language as the user's query.\n"
         "\n"
         "**--- Core Output Workflow ---**\n"
-        "Your final step is ALWAYS to delegate the content you've prepared (as a markdown string) to the `FormatterAgent`. "
-        "The `FormatterAgent` handles the final response. Your job is done after delegating.\n"
+        f"{OUTPUT_WORKFLOW}"
         "**NEVER generate Slack Block Kit JSON yourself.**\n"
         "\n"
         "**--- Language Rules ---**\n"
@@ -49,7 +70,7 @@ agent = Agent(
         "- If the user asks for an analysis (e.g., '삼성전자 분석해줘'), your process is:\n"
         "  1. Delegate to the appropriate specialist agent (e.g., `SingleAssetAnalyzer`) to get a **full, detailed analysis report**.\n"
         "  2. Once you receive the detailed report, create a **concise summary (under 2500 characters) as a markdown string** in the user's language.\n"
-        "  3. **Delegate this markdown summary to the `FormatterAgent`.** (Your job is done).\n"
+        f"  3. {DELIVER_STEP.format('markdown summary')}\n"
         "  **Do NOT create a Notion page in this case.**\n"
         "\n"
         "**Path 2: Explicit Notion Report Request**\n"
@@ -57,7 +78,7 @@ agent = Agent(
         "  1. Delegate to the appropriate specialist agent to get the **full, detailed analysis report**.\n"
         "  2. Use the `create_notion_page` tool to publish the **entire detailed report** to Notion. The title and content must be in the user's language.\n"
         "  3. Create a **simple confirmation message as a markdown string**, including the link to the new Notion page, in the user's language.\n"
-        "  4. **Delegate this confirmation message to the `FormatterAgent`.** (Your job is done).\n"
+        f"  4. {DELIVER_STEP.format('confirmation message')}\n"
         "\n"
         "**--- General Rules ---**\n"
         "- **Time Context:** Before starting any analysis, you MUST call the `get_current_time_string` tool.\n"
@@ -66,9 +87,14 @@ agent = Agent(
         "**--- Routing Rules ---**\n"
         "- For a **portfolio analysis**, delegate to `PortfolioAnalyzer`.\n"
         "- For a **stock recommendation**, delegate to `Recommender`.\n"
-        "- For a **comprehensive analysis of a single stock**, delegate to `SingleAssetAnalyzer`.\n"
+        "- For a **comprehensive analysis of a single stock**, delegate to `SingleAssetAnalyzer` with the resolved ticker as the request (e.g., '005930.KS'). "
+        "Its reports are cached per market session; if the user explicitly asks for a fresh or updated analysis (e.g., '새로 분석해줘'), append `[refresh]` to the request.\n"
         "- For **calculations based on financial models (e.g., Cost of Equity, Implied Growth)**, delegate to `FinancialModelAgent`.\n"
-        "- For specific **fundamental, technical, stock news, or market news analysis**, delegate to the respective specialist agents."
+        "- For specific **fundamental, technical, stock news, or market news analysis**, delegate to the respective specialist agents.\n"
+        "\n"
+        "**--- Earlier Conversation ---**\n"
+        "Older messages of this thread may have been compacted into the digest below. Use it as context for follow-up questions.\n"
+        "{conversation_summary?}"
     ),
     tools=[
         # High-level workflow agents
@@ -89,10 +115,10 @@ agent = Agent(
         AgentTool(agent=ticker_lookup_agent),
         
         # Standalone tools
-        create_notion_page,
+        offload(create_notion_page),
         get_current_time_string,
     ],
-    sub_agents=[formatter_agent],
+    sub_agents=[formatter_agent] if USE_LLM_FORMATTER else [],
 )
 
 # --- Define the restricted agent based on the primary agent ---
@@ -120,5 +146,5 @@ restricted_agent = Agent(
     description=restricted_description,
     instruction=restricted_instruction,
     tools=restricted_tools,
-    sub_agents=[formatter_agent_public],
+    sub_agents=[formatter_agent_public] if USE_LLM_FORMATTER else [],
 )
\ No newline at end of file
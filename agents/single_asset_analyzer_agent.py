@@ -4,6 +4,8 @@ from google.adk.tools.agent_tool import AgentTool
 from agents.fundamental_analyzer import agent as fundamental_analyzer
 from agents.technical_analyzer import agent as technical_analyzer
 from agents.stock_news_analyzer import agent as stock_news_analyzer
+from tools.report_cache import serve_cached_report, store_report
+from tools.prefetch import prefetch_requested_ticker
 
 agent = Agent(
     name="SingleAssetAnalyzer",
@@ -14,7 +16,7 @@ agent = Agent(
         "Your input will be a stock symbol. "
         "You must delegate the analysis to `fundamental_analyzer`, `technical_analyzer`, and `stock_news_analyzer` to gather insights. "
         "Then, synthesize their findings into a single, well-structured final report in Korean for the given stock. "
-        "The report should have a clear summary, followed by the detailed analysis from each specialist.\n"
+        "The report must open with a summary of at most 1,000 characters (the verdict and its key reasons), followed by the detailed analysis from each specialist.\n"
         "If the user asks for an explanation of a technical term or concept you used in your analysis (e.g., 'What is a P/E ratio?') or a company-specific technology (e.g., 'What is CUDA?'), provide a concise definition and briefly explain how it influenced your analysis or recommendation."
     ),
     tools=[
@@ -22,4 +24,7 @@ agent = Agent(
         AgentTool(agent=technical_analyzer),
         AgentTool(agent=stock_news_analyzer),
     ],
+    # Reports are cached per ticker and market session; see tools/report_cache.py
+    before_agent_callback=[serve_cached_report, prefetch_requested_ticker],
+    after_agent_callback=store_report,
 )
@@ -1,6 +1,7 @@
 from google.adk.agents import Agent
 from google.adk.tools.load_web_page import load_web_page
 from tools.na import get_company_news
+from tools.executor import offload
 
 agent = Agent(
     name="StockNewsAnalyzer",
@@ -17,7 +18,7 @@ agent = Agent(
     ),
     
     tools=[
-        get_company_news,
+        offload(get_company_news),
         load_web_page,
     ],
 )
\ No newline at end of file
@@ -1,5 +1,6 @@
 from google.adk.agents import Agent
 from tools.ta import (
+    get_indicator_bundle,
     get_rsi,
     get_macd,
     get_moving_average,
@@ -9,6 +10,8 @@ from tools.ta import (
     get_ohlcv_dict,
     get_risk_metrics,
 )
+from tools.executor import offload
+from tools.prefetch import get_technical_snapshot, prefetch_requested_ticker
 
 agent = Agent(
     name="TechnicalAnalyzer",
@@ -18,30 +21,36 @@ agent = Agent(
     
     instruction=(
         "You are a specialist in technical analysis and quantitative risk management. Your goal is to synthesize momentum indicators and risk metrics to provide a holistic view of the stock's trend and safety.\n\n"
-        "1. **Analyze Risk Profile:** **You MUST call `get_risk_metrics` to quantify the risk before looking at trends.**"
+        "**First, call `get_technical_snapshot` once.** It returns the risk metrics and the default indicator bundle together, so you usually need no other data tools.\n\n"
+        "1. **Analyze Risk Profile:** **You MUST quantify the risk (from the snapshot, or `get_risk_metrics`) before looking at trends.**"
         "\n   - **Sharpe/Sortino Ratios:** Evaluate if the trend is worth the risk. High values suggest efficient returns relative to volatility/downside."
         "\n   - **Beta:** Explain the stock's sensitivity to the market (e.g., 'High beta means it will likely move more than the market')."
         "\n   - **MDD (Max Drawdown):** Set realistic stop-loss or downside expectations based on historical worst-case losses."
         "\n   - **Volatility:** Use annualized volatility to describe the 'bumpy ride' the investor should expect."
-        "\n\n2. **Analyze Trends and Momentum:** For each indicator (RSI, MACD, etc.), analyze its recent trend by looking at the sequence of values in the returned list. Is it rising, falling, or flat?\n"
-        "3. **Identify Key Signals:** Look for significant technical signals within the data, focusing on the most recent data points:\n"
+        "\n\n2. **Fetch Indicators in One Call:** The snapshot already holds the close price, RSI, MACD, Bollinger Bands, OBV, Stochastic and moving averages. "
+        "Only call `get_indicator_bundle` or the individual indicator tools (`get_rsi`, `get_macd`, etc.) if you need parameters that the snapshot did not cover."
+        "\n\n3. **Analyze Trends and Momentum:** For each indicator (RSI, MACD, etc.), analyze its recent trend by looking at the sequence of values in the returned list. Is it rising, falling, or flat?\n"
+        "4. **Identify Key Signals:** Look for significant technical signals within the data, focusing on the most recent data points:\n"
         "   - **MACD Crossovers:** Has the MACD line recently crossed above or below the signal line?\n"
         "   - **RSI Levels:** Is the most recent RSI value in an overbought (>70), oversold (<30), or neutral zone?\n"
         "   - **Price vs. Moving Average:** Is the stock price trading above or below its key moving averages?\n"
         "   - **Bollinger Bands:** Is the price near the upper ('BBU') or lower ('BBL') band? Check 'BBB' for volatility expansion.\n"
         "   - **Volume Confirmation:** Does the On-Balance Volume (OBV) trend confirm the price trend?\n"
-        "4. **Synthesize and Conclude:** Combine technical signals with risk metrics. State whether the overall picture appears bullish, bearish, or neutral, and **explicitly mention the Risk-Adjusted Return (Sharpe) to justify your stance.**\n"
-        "5. If the user asks for an explanation of a technical term or concept you used in your analysis (e.g., 'What is Sharpe Ratio?') or a company-specific technology (e.g., 'What is CUDA?'), provide a concise definition and briefly explain how it influenced your analysis or recommendation."
+        "5. **Synthesize and Conclude:** Combine technical signals with risk metrics. State whether the overall picture appears bullish, bearish, or neutral, and **explicitly mention the Risk-Adjusted Return (Sharpe) to justify your stance.**\n"
+        "6. If the user asks for an explanation of a technical term or concept you used in your analysis (e.g., 'What is Sharpe Ratio?') or a company-specific technology (e.g., 'What is CUDA?'), provide a concise definition and briefly explain how it influenced your analysis or recommendation."
     ),
     
     tools=[
-        get_rsi,
-        get_macd,
-        get_moving_average,
-        get_bbands,
-        get_obv,
-        get_stoch,
-        get_ohlcv_dict,
-        get_risk_metrics,
+        get_technical_snapshot,
+        offload(get_indicator_bundle),
+        offload(get_rsi),
+        offload(get_macd),
+        offload(get_moving_average),
+        offload(get_bbands),
+        offload(get_obv),
+        offload(get_stoch),
+        offload(get_ohlcv_dict),
+        offload(get_risk_metrics),
     ],
+    before_agent_callback=prefetch_requested_ticker,
 )
\ No newline at end of file
@@ -1,6 +1,8 @@
 from google.adk.agents import Agent
 from google.adk.tools import google_search
 
+from tools.prefetch import prefetch_resolved_ticker
+
 # from tools.lookup import fmp_symbol_search
 
 agent = Agent(
@@ -23,4 +25,6 @@ agent = Agent(
         # fmp_symbol_search,
         google_search,
     ],
+    # Data for the resolved ticker starts loading while the root agent delegates
+    after_agent_callback=prefetch_resolved_ticker,
 )
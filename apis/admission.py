@@ -0,0 +1,186 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger("jm.slack.admission")
+
+
+@dataclass(eq=False)
+class Ticket:
+    """A request waiting for, or holding, an agent run slot."""
+    user_id: str
+    channel_id: str
+    dedup_key: tuple
+    run: Callable[[], Awaitable]
+    on_start: Optional[Callable[[], Awaitable]] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class AdmissionController:
+    """
+    Limits how many agent runs execute at once.
+
+    - At most `max_concurrent` runs overall, `max_per_user` per user and
+      `max_per_channel` per channel.
+    - Waiting requests are queued per user and served round-robin across users,
+      so one user's burst cannot starve the others.
+    - A request identical to one already queued or running (same dedup key) is dropped.
+    - When `max_queue` requests are already waiting, new ones are rejected.
+
+    All methods must be called from the event loop serving Slack.
+    """
+
+    def __init__(self, max_concurrent: int = 4, max_per_user: int = 1, max_per_channel: int = 2, max_queue: int = 50):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.max_per_channel = max_per_channel
+        self.max_queue = max_queue
+        self._queues: OrderedDict[str, deque[Ticket]] = OrderedDict()
+        self._running_by_user: dict[str, int] = {}
+        self._running_by_channel: dict[str, int] = {}
+        self._running = 0
+        self._keys: set[tuple] = set()
+        self._tasks: set[asyncio.Task] = set()
+        self._stats = {"admitted": 0, "waited": 0, "duplicates": 0, "rejected": 0, "completed": 0, "failed": 0}
+        self._waits = deque(maxlen=1000)
+
+    @property
+    def queued(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def _order(self) -> list[Ticket]:
+        """Queued tickets in the round-robin order they would be served in."""
+        queues = [list(q) for q in self._queues.values()]
+        order = []
+        for i in range(max((len(q) for q in queues), default=0)):
+            order.extend(q[i] for q in queues if i < len(q))
+        return order
+
+    def _can_start(self, ticket: Ticket) -> bool:
+        return (
+            self._running < self.max_concurrent
+            and self._running_by_user.get(ticket.user_id, 0) < self.max_per_user
+            and self._running_by_channel.get(ticket.channel_id, 0) < self.max_per_channel
+        )
+
+    def submit(
+        self,
+        user_id: str,
+        channel_id: str,
+        dedup_key: tuple,
+        run: Callable[[], Awaitable],
+        on_start: Optional[Callable[[], Awaitable]] = None,
+    ) -> tuple[str, int]:
+        """
+        Starts `run()` now or queues it until a slot frees up.
+
+        Args:
+            dedup_key (tuple): Identifies the request, e.g. (session_id, query).
+            run (Callable): Creates the coroutine of the agent run.
+            on_start (Callable, optional): Awaited right before a queued request starts.
+
+        Returns:
+            tuple[str, int]: The outcome ("started", "queued", "duplicate" or "rejected")
+                             and, when queued, the 1-based position in the queue.
+        """
+        if dedup_key in self._keys:
+            self._stats["duplicates"] += 1
+            logger.info(f"Dropping duplicate request {dedup_key[0]} from {user_id}")
+            return "duplicate", 0
+
+        ticket = Ticket(user_id=user_id, channel_id=channel_id, dedup_key=dedup_key, run=run, on_start=on_start)
+        if self._can_start(ticket) and self.queued == 0:
+            self._keys.add(dedup_key)
+            self._start(ticket)
+            return "started", 0
+        if self.queued >= self.max_queue:
+            self._stats["rejected"] += 1
+            logger.warning(f"Admission queue full ({self.max_queue}); rejecting request from {user_id}")
+            return "rejected", 0
+
+        self._keys.add(dedup_key)
+        self._queues.setdefault(user_id, deque()).append(ticket)
+        self._dispatch()
+        order = self._order()
+        if ticket not in order:
+            return "started", 0
+        self._stats["waited"] += 1
+        position = order.index(ticket) + 1
+        logger.info(f"Queued request from {user_id} at position {position}")
+        return "queued", position
+
+    def _start(self, ticket: Ticket):
+        self._running += 1
+        self._running_by_user[ticket.user_id] = self._running_by_user.get(ticket.user_id, 0) + 1
+        self._running_by_channel[ticket.channel_id] = self._running_by_channel.get(ticket.channel_id, 0) + 1
+        self._stats["admitted"] += 1
+        self._waits.append(time.monotonic() - ticket.enqueued_at)
+        task = asyncio.create_task(self._run(ticket))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _dispatch(self):
+        """Starts queued tickets, visiting users round-robin, while slots are free."""
+        progressed = True
+        while progressed and self._running < self.max_concurrent:
+            progressed = False
+            for user_id in list(self._queues):
+                queue = self._queues[user_id]
+                if not self._can_start(queue[0]):
+                    continue
+                ticket = queue.popleft()
+                # The user goes to the back of the rotation after being served
+                del self._queues[user_id]
+                if queue:
+                    self._queues[user_id] = queue
+                self._start(ticket)
+                progressed = True
+                break
+
+    async def _run(self, ticket: Ticket):
+        try:
+            if ticket.on_start is not None:
+                try:
+                    await ticket.on_start()
+                except Exception as e:
+                    logger.warning(f"on_start callback failed: {e}")
+            await ticket.run()
+            self._stats["completed"] += 1
+        except Exception as e:
+            self._stats["failed"] += 1
+            logger.error(f"Agent run from {ticket.user_id} failed: {e}")
+        finally:
+            self._running -= 1
+            self._running_by_user[ticket.user_id] -= 1
+            self._running_by_channel[ticket.channel_id] -= 1
+            if not self._running_by_user[ticket.user_id]:
+                del self._running_by_user[ticket.user_id]
+            if not self._running_by_channel[ticket.channel_id]:
+                del self._running_by_channel[ticket.channel_id]
+            self._keys.discard(ticket.dedup_key)
+            self._dispatch()
+
+    def metrics(self) -> dict:
+        """Returns running and queued counts, counters and queue wait statistics."""
+        waits = sorted(self._waits)
+        return {
+            "running": self._running,
+            "queued": self.queued,
+            "queued_users": len(self._queues),
+            **self._stats,
+            "wait_avg": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "wait_p95": round(waits[int(0.95 * (len(waits) - 1))], 3) if waits else 0.0,
+        }
+
+
+# Global controller for the Slack app
+admission_controller = AdmissionController(
+    max_concurrent=int(os.environ.get("ADMISSION_MAX_CONCURRENT", "4")),
+    max_per_user=int(os.environ.get("ADMISSION_MAX_PER_USER", "1")),
+    max_per_channel=int(os.environ.get("ADMISSION_MAX_PER_CHANNEL", "2")),
+    max_queue=int(os.environ.get("ADMISSION_MAX_QUEUE", "50")),
+)
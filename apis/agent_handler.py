@@ -1,12 +1,19 @@
 import os
 import logging
+from typing import Awaitable, Callable, Optional
 
 from google.adk.sessions import InMemorySessionService, DatabaseSessionService
 from google.genai import types # For creating message Content/Parts
 from google.adk.runners import Runner
+from google.adk.events import Event
 
 from agents.root_agent import agent as root_agent
 from agents.root_agent import restricted_agent as root_restricted_agent
+from agents.formatter_agent import agent as formatter_agent, formatter_agent_public
+from apis.progress import ProgressPlugin
+from apis.tracing import TracingPlugin, trace_request
+from apis.session_lifecycle import session_lifecycle
+from apis.session_resolver import SessionResolver, WriteBehindSessionService
 
 
 logger = logging.getLogger("jm.agent.handler")
@@ -14,49 +21,73 @@ APP_NAME = "JellyMonster"
 
 
 def get_session_service():
-    db_path = "db/agent_sessions.db"
+    db_path = session_lifecycle.db_path
     # Ensure the directory exists
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
     logger.info(f"Initializing database session service with '{db_path}'")
-    return DatabaseSessionService(db_url=f"sqlite+aiosqlite:///{db_path}")
-    
+    service = DatabaseSessionService(db_url=f"sqlite+aiosqlite:///{db_path}")
+    if os.environ.get("SESSION_WRITE_BEHIND", "false").lower() in ("1", "true", "yes"):
+        logger.info("Session events are written behind")
+        service = WriteBehindSessionService(service, max_sessions=int(os.environ.get("SESSION_CACHE_SIZE", "256")))
+    return service
 
-def get_runner(session_service):
-    return Runner(agent=root_agent, app_name=APP_NAME, session_service=session_service)
+def get_session_resolver(session_service):
+    # Trust a known session for less time than it takes to expire
+    max_age = min(86400, session_lifecycle.ttl // 2)
+    return SessionResolver(session_service, APP_NAME, max_age=max_age)
 
-def get_restricted_runner(session_service):
-    return Runner(agent=root_restricted_agent, app_name=APP_NAME, session_service=session_service)
 
+def get_plugins():
+    # Top-level agents are reported by the event stream itself
+    ignored = (root_agent.name, root_restricted_agent.name, formatter_agent.name, formatter_agent_public.name)
+    return [ProgressPlugin(ignored_agents=ignored), TracingPlugin()]
 
-async def call_agent_async(query: str, session_service, runner, user_id, session_id, is_dm: bool):
-    """Sends a query to the agent and prints the final response."""
+def get_runner(session_service):
+    return Runner(agent=root_agent, app_name=APP_NAME, session_service=session_service, plugins=get_plugins())
+
+def get_restricted_runner(session_service):
+    return Runner(agent=root_restricted_agent, app_name=APP_NAME, session_service=session_service, plugins=get_plugins())
+
+
+async def call_agent_async(
+    query: str,
+    session_resolver: SessionResolver,
+    runner,
+    user_id,
+    session_id,
+    is_dm: bool,
+    on_event: Optional[Callable[[Event], Awaitable[None]]] = None,
+):
+    """
+    Sends a query to the agent and returns the final response.
+    `on_event`, if given, is awaited with every event of the run as it arrives.
+    """
     logger.info(f"User Query: {query}")
 
     session_state = {"user_id": user_id} if is_dm else {}
 
-    # 에이전트 세션 생성
-    try: 
-        await session_service.create_session(
-            app_name=APP_NAME,
-            user_id=user_id,
-            session_id=session_id,
-            state=session_state # Add user_id to the session state
-        )
-        logger.debug(f"{session_id=} created with {session_state=}")
-    except:
-        logger.debug(f"{session_id=} loaded")
-
-    # Prepare the user's message in ADK format
-    content = types.Content(role='user', parts=[types.Part(text=query)])
-
-    final_response_text = "Agent did not produce a final response." # Default
-
-    async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=content):
-        if event.is_final_response():
-            if event.content and event.content.parts:
-                final_response_text = event.content.parts[0].text
-            elif event.actions and event.actions.escalate:
-                final_response_text = f"Agent escalated: {event.error_message or 'No specific message.'}"
-            break
+    # Traces the whole run; summarize with `python -m apis.tracing`
+    with trace_request("agent_run", runner=runner.agent.name, session_id=session_id, query_chars=len(query)):
+        # 에이전트 세션 확인 (없으면 생성)
+        await session_resolver.ensure(user_id, session_id, state=session_state) # Add user_id to the session state
+
+        # Prepare the user's message in ADK format
+        content = types.Content(role='user', parts=[types.Part(text=query)])
+
+        final_response_text = "Agent did not produce a final response." # Default
+
+        async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=content):
+            if on_event is not None:
+                try:
+                    await on_event(event)
+                except Exception as e:
+                    logger.warning(f"Event listener failed: {e}")
+            if event.is_final_response():
+                if event.content and event.content.parts:
+                    final_response_text = event.content.parts[0].text
+                elif event.actions and event.actions.escalate:
+                    final_response_text = f"Agent escalated: {event.error_message or 'No specific message.'}"
+                break
 
     logger.info(f"Agent Response: {final_response_text[:40]} (upto 40 characters)")
     return final_response_text
@@ -0,0 +1,200 @@
+"""
+Deterministic Markdown -> Slack Block Kit compiler.
+
+Turns the markdown the agents write into Block Kit without a model round trip:
+headers, paragraphs, bullet and numbered lists, "Key: value" lines and tables
+(as section fields), dividers, block quotes and code blocks. Slack limits
+(3000 characters per section, 2000 per field, 10 fields per section, 150 per
+header, 50 blocks per message) are enforced.
+"""
+import re
+
+MAX_SECTION_CHARS = 3000
+MAX_FIELD_CHARS = 2000
+MAX_FIELDS = 10
+MAX_HEADER_CHARS = 150
+MAX_BLOCKS = 50
+
+HEADER_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+DIVIDER_RE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+BULLET_RE = re.compile(r"^(\s*)[-*+]\s+(.*)$")
+NUMBERED_RE = re.compile(r"^(\s*)(\d+)[.)]\s+(.*)$")
+TABLE_RE = re.compile(r"^\s*\|.*\|\s*$")
+TABLE_SEPARATOR_RE = re.compile(r"^\s*\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?\s*$")
+KEY_VALUE_RE = re.compile(r"^\s*(?:[-*+]\s+)?\*{0,2}([^:*|]{1,40}?)\*{0,2}\s*:\s*\*{0,2}(.+?)\*{0,2}\s*$")
+FENCE_RE = re.compile(r"^\s*```")
+
+# Inline markdown -> Slack mrkdwn, applied outside of inline code spans
+INLINE_RULES = [
+    (re.compile(r"\[([^\]]+)\]\((https?://[^)\s]+)\)"), r"<\2|\1>"),
+    (re.compile(r"\*\*\*(.+?)\*\*\*"), "\x00_\\1_\x00"),
+    # Italics only between word boundaries, so "2*3*4" keeps its asterisks
+    (re.compile(r"(?<![\w*])\*(?![\s*])(.+?)(?<![\s*])\*(?![\w*])"), r"_\1_"),
+    (re.compile(r"\*\*(.+?)\*\*"), "\x00\\1\x00"),
+    (re.compile(r"__(.+?)__"), "\x00\\1\x00"),
+    (re.compile(r"~~(.+?)~~"), r"~\1~"),
+]
+
+
+def to_mrkdwn(text: str) -> str:
+    """Converts inline markdown (bold, italics, strikethrough, links) to Slack mrkdwn."""
+    parts = re.split(r"(`[^`]*`)", text)
+    for i, part in enumerate(parts):
+        if i % 2:
+            continue
+        for pattern, replacement in INLINE_RULES:
+            part = pattern.sub(replacement, part)
+        parts[i] = part.replace("\x00", "*")
+    return "".join(parts)
+
+
+def _plain(text: str) -> str:
+    """Strips inline markdown, for plain_text fields such as headers."""
+    text = re.sub(r"\[([^\]]+)\]\([^)]+\)", r"\1", text)
+    return re.sub(r"(\*\*|__|~~|`|\*)", "", text).strip()
+
+
+def _split_text(text: str, limit: int) -> list[str]:
+    """Splits text at line (or, failing that, word) boundaries into chunks of at most `limit` characters."""
+    chunks, current = [], ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            cut = line.rfind(" ", 0, limit)
+            cut = cut if cut > limit // 2 else limit
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:cut])
+            line = line[cut:].lstrip()
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit:
+            chunks.append(current)
+            current = line
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _section(text: str) -> list[dict]:
+    return [
+        {"type": "section", "text": {"type": "mrkdwn", "text": chunk}}
+        for chunk in _split_text(text, MAX_SECTION_CHARS) if chunk.strip()
+    ]
+
+
+def _fields(fields: list[str]) -> list[dict]:
+    fields = [field[:MAX_FIELD_CHARS] for field in fields if field.strip()]
+    return [
+        {"type": "section", "fields": [{"type": "mrkdwn", "text": field} for field in fields[i:i + MAX_FIELDS]]}
+        for i in range(0, len(fields), MAX_FIELDS)
+    ]
+
+
+def _table_fields(rows: list[str]) -> list[dict]:
+    cells = [[to_mrkdwn(cell.strip()) for cell in row.strip().strip("|").split("|")] for row in rows]
+    header, body = cells[0], cells[1:]
+    if not body:
+        return _section(" | ".join(header))
+    fields = []
+    for row in body:
+        if len(row) == 2:
+            fields.append(f"*{_plain(row[0])}*\n{row[1]}")
+        else:
+            details = "\n".join(
+                f"{name}: {value}" for name, value in zip(header[1:], row[1:]) if value
+            )
+            fields.append(f"*{_plain(row[0])}*\n{details}")
+    return _fields(fields)
+
+
+def _list_line(match: re.Match, numbered: bool) -> str:
+    depth = len(match.group(1).expandtabs(4)) // 2
+    if numbered:
+        marker, text = f"{match.group(2)}.", match.group(3)
+    else:
+        marker, text = ("•", "◦", "▪")[min(depth, 2)], match.group(2)
+    return "    " * depth + f"{marker} {to_mrkdwn(text)}"
+
+
+def markdown_to_blocks(text: str) -> list[dict]:
+    """
+    Compiles markdown into a list of Block Kit blocks.
+    The result may hold more than 50 blocks; use `split_blocks` to send it in several messages.
+    """
+    blocks: list[dict] = []
+    # (source line, rendered mrkdwn) pairs of the paragraph being collected
+    paragraph: list[tuple[str, str]] = []
+    lines = text.replace("\r\n", "\n").split("\n")
+
+    def flush():
+        if not paragraph:
+            return
+        pairs = [KEY_VALUE_RE.match(source) for source, _ in paragraph]
+        # Two or more short "Key: value" lines and nothing else read best as fields
+        if len(paragraph) >= 2 and all(m and len(m.group(2)) <= 150 for m in pairs):
+            blocks.extend(_fields([f"*{_plain(m.group(1))}*\n{to_mrkdwn(m.group(2))}" for m in pairs]))
+        else:
+            blocks.extend(_section("\n".join(rendered for _, rendered in paragraph)))
+        paragraph.clear()
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if FENCE_RE.match(line):
+            flush()
+            code = []
+            i += 1
+            while i < len(lines) and not FENCE_RE.match(lines[i]):
+                code.append(lines[i])
+                i += 1
+            for chunk in _split_text("\n".join(code), MAX_SECTION_CHARS - 8):
+                blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": f"```{chunk}```"}})
+        elif not line.strip():
+            flush()
+        elif DIVIDER_RE.match(line):
+            flush()
+            blocks.append({"type": "divider"})
+        elif HEADER_RE.match(line):
+            flush()
+            level, title = HEADER_RE.match(line).groups()
+            if len(level) <= 2 and _plain(title):
+                blocks.append({"type": "header", "text": {"type": "plain_text", "text": _plain(title)[:MAX_HEADER_CHARS], "emoji": True}})
+            else:
+                paragraph.append((line, f"*{_plain(title)}*"))
+        elif TABLE_RE.match(line):
+            flush()
+            rows = []
+            while i < len(lines) and TABLE_RE.match(lines[i]):
+                if not TABLE_SEPARATOR_RE.match(lines[i]):
+                    rows.append(lines[i])
+                i += 1
+            blocks.extend(_table_fields(rows))
+            continue
+        elif BULLET_RE.match(line):
+            paragraph.append((line, _list_line(BULLET_RE.match(line), numbered=False)))
+        elif NUMBERED_RE.match(line):
+            paragraph.append((line, _list_line(NUMBERED_RE.match(line), numbered=True)))
+        elif line.lstrip().startswith(">"):
+            paragraph.append((line, "> " + to_mrkdwn(line.lstrip()[1:].strip())))
+        else:
+            paragraph.append((line, to_mrkdwn(line.strip())))
+        i += 1
+    flush()
+    return blocks
+
+
+def split_blocks(blocks: list[dict], limit: int = MAX_BLOCKS) -> list[list[dict]]:
+    """Splits blocks into message-sized chunks, never starting a chunk with a divider."""
+    chunks, current = [], []
+    for block in blocks:
+        if len(current) == limit:
+            chunks.append(current)
+            current = []
+        if not current and block.get("type") == "divider":
+            continue
+        current.append(block)
+    if current:
+        chunks.append(current)
+    return chunks
@@ -0,0 +1,106 @@
+import os
+import asyncio
+import logging
+import threading
+from typing import Any, Coroutine, Optional
+
+import aiohttp
+
+logger = logging.getLogger("jm.kis.client")
+
+
+class KISHttpClient:
+    """
+    A pooled, keep-alive HTTP client for the Korea Investment (KIS) Open API,
+    shared by every user's KoreaInvestmentAPI instance.
+
+    The aiohttp session lives on a dedicated event loop thread, so it can be used
+    both from async code (any event loop) and from synchronous code.
+    """
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 10, timeout: float = 10.0, keepalive_timeout: float = 60.0):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.keepalive_timeout = keepalive_timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The event loop owning the connection pool, started on first use."""
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="kis-http", daemon=True)
+                self._thread.start()
+        return self._loop
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    def _on_own_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    async def submit(self, coro: Coroutine) -> Any:
+        """Awaits a coroutine on the client loop, from any event loop."""
+        if self._on_own_loop():
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+    def run(self, coro: Coroutine) -> Any:
+        """Runs a coroutine on the client loop and blocks until it completes."""
+        if self._on_own_loop():
+            coro.close()
+            raise RuntimeError("KISHttpClient.run() cannot be called from the client loop; await the coroutine instead.")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def _request(self, method: str, url: str, **kwargs) -> dict:
+        async with self._get_session().request(method, url, **kwargs) as res:
+            return {
+                'status_code': res.status,
+                'message': await res.text(),
+            }
+
+    async def request(self, method: str, url: str, **kwargs) -> dict:
+        """
+        Sends a request over the shared connection pool.
+
+        Returns:
+            dict: The status code and the response body as text, in the same shape
+                  the KoreaInvestmentAPI methods return.
+        """
+        return await self.submit(self._request(method, url, **kwargs))
+
+    def close(self):
+        """Closes the connection pool and stops the client loop."""
+        if self._loop is None:
+            return
+        if self._session is not None:
+            asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop = self._thread = self._session = None
+
+
+# Global client shared across users
+kis_http_client = KISHttpClient(
+    limit=int(os.environ.get("KIS_HTTP_LIMIT", "100")),
+    limit_per_host=int(os.environ.get("KIS_HTTP_LIMIT_PER_HOST", "10")),
+    timeout=float(os.environ.get("KIS_HTTP_TIMEOUT", "10")),
+)
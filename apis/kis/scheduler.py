@@ -0,0 +1,134 @@
+import os
+import json
+import random
+import asyncio
+import logging
+from collections import deque
+
+from apis.kis.client import kis_http_client
+
+logger = logging.getLogger("jm.kis.scheduler")
+
+# KIS response codes meaning "too many calls per second"
+RATE_LIMIT_CODES = ("EGW00201",)
+
+
+def is_rate_limited(res: dict) -> bool:
+    """Returns True if a KIS response was rejected by the per-second call limit."""
+    if res['status_code'] == 429:
+        return True
+    try:
+        body = json.loads(res['message'])
+    except (TypeError, ValueError):
+        return False
+    return isinstance(body, dict) and body.get('msg_cd') in RATE_LIMIT_CODES
+
+
+class TokenBucket:
+    """
+    A token bucket refilled at `rate` tokens per second, holding at most `capacity`.
+    Waiters are served in FIFO order, since asyncio.Lock wakes them in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.waiting = 0
+        self._updated = None
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        if self._updated is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        """Waits for a token and returns the time spent waiting, in seconds."""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                self._refill(loop.time())
+                if self.tokens < 1:
+                    await asyncio.sleep((1 - self.tokens) / self.rate)
+                    self._refill(loop.time())
+                self.tokens -= 1
+        finally:
+            self.waiting -= 1
+        return loop.time() - started
+
+
+class KISRequestScheduler:
+    """
+    Throttles KIS API calls with one token bucket per appkey and domain.
+
+    Real and virtual (`is_test`) domains have separate limits. Requests rejected
+    with a rate-limit code are retried with exponential backoff and full jitter.
+    """
+
+    def __init__(self, real_rate: float = 18, virtual_rate: float = 2, max_retries: int = 3, backoff_base: float = 0.5):
+        self.rates = {False: real_rate, True: virtual_rate}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self._buckets: dict[tuple, TokenBucket] = {}
+        self._waits: dict[tuple, deque] = {}
+        self._counters: dict[tuple, dict] = {}
+
+    def _bucket(self, key: tuple) -> TokenBucket:
+        if key not in self._buckets:
+            rate = self.rates[key[1]]
+            self._buckets[key] = TokenBucket(rate=rate, capacity=max(1.0, rate))
+            self._waits[key] = deque(maxlen=1000)
+            self._counters[key] = {"requests": 0, "throttled": 0, "failed": 0}
+        return self._buckets[key]
+
+    async def _request(self, key: tuple, method: str, url: str, **kwargs) -> dict:
+        bucket = self._bucket(key)
+        counters = self._counters[key]
+        for attempt in range(self.max_retries + 1):
+            self._waits[key].append(await bucket.acquire())
+            counters["requests"] += 1
+            res = await kis_http_client.request(method, url, **kwargs)
+            if not is_rate_limited(res):
+                return res
+            counters["throttled"] += 1
+            if attempt < self.max_retries:
+                delay = random.uniform(0, self.backoff_base * 2 ** attempt)
+                logger.warning(f"KIS rate limit hit ({'virtual' if key[1] else 'real'}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+        counters["failed"] += 1
+        return res
+
+    async def request(self, appkey: str, is_test: bool, method: str, url: str, **kwargs) -> dict:
+        """
+        Sends a KIS request once the appkey's bucket allows it.
+
+        Returns:
+            dict: The status code and response text of the last attempt.
+        """
+        return await kis_http_client.submit(self._request((appkey, bool(is_test)), method, url, **kwargs))
+
+    def metrics(self) -> dict:
+        """Returns queue depth, request counters and wait-time statistics per bucket."""
+        result = {}
+        for key, bucket in self._buckets.items():
+            waits = sorted(self._waits[key])
+            label = f"{key[0][:6]}...:{'virtual' if key[1] else 'real'}"
+            result[label] = {
+                "queue_depth": bucket.waiting,
+                **self._counters[key],
+                "wait_avg": round(sum(waits) / len(waits), 4) if waits else 0.0,
+                "wait_p95": round(waits[int(0.95 * (len(waits) - 1))], 4) if waits else 0.0,
+                "wait_max": round(waits[-1], 4) if waits else 0.0,
+            }
+        return result
+
+
+# Global scheduler shared across users
+kis_scheduler = KISRequestScheduler(
+    real_rate=float(os.environ.get("KIS_RATE_LIMIT_REAL", "18")),
+    virtual_rate=float(os.environ.get("KIS_RATE_LIMIT_VIRTUAL", "2")),
+    max_retries=int(os.environ.get("KIS_RATE_LIMIT_RETRIES", "3")),
+)
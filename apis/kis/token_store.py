@@ -0,0 +1,197 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import weakref
+from contextlib import closing
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger("jm.kis.token_store")
+
+kst = ZoneInfo('Asia/Seoul')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS access_tokens (
+    key TEXT PRIMARY KEY,
+    domain TEXT NOT NULL,
+    access_token TEXT,
+    expires_at TEXT,
+    lease_until REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+class KISTokenStore:
+    """
+    Shares KIS access tokens across instances, restarts and processes.
+
+    Tokens are kept in SQLite on the `db/` volume, keyed by a hash of the appkey
+    and the API domain. Issuing a new token is guarded by a short lease row, so
+    that when several processes find the token expired only one of them calls
+    `/oauth2/tokenP` and the others wait for its result.
+    """
+
+    def __init__(self, db_path: str = "db/kis_tokens.db", validity_margin: int = 15 * 60, lease_seconds: int = 30):
+        self.db_path = db_path
+        self.validity_margin = timedelta(seconds=validity_margin)
+        self.lease_seconds = lease_seconds
+        self._initialized = False
+
+    @staticmethod
+    def _key(appkey: str, domain: str) -> str:
+        return hashlib.sha256(f"{appkey}@{domain}".encode()).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            if not os.path.exists(self.db_path):
+                # Tokens grant account access; keep the file private to the service user.
+                os.close(os.open(self.db_path, os.O_CREAT | os.O_WRONLY, 0o600))
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._initialized = True
+        return conn
+
+    def load(self, appkey: str, domain: str, min_validity: Optional[timedelta] = None) -> Optional[tuple[str, datetime]]:
+        """
+        Returns (access_token, expires_at) if a stored token stays valid for longer than
+        `min_validity` (the validity margin by default).
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT access_token, expires_at FROM access_tokens WHERE key = ?", (self._key(appkey, domain),)
+            ).fetchone()
+        if not row or not row[0] or not row[1]:
+            return None
+        expires_at = datetime.fromisoformat(row[1])
+        if expires_at < datetime.now(tz=kst) + max(self.validity_margin, min_validity or timedelta(0)):
+            return None
+        return row[0], expires_at
+
+    def _try_lease(self, appkey: str, domain: str) -> bool:
+        key = self._key(appkey, domain)
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT lease_until FROM access_tokens WHERE key = ?", (key,)).fetchone()
+                if row and row[0] > now:
+                    conn.execute("ROLLBACK")
+                    return False
+                conn.execute(
+                    "INSERT INTO access_tokens (key, domain, lease_until) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET lease_until = excluded.lease_until",
+                    (key, domain, now + self.lease_seconds),
+                )
+                conn.execute("COMMIT")
+                return True
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _release(self, appkey: str, domain: str, token: Optional[tuple[str, datetime]]):
+        with closing(self._connect()) as conn:
+            if token is None:
+                conn.execute("UPDATE access_tokens SET lease_until = 0 WHERE key = ?", (self._key(appkey, domain),))
+            else:
+                conn.execute(
+                    "UPDATE access_tokens SET access_token = ?, expires_at = ?, lease_until = 0 WHERE key = ?",
+                    (token[0], token[1].isoformat(), self._key(appkey, domain)),
+                )
+
+    async def get_or_issue(
+        self,
+        appkey: str,
+        domain: str,
+        issue: Callable[[], Awaitable[dict]],
+        min_validity: Optional[timedelta] = None,
+    ) -> dict:
+        """
+        Returns a stored token, or issues one with `issue` if none stays valid for
+        longer than `min_validity` (the validity margin by default).
+
+        `issue` must return a dict with 'status_code' and, on success, 'access_token'
+        and 'expires_at'.
+
+        The SQLite calls run on worker threads: they can wait up to the busy timeout for
+        another process's lock, and the caller's loop serves every other KIS request.
+
+        Returns:
+            dict: 'status_code' and 'message', plus 'access_token' and 'expires_at' on success.
+        """
+        deadline = time.monotonic() + 2 * self.lease_seconds
+        stored = await asyncio.to_thread(self.load, appkey, domain, min_validity)
+        while stored is None:
+            if await asyncio.to_thread(self._try_lease, appkey, domain):
+                token = None
+                try:
+                    # Another process may have finished issuing right before we took the lease
+                    stored = await asyncio.to_thread(self.load, appkey, domain, min_validity)
+                    if stored is not None:
+                        break
+                    res = await issue()
+                    if res['status_code'] != 200:
+                        return res
+                    token = (res['access_token'], res['expires_at'])
+                    return {**res, 'message': 'New access token is generated.'}
+                finally:
+                    await asyncio.to_thread(self._release, appkey, domain, token)
+            if time.monotonic() > deadline:
+                return {'status_code': 503, 'message': 'Timed out waiting for another worker to issue the access token.'}
+            await asyncio.sleep(1)
+            stored = await asyncio.to_thread(self.load, appkey, domain, min_validity)
+        return {
+            'status_code': 200,
+            'message': 'Loaded access token from the token store.',
+            'access_token': stored[0],
+            'expires_at': stored[1],
+        }
+
+
+class KISTokenRefresher:
+    """
+    Periodically refreshes the tokens of live KoreaInvestmentAPI instances
+    before they fall inside the validity margin, so requests never wait on issuance.
+    """
+
+    def __init__(self, interval: int = 300, refresh_ahead: int = 3600):
+        self.interval = interval
+        self.refresh_ahead = timedelta(seconds=refresh_ahead)
+        self._instances = weakref.WeakSet()
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, api, loop: asyncio.AbstractEventLoop):
+        """Tracks an API instance and starts the refresh task on `loop` if needed."""
+        self._instances.add(api)
+        if self._task is None:
+            def start():
+                if self._task is None:
+                    self._task = loop.create_task(self._run())
+            loop.call_soon_threadsafe(start)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            threshold = datetime.now(tz=kst) + self.refresh_ahead
+            for api in list(self._instances):
+                if api.access_token_expired > threshold:
+                    continue
+                try:
+                    res = await api.arefresh_access_token()
+                    logger.info(f"Proactive token refresh: {res['message']}")
+                except Exception as e:
+                    logger.warning(f"Proactive token refresh failed: {e}")
+
+
+# Global instances
+kis_token_store = KISTokenStore(db_path=os.environ.get("KIS_TOKEN_STORE_PATH", "db/kis_tokens.db"))
+kis_token_refresher = KISTokenRefresher(
+    interval=int(os.environ.get("KIS_TOKEN_REFRESH_INTERVAL", "300")),
+    refresh_ahead=int(os.environ.get("KIS_TOKEN_REFRESH_AHEAD", "3600")),
+)
@@ -1,8 +1,11 @@
 import os
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
-import requests
+import asyncio
 import json
+from apis.kis.client import kis_http_client
+from apis.kis.scheduler import kis_scheduler
+from apis.kis.token_store import kis_token_store, kis_token_refresher
 
 kst = ZoneInfo('Asia/Seoul')
 
@@ -18,6 +21,7 @@ class KoreaInvestmentAPI:
         self.__access_token = ''
         self.access_token_expired = datetime(year=2000, month=1, day=1, tzinfo=kst)
         self.__is_test = profile['is_test'] # 모의거래인 경우 True, 실거래인 경우 False
+        self.__token_lock = asyncio.Lock() # 동시 조회 시 토큰 중복 발급 방지
 
     def is_access_token_valid(self):
         if self.access_token_expired >= datetime.now(tz=kst) + timedelta(minutes=15) and self.__access_token:
@@ -25,18 +29,45 @@ class KoreaInvestmentAPI:
         else:
             return False
     
-    def __inquire_access_token(self):
-        if self.is_access_token_valid():
+    async def __inquire_access_token(self):
+        async with self.__token_lock:
+            return await self.__issue_access_token()
+
+    async def arefresh_access_token(self):
+        """
+        Makes sure the access token stays valid for the refresher's look-ahead window,
+        issuing a new one if neither this instance nor the token store has such a token.
+        """
+        async with self.__token_lock:
+            return await self.__issue_access_token(min_validity=kis_token_refresher.refresh_ahead)
+
+    async def __issue_access_token(self, min_validity=None):
+        if min_validity is None and self.is_access_token_valid():
             return {
                 'status_code': 200,
                 'message': 'Current access token is valid.'
             }
-        
+
         if self.__is_test:
             domain = "https://openapivts.koreainvestment.com:29443"
         else:
             domain = "https://openapi.koreainvestment.com:9443"
 
+        # Tokens are shared through the token store, so restarts and other
+        # workers reuse an existing token instead of minting a new one.
+        res = await kis_token_store.get_or_issue(
+            self.__appkey, domain, lambda: self.__request_access_token(domain), min_validity
+        )
+        if res['status_code'] == 200:
+            self.__access_token = res['access_token']
+            self.access_token_expired = res['expires_at']
+            kis_token_refresher.register(self, kis_http_client.loop)
+        return {
+            'status_code': res['status_code'],
+            'message': res['message'],
+        }
+
+    async def __request_access_token(self, domain):
         url = domain + '/oauth2/tokenP'
         headers = {
             'content-type': 'application/json',
@@ -47,19 +78,17 @@ class KoreaInvestmentAPI:
             'appsecret': self.__appsecret,
         }
 
-        res = requests.post(url, headers=headers, data=json.dumps(body))
-        if res.status_code == 200:
-            self.__access_token = res.json()['access_token']
-            self.access_token_expired = datetime.strptime(res.json()['access_token_token_expired'], '%Y-%m-%d %H:%M:%S').replace(tzinfo=kst)
+        res = await kis_http_client.request('POST', url, headers=headers, data=json.dumps(body))
+        if res['status_code'] == 200:
+            token = json.loads(res['message'])
             return {
                 'status_code': 200,
                 'message': 'New access token is generated.',
+                'access_token': token['access_token'],
+                'expires_at': datetime.strptime(token['access_token_token_expired'], '%Y-%m-%d %H:%M:%S').replace(tzinfo=kst),
             }
         else:
-            return {
-                'status_code': res.status_code,
-                'message': res.text,
-            }
+            return res
 
 
     def inquire_account_balance(self):
@@ -122,7 +151,16 @@ class KoreaInvestmentAPI:
                       }
                   }
         """
-        self.__inquire_access_token()
+        return kis_http_client.run(self.ainquire_account_balance())
+
+    async def ainquire_account_balance(self):
+        """
+        Async variant of `inquire_account_balance`, awaitable from any event loop.
+        """
+        return await kis_http_client.submit(self.__inquire_account_balance())
+
+    async def __inquire_account_balance(self):
+        await self.__inquire_access_token()
     
         if self.__is_test:
             return {
@@ -150,11 +188,7 @@ class KoreaInvestmentAPI:
             'BSPR_BF_DT_APLY_YN': '',
         }
 
-        res = requests.get(url, headers=headers, params=params)
-        return {
-            'status_code': res.status_code,
-            'message': res.text,
-        }
+        return await kis_scheduler.request(self.__appkey, self.__is_test, 'GET', url, headers=headers, params=params)
     
 
     def inquire_domestic_stock_balance(self):
@@ -208,7 +242,16 @@ class KoreaInvestmentAPI:
                       ]
                   }
         """
-        self.__inquire_access_token()
+        return kis_http_client.run(self.ainquire_domestic_stock_balance())
+
+    async def ainquire_domestic_stock_balance(self):
+        """
+        Async variant of `inquire_domestic_stock_balance`, awaitable from any event loop.
+        """
+        return await kis_http_client.submit(self.__inquire_domestic_stock_balance())
+
+    async def __inquire_domestic_stock_balance(self):
+        await self.__inquire_access_token()
 
         if self.__is_test:
             domain = "https://openapivts.koreainvestment.com:29443"
@@ -241,11 +284,7 @@ class KoreaInvestmentAPI:
             'CTX_AREA_NK100': '',
         }
 
-        res = requests.get(url, headers=headers, params=params)
-        return {
-            'status_code': res.status_code,
-            'message': res.text,
-        }
+        return await kis_scheduler.request(self.__appkey, self.__is_test, 'GET', url, headers=headers, params=params)
     
 
     def inquire_overseas_stock_balance(self):
@@ -303,7 +342,16 @@ class KoreaInvestmentAPI:
                       }
                   }
         """
-        self.__inquire_access_token()
+        return kis_http_client.run(self.ainquire_overseas_stock_balance())
+
+    async def ainquire_overseas_stock_balance(self):
+        """
+        Async variant of `inquire_overseas_stock_balance`, awaitable from any event loop.
+        """
+        return await kis_http_client.submit(self.__inquire_overseas_stock_balance())
+
+    async def __inquire_overseas_stock_balance(self):
+        await self.__inquire_access_token()
 
         if self.__is_test:
             domain = "https://openapivts.koreainvestment.com:29443"
@@ -331,11 +379,7 @@ class KoreaInvestmentAPI:
             'CTX_AREA_NK200': '',
         }
 
-        res = requests.get(url, headers=headers, params=params)
-        return {
-            'status_code': res.status_code,
-            'message': res.text,
-        }
+        return await kis_scheduler.request(self.__appkey, self.__is_test, 'GET', url, headers=headers, params=params)
 
 
     def inquire_domestic_option_balance(self):
@@ -0,0 +1,58 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.plugins.base_plugin import BasePlugin
+
+logger = logging.getLogger("jm.progress")
+
+# The listener of the request being handled. Context variables are copied into
+# the tasks and worker threads spawned while handling it, so tools deep inside
+# an agent run report to the right conversation.
+_listener: ContextVar[Optional[Callable[[str, Optional[str]], Awaitable[None]]]] = ContextVar("progress_listener", default=None)
+
+
+@contextmanager
+def progress_listener(callback: Callable[[str, Optional[str]], Awaitable[None]]):
+    """
+    Routes the progress reported while the block runs to `callback(message, key)`.
+    """
+    token = _listener.set(callback)
+    try:
+        yield
+    finally:
+        _listener.reset(token)
+
+
+async def report_progress(message: str, key: Optional[str] = None):
+    """
+    Sends a progress message to the listener of the current request, if any.
+    A message with a `key` replaces the earlier message reported with the same key.
+    """
+    callback = _listener.get()
+    if callback is None:
+        return
+    try:
+        await callback(message, key)
+    except Exception as e:
+        # Progress is best effort and must never fail the tool reporting it
+        logger.warning(f"Failed to deliver progress message: {e}")
+
+
+class ProgressPlugin(BasePlugin):
+    """
+    Reports when an agent finishes, including agents nested inside AgentTools,
+    whose events never reach the top-level event stream.
+    """
+
+    def __init__(self, ignored_agents: tuple[str, ...] = ()):
+        super().__init__(name="progress")
+        self.ignored_agents = set(ignored_agents)
+
+    async def after_agent_callback(self, *, agent: BaseAgent, callback_context: CallbackContext):
+        if agent.name not in self.ignored_agents:
+            await report_progress(f":white_check_mark: {agent.name}", key=agent.name)
+        return None
@@ -0,0 +1,295 @@
+"""
+Lifecycle management of the agent session store (db/agent_sessions.db).
+
+Every Slack thread gets a session that `DatabaseSessionService` never removes,
+and every agent event and tool payload is appended to it. `SessionLifecycleManager`
+keeps the SQLite file bounded:
+
+- Sessions idle for longer than `ttl` seconds are deleted with their events,
+  through the session service's `list_sessions` and `delete_session`.
+- Sessions holding more than `max_events` events are compacted: whole older
+  invocations are deleted and a short digest of their questions and answers is
+  kept in the session state under `SUMMARY_KEY`, where the root agent reads it.
+  The session service has no API for this, so it is done in SQL on a worker
+  thread, against the v1 (JSON) schema of the google-adk version pinned in
+  requirements.txt; other schema versions are left alone.
+- The WAL is checkpointed after every pass and the file is VACUUMed every
+  `vacuum_interval` seconds.
+
+Only sessions idle for at least `idle_grace` seconds are compacted, so a
+running agent never sees its session change underneath it.
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from google.adk.sessions import BaseSessionService
+
+logger = logging.getLogger("jm.agent.sessions")
+
+SUMMARY_KEY = "conversation_summary"
+
+# The DatabaseSessionService schema the compaction SQL is written for (google-adk 2.x, JSON events)
+SCHEMA_VERSION = "1"
+
+
+def _timestamp(dt: datetime) -> str:
+    # DatabaseSessionService stores naive UTC datetimes in SQLite
+    return dt.astimezone(timezone.utc).replace(tzinfo=None).strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def _text(content: Optional[dict]) -> str:
+    if not content:
+        return ""
+    return " ".join(part["text"] for part in content.get("parts") or [] if part.get("text")).strip()
+
+
+def _shorten(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class SessionLifecycleManager:
+    """
+    Expires, compacts and vacuums the sessions of one app in an ADK SQLite session database.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "db/agent_sessions.db",
+        app_name: str = "JellyMonster",
+        ttl: int = 14 * 86400,
+        max_events: int = 200,
+        keep_events: int = 80,
+        idle_grace: int = 900,
+        interval: int = 3600,
+        vacuum_interval: int = 86400,
+        max_summary_chars: int = 4000,
+    ):
+        self.db_path = db_path
+        self.app_name = app_name
+        self.ttl = ttl
+        self.max_events = max_events
+        self.keep_events = keep_events
+        self.idle_grace = idle_grace
+        self.interval = interval
+        self.vacuum_interval = vacuum_interval
+        self.max_summary_chars = max_summary_chars
+        self._lock = threading.Lock()
+        self._last_vacuum = time.monotonic()
+        self._stats = {"passes": 0, "expired_sessions": 0, "compacted_sessions": 0, "deleted_events": 0, "vacuums": 0}
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if not os.path.exists(self.db_path):
+            return None
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @staticmethod
+    def _has_tables(conn: sqlite3.Connection) -> bool:
+        names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        return {"sessions", "events"} <= names
+
+    @staticmethod
+    def _schema_version(conn: sqlite3.Connection) -> Optional[str]:
+        try:
+            row = conn.execute("SELECT value FROM adk_internal_metadata WHERE key = 'schema_version'").fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row[0] if row else None
+
+    async def expire(self, session_service: BaseSessionService) -> int:
+        """Deletes the sessions not updated for `ttl` seconds. Returns how many were deleted."""
+        cutoff = time.time() - self.ttl
+        response = await session_service.list_sessions(app_name=self.app_name)
+        expired = [session for session in response.sessions if session.last_update_time < cutoff]
+        for session in expired:
+            await session_service.delete_session(app_name=self.app_name, user_id=session.user_id, session_id=session.id)
+        self._stats["expired_sessions"] += len(expired)
+        return len(expired)
+
+    def _event_rows(self, conn: sqlite3.Connection, user_id: str, session_id: str) -> list[dict]:
+        """Returns the events of a session, newest first, as {id, invocation_id, author, content}."""
+        rows = conn.execute(
+            "SELECT id, invocation_id, event_data FROM events "
+            "WHERE app_name = ? AND user_id = ? AND session_id = ? ORDER BY timestamp DESC, id DESC",
+            (self.app_name, user_id, session_id),
+        ).fetchall()
+        events = []
+        for event_id, invocation_id, event_data in rows:
+            data = json.loads(event_data) if event_data else {}
+            events.append({"id": event_id, "invocation_id": invocation_id, "author": data.get("author"), "content": data.get("content")})
+        return events
+
+    def _digest(self, events: list[dict]) -> list[str]:
+        """One line per invocation: the user's question and the final text answer."""
+        invocations: dict[str, dict] = {}
+        for event in reversed(events):
+            text = _text(event["content"])
+            if not text:
+                continue
+            turn = invocations.setdefault(event["invocation_id"], {"question": "", "answer": ""})
+            if event["author"] == "user":
+                turn["question"] = turn["question"] or text
+            else:
+                turn["answer"] = text
+        return [
+            f"- Q: {_shorten(turn['question'], 200)} / A: {_shorten(turn['answer'], 300)}"
+            for turn in invocations.values() if turn["question"]
+        ]
+
+    def _compact_session(self, conn: sqlite3.Connection, user_id: str, session_id: str) -> int:
+        events = self._event_rows(conn, user_id, session_id)
+        # Keep whole invocations, so that no function call loses its response
+        kept = {event["invocation_id"] for event in events[:self.keep_events]}
+        dropped = [event for event in events if event["invocation_id"] not in kept]
+        if not dropped:
+            return 0
+        with conn:
+            row = conn.execute(
+                "SELECT state FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                (self.app_name, user_id, session_id),
+            ).fetchone()
+            state = json.loads(row[0]) if row and row[0] else {}
+            lines = [line for line in (state.get(SUMMARY_KEY) or "").split("\n") if line]
+            lines += self._digest(dropped)
+            while lines and len("\n".join(lines)) > self.max_summary_chars:
+                lines.pop(0)
+            state[SUMMARY_KEY] = "\n".join(lines)
+            # update_time is left alone: it is the revision marker of the session service
+            conn.execute(
+                "UPDATE sessions SET state = ? WHERE app_name = ? AND user_id = ? AND id = ?",
+                (json.dumps(state, ensure_ascii=False), self.app_name, user_id, session_id),
+            )
+            conn.executemany(
+                "DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? AND id = ?",
+                [(self.app_name, user_id, session_id, event["id"]) for event in dropped],
+            )
+        return len(dropped)
+
+    def compact(self, conn: sqlite3.Connection) -> int:
+        """Compacts the idle sessions holding more than `max_events` events. Returns the events deleted."""
+        idle_cutoff = _timestamp(datetime.now(timezone.utc) - timedelta(seconds=self.idle_grace))
+        candidates = conn.execute(
+            "SELECT s.user_id, s.id FROM sessions s JOIN events e "
+            "ON e.app_name = s.app_name AND e.user_id = s.user_id AND e.session_id = s.id "
+            "WHERE s.app_name = ? AND s.update_time < ? "
+            "GROUP BY s.user_id, s.id HAVING COUNT(*) > ?",
+            (self.app_name, idle_cutoff, self.max_events),
+        ).fetchall()
+        deleted = 0
+        for user_id, session_id in candidates:
+            try:
+                deleted += self._compact_session(conn, user_id, session_id)
+                self._stats["compacted_sessions"] += 1
+            except (sqlite3.Error, ValueError) as e:
+                logger.warning(f"Failed to compact session {session_id}: {e}")
+        self._stats["deleted_events"] += deleted
+        return deleted
+
+    def vacuum(self, conn: sqlite3.Connection):
+        """Rebuilds the database file, returning the pages freed by deletions to the file system."""
+        conn.execute("VACUUM")
+        self._last_vacuum = time.monotonic()
+        self._stats["vacuums"] += 1
+
+    def maintain_file(self, vacuum: Optional[bool] = None) -> int:
+        """
+        Compacts the sessions and checkpoints the WAL, in SQL. `vacuum` forces (True) or
+        skips (False) the VACUUM; by default it runs every `vacuum_interval` seconds.
+        Returns the events deleted.
+        """
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return 0
+            with closing(conn):
+                if not self._has_tables(conn):
+                    return 0
+                deleted = 0
+                version = self._schema_version(conn)
+                if version == SCHEMA_VERSION:
+                    deleted = self.compact(conn)
+                else:
+                    logger.warning(f"Session compaction skipped: schema version {version!r}, expected {SCHEMA_VERSION!r}")
+                if vacuum or (vacuum is None and time.monotonic() - self._last_vacuum >= self.vacuum_interval):
+                    try:
+                        self.vacuum(conn)
+                    except sqlite3.OperationalError as e:
+                        logger.warning(f"VACUUM skipped: {e}")
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return deleted
+
+    async def run_once(self, session_service: BaseSessionService, vacuum: Optional[bool] = None):
+        """Runs one maintenance pass: expiry through `session_service`, then `maintain_file` on a worker thread."""
+        started = time.monotonic()
+        expired = await self.expire(session_service)
+        deleted = await asyncio.to_thread(self.maintain_file, vacuum)
+        self._stats["passes"] += 1
+        logger.info(
+            f"Session maintenance: {expired} sessions expired, {deleted} events compacted "
+            f"in {time.monotonic() - started:.2f}s"
+        )
+
+    def metrics(self, top: int = 5) -> dict:
+        """Returns the size of the store, the largest sessions and the maintenance counters."""
+        def size(path: str) -> int:
+            return os.path.getsize(path) if os.path.exists(path) else 0
+
+        result = {
+            "db_bytes": size(self.db_path),
+            "wal_bytes": size(self.db_path + "-wal"),
+            **self._stats,
+        }
+        conn = self._connect()
+        if conn is None:
+            return result
+        with closing(conn):
+            if not self._has_tables(conn):
+                return result
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            result["free_bytes"] = conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size
+            result["sessions"] = conn.execute(
+                "SELECT COUNT(*) FROM sessions WHERE app_name = ?", (self.app_name,)
+            ).fetchone()[0]
+            result["events"] = conn.execute(
+                "SELECT COUNT(*) FROM events WHERE app_name = ?", (self.app_name,)
+            ).fetchone()[0]
+            result["largest_sessions"] = [
+                {"session_id": session_id, "events": count}
+                for session_id, count in conn.execute(
+                    "SELECT session_id, COUNT(*) AS n FROM events WHERE app_name = ? "
+                    "GROUP BY user_id, session_id ORDER BY n DESC LIMIT ?",
+                    (self.app_name, top),
+                )
+            ]
+        return result
+
+    async def run_forever(self, session_service: BaseSessionService):
+        """Runs a maintenance pass every `interval` seconds."""
+        while True:
+            try:
+                await self.run_once(session_service)
+            except Exception as e:
+                logger.error(f"Session maintenance failed: {e}")
+            await asyncio.sleep(self.interval)
+
+
+# Global instance for the Slack app's session store
+session_lifecycle = SessionLifecycleManager(
+    db_path=os.environ.get("AGENT_SESSION_DB_PATH", "db/agent_sessions.db"),
+    ttl=int(os.environ.get("SESSION_TTL_DAYS", "14")) * 86400,
+    max_events=int(os.environ.get("SESSION_MAX_EVENTS", "200")),
+    keep_events=int(os.environ.get("SESSION_KEEP_EVENTS", "80")),
+    interval=int(os.environ.get("SESSION_MAINTENANCE_INTERVAL", "3600")),
+    vacuum_interval=int(os.environ.get("SESSION_VACUUM_INTERVAL", "86400")),
+)
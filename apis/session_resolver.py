@@ -0,0 +1,234 @@
+"""
+Session lookup for agent runs without a database round trip per message.
+
+`SessionResolver` makes sure a session exists before a run: it remembers the
+sessions it has seen in an LRU, and otherwise does a single existence read,
+creating the session only when it is missing.
+
+`WriteBehindSessionService` optionally wraps the database session service:
+sessions are kept in memory between the messages of a thread and new events are
+persisted by a background writer, so follow-up questions neither reload the whole
+session nor wait for each event to be written. Events still queued when the
+process dies are lost, which is why the mode is opt-in.
+"""
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Optional
+
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+
+logger = logging.getLogger("jm.agent.sessions")
+
+SessionKey = tuple[str, str, str]
+
+
+class SessionResolver:
+    """
+    Get-or-create of sessions with an LRU of the sessions known to exist.
+
+    An entry is trusted for `max_age` seconds after its last use, which should be
+    shorter than the session expiry of `SessionLifecycleManager`.
+    """
+
+    def __init__(self, session_service: BaseSessionService, app_name: str, max_entries: int = 4096, max_age: float = 86400.0):
+        self.session_service = session_service
+        self.app_name = app_name
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._known: OrderedDict[tuple[str, str], float] = OrderedDict()
+        self._locks: dict[tuple[str, str], asyncio.Lock] = {}
+        self._stats = {"hits": 0, "loaded": 0, "created": 0}
+
+    def _is_known(self, key: tuple[str, str]) -> bool:
+        last_used = self._known.get(key)
+        if last_used is None or time.monotonic() - last_used >= self.max_age:
+            return False
+        self._known[key] = time.monotonic()
+        self._known.move_to_end(key)
+        return True
+
+    def _remember(self, key: tuple[str, str]):
+        self._known[key] = time.monotonic()
+        self._known.move_to_end(key)
+        while len(self._known) > self.max_entries:
+            self._known.popitem(last=False)
+
+    async def ensure(self, user_id: str, session_id: str, state: Optional[dict[str, Any]] = None):
+        """Makes sure the session exists, creating it with `state` if it does not."""
+        key = (user_id, session_id)
+        if self._is_known(key):
+            self._stats["hits"] += 1
+            return
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                if self._is_known(key):
+                    self._stats["hits"] += 1
+                    return
+                # Existence check only; the runner loads the events itself
+                session = await self.session_service.get_session(
+                    app_name=self.app_name,
+                    user_id=user_id,
+                    session_id=session_id,
+                    config=GetSessionConfig(num_recent_events=0),
+                )
+                if session is None:
+                    try:
+                        await self.session_service.create_session(
+                            app_name=self.app_name, user_id=user_id, session_id=session_id, state=state
+                        )
+                        self._stats["created"] += 1
+                        logger.debug(f"{session_id=} created with {state=}")
+                    except AlreadyExistsError:
+                        self._stats["loaded"] += 1
+                else:
+                    self._stats["loaded"] += 1
+                    logger.debug(f"{session_id=} loaded")
+                self._remember(key)
+        finally:
+            # Later callers find the key in the LRU; a concurrent create is caught above
+            self._locks.pop(key, None)
+
+    def forget(self, user_id: str, session_id: str):
+        """Drops a session from the LRU, e.g. after it has been deleted."""
+        self._known.pop((user_id, session_id), None)
+
+    def stats(self) -> dict:
+        return {**self._stats, "known": len(self._known)}
+
+
+class WriteBehindSessionService(BaseSessionService):
+    """
+    An in-memory front for a persistent session service.
+
+    Sessions read or created through it stay in memory (at most `max_sessions`,
+    least recently used first out). Events are applied to the in-memory session
+    at once and written to `backend` in order by a background task. Reads that
+    the memory cannot answer first wait for the pending writes.
+    """
+
+    def __init__(self, backend: BaseSessionService, max_sessions: int = 256):
+        self.backend = backend
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[SessionKey, Session] = OrderedDict()
+        # The backend's copy of each cached session, which tracks its storage revision
+        self._shadows: dict[SessionKey, Session] = {}
+        self._pending: dict[SessionKey, int] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._stats = {"cache_hits": 0, "cache_misses": 0, "written": 0, "write_errors": 0}
+
+    @staticmethod
+    def _key(app_name: str, user_id: str, session_id: str) -> SessionKey:
+        return (app_name, user_id, session_id)
+
+    def _cache(self, key: SessionKey, session: Session):
+        self._sessions[key] = session
+        self._sessions.move_to_end(key)
+        self._shadows[key] = session.model_copy(update={"events": [], "state": dict(session.state)})
+        for old_key in list(self._sessions):
+            if len(self._sessions) <= self.max_sessions:
+                break
+            if not self._pending.get(old_key):
+                self._evict(old_key)
+
+    def _evict(self, key: SessionKey):
+        self._sessions.pop(key, None)
+        self._shadows.pop(key, None)
+
+    def _ensure_writer(self):
+        if self._writer is None or self._writer.done():
+            self._queue = asyncio.Queue()
+            self._writer = asyncio.create_task(self._write_loop())
+
+    async def _write_loop(self):
+        while True:
+            key, event = await self._queue.get()
+            try:
+                shadow = self._shadows.get(key)
+                if shadow is None:
+                    raise RuntimeError("the session is no longer cached")
+                await self.backend.append_event(shadow, event)
+                # The shadow only needs its revision marker, not the events
+                shadow.events.clear()
+                self._stats["written"] += 1
+            except Exception as e:
+                # Reload from storage next time rather than diverge from it
+                logger.error(f"Failed to persist event {event.id} of session {key[2]}: {e}")
+                self._stats["write_errors"] += 1
+                self._evict(key)
+            finally:
+                self._pending[key] -= 1
+                if not self._pending[key]:
+                    del self._pending[key]
+                self._queue.task_done()
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session = await self.backend.create_session(app_name=app_name, user_id=user_id, state=state, session_id=session_id)
+        self._cache(self._key(app_name, user_id, session.id), session.model_copy(deep=True))
+        return self._sessions[self._key(app_name, user_id, session.id)]
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        key = self._key(app_name, user_id, session_id)
+        full_read = config is None or (config.num_recent_events is None and config.after_timestamp is None)
+        if key in self._sessions and (full_read or config.num_recent_events == 0):
+            self._stats["cache_hits"] += 1
+            self._sessions.move_to_end(key)
+            return self._sessions[key]
+        self._stats["cache_misses"] += 1
+        await self.flush()
+        session = await self.backend.get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+        if session is not None and full_read:
+            self._cache(key, session)
+        return session
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        await self.flush()
+        return await self.backend.list_sessions(app_name=app_name, user_id=user_id)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await self.flush()
+        self._evict(self._key(app_name, user_id, session_id))
+        await self.backend.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        key = self._key(session.app_name, session.user_id, session.id)
+        if self._sessions.get(key) is not session:
+            # Not a session served from the cache: write it through
+            return await self.backend.append_event(session, event)
+        if event.partial:
+            return event
+        event = await super().append_event(session, event)
+        session.last_update_time = event.timestamp
+        self._ensure_writer()
+        self._pending[key] = self._pending.get(key, 0) + 1
+        self._queue.put_nowait((key, event))
+        return event
+
+    async def flush(self) -> None:
+        """Waits until every queued event has been written."""
+        if self._queue is not None and self._writer is not None and not self._writer.done():
+            await self._queue.join()
+        await self.backend.flush()
+
+    def stats(self) -> dict:
+        return {**self._stats, "cached": len(self._sessions), "pending": sum(self._pending.values())}
@@ -1,11 +1,14 @@
-import asyncio
 import os
 import logging
 import json
 import traceback
 
 from slack_bolt.async_app import AsyncApp
-from apis.agent_handler import call_agent_async, get_session_service, get_runner, get_restricted_runner
+from apis.agent_handler import call_agent_async, get_session_service, get_session_resolver, get_runner, get_restricted_runner
+from apis.admission import admission_controller
+from apis.progress import progress_listener
+from apis.slack_progress import SlackProgressMessage
+from apis.blockkit import MAX_SECTION_CHARS, markdown_to_blocks, split_blocks
 
 SLACK_BOT_TOKEN = os.environ.get('SLACK_OAUTH_TOKEN')
 SLACK_SIGNING_SECRET = os.environ.get('SLACK_SIGNING_SECRET')
@@ -15,48 +18,35 @@ app = AsyncApp(token=SLACK_BOT_TOKEN, signing_secret=SLACK_SIGNING_SECRET)
 
 # Agent session and runner initialization
 session_service = get_session_service()
+session_resolver = get_session_resolver(session_service)
 full_runner = get_runner(session_service)
 restricted_runner = get_restricted_runner(session_service)
 
 # Other settings
-max_text_length = 2700
+progress_interval = float(os.environ.get('SLACK_PROGRESS_INTERVAL', '1.5'))
 logger = logging.getLogger("jm.slack.handler")
 
 
-def build_blocks_from_markdown(text: str, max_length: int = 3000) -> list:
+def parse_block_kit_json(response_text: str) -> list | None:
     """
-    Intelligently splits markdown text into a list of Slack Block Kit sections.
-    Splits by paragraph first, then by character limit if a paragraph is too long.
+    Returns the blocks if the response is Block Kit JSON (optionally in a ```json fence),
+    or None if it is not.
     """
-    blocks = []
-    # Split the text into paragraphs
-    chunks = text.split('\n\n')
-    for chunk in chunks:
-        chunk = chunk.strip()
-        if not chunk:
-            continue
-        # If a chunk is longer than the max length, split it into sub-chunks
-        if len(chunk) > max_length:
-            # Find a good split point (like a newline or space) near the max_length
-            # to avoid breaking mid-word.
-            for i in range(0, len(chunk), max_length):
-                sub_chunk = chunk[i:i + max_length]
-                blocks.append({
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": sub_chunk
-                    }
-                })
-        else:
-            blocks.append({
-                "type": "section",
-                "text": {
-                    "type": "mrkdwn",
-                    "text": chunk
-                }
-            })
-    return blocks
+    json_str = response_text.strip()
+    if json_str.startswith("```json"):
+        json_str = json_str[7:-3].strip()
+    if not json_str.startswith(("[", "{")):
+        return None
+    try:
+        parsed_json = json.loads(json_str)
+    except json.JSONDecodeError as e:
+        logger.warning(f"Failed to parse agent response as JSON (Error: {e}). Falling back to Markdown rendering.")
+        return None
+    if isinstance(parsed_json, dict):
+        return [parsed_json]  # Wrap single block object in a list
+    if isinstance(parsed_json, list) and all(isinstance(block, dict) and "type" in block for block in parsed_json):
+        return parsed_json
+    return None
 
 
 async def run_agent_and_respond(query, user_id, session_id, channel_id, ts, client, runner_to_use, is_dm: bool):
@@ -64,70 +54,71 @@ async def run_agent_and_respond(query, user_id, session_id, channel_id, ts, clie
     Runs the agent and posts a nicely formatted response to Slack.
     
     This function implements an "Intelligent Adaptive Rendering" strategy:
-    1. It first tries to parse the agent's response as Block Kit JSON.
-       - If successful, it validates and sends the rich blocks.
-    2. If JSON parsing fails, it treats the response as Markdown.
-       - It uses `build_blocks_from_markdown` to intelligently split the text
-         by paragraph, creating a much more readable multi-section message.
+    1. If the response is Block Kit JSON (when the LLM formatter is enabled),
+       it sends the rich blocks as they are.
+    2. Otherwise it treats the response as Markdown and compiles it into
+       Block Kit with `markdown_to_blocks` (headers, lists, fields, tables...).
+       Responses longer than one message allows are sent in several messages.
     3. As a final safety net, any error during posting results in a simple
        plain-text error message.
+
+    While the agent runs, a placeholder message in the thread lists the steps
+    completed so far (tool calls, finished sub-agents, partial results of
+    long-running tools). The final response replaces the placeholder.
     """
     await client.reactions_add(name="thinking_face", channel=channel_id, timestamp=ts)
+    progress = SlackProgressMessage(client, channel_id, ts, min_interval=progress_interval)
+    await progress.start()
     try:
-        response = await call_agent_async(
-            query=query,
-            session_service=session_service,
-            runner=runner_to_use, # Use the passed runner
-            user_id=user_id,
-            session_id=session_id,
-            is_dm=is_dm,
-        )
+        with progress_listener(progress.update):
+            response = await call_agent_async(
+                query=query,
+                session_resolver=session_resolver,
+                runner=runner_to_use, # Use the passed runner
+                user_id=user_id,
+                session_id=session_id,
+                is_dm=is_dm,
+                on_event=progress.on_event,
+            )
     except Exception as e:
         logger.error(traceback.format_exc())
         response = f"An error occurred during agent execution: {str(e)}"
     await client.reactions_remove(name="thinking_face", channel=channel_id, timestamp=ts)
 
-    blocks = []
     response_text = response if isinstance(response, str) else str(response)
-
-    try:
-        # 1. Attempt to parse the response as Block Kit JSON
-        json_str = response_text
-        if response_text.strip().startswith("```json"):
-            json_str = response_text.strip()[7:-3].strip()
-        
-        parsed_json = json.loads(json_str)
-
-        if isinstance(parsed_json, dict):
-            blocks = [parsed_json]  # Wrap single block object in a list
-        elif isinstance(parsed_json, list):
-            blocks = parsed_json  # Already a valid list of blocks
-        else:
-            # The parsed JSON is not a valid block structure, fall back to markdown
-            raise TypeError("Parsed JSON is not a dict or list.")
-
-    except (json.JSONDecodeError, TypeError) as e:
-        # 2. If JSON parsing fails, render as intelligent Markdown blocks
-        logger.warning(
-            f"Failed to parse agent response as JSON (Error: {e}). "
-            "Falling back to Markdown rendering."
-        )
-        blocks = build_blocks_from_markdown(response_text, max_text_length)
+    blocks = parse_block_kit_json(response_text)
+    if blocks is None:
+        # 2. Compile the markdown response into Block Kit
+        blocks = markdown_to_blocks(response_text)
+    messages = split_blocks(blocks)
+    if not messages:
+        # Nothing renders (e.g. an empty answer); an empty update would blank the placeholder
+        response_text = response_text.strip() or "The agent returned an empty response."
+        messages = [[{"type": "section", "text": {"type": "plain_text", "text": response_text[:MAX_SECTION_CHARS]}}]]
 
     # Fallback text for notifications is the first line of the original response
     fallback_text = response_text.split('\n')[0]
 
     try:
-        # 3. Post the message to Slack
-        await client.chat_postMessage(
-            channel=channel_id,
-            thread_ts=ts,
-            text=fallback_text,
-            blocks=blocks
-        )
+        # 3. Replace the progress placeholder with the message, or post it if there is none
+        if not await progress.finish(fallback_text, messages[0]):
+            await client.chat_postMessage(
+                channel=channel_id,
+                thread_ts=ts,
+                text=fallback_text,
+                blocks=messages[0]
+            )
+        for extra_blocks in messages[1:]:
+            await client.chat_postMessage(
+                channel=channel_id,
+                thread_ts=ts,
+                text=fallback_text,
+                blocks=extra_blocks
+            )
     except Exception as e:
         # Final safety net: if posting the blocks fails, send raw text
         logger.error(f"Failed to post formatted blocks to Slack: {traceback.format_exc()}")
+        await progress.discard()
         error_message = (
             f"An error occurred while posting the message to Slack: {str(e)}\n\n"
             f"*Original Agent Response:*\n"
@@ -139,6 +130,73 @@ async def run_agent_and_respond(query, user_id, session_id, channel_id, ts, clie
             text=error_message
         )
 
+async def admit_agent_run(query, user_id, session_id, channel_id, ts, client, runner_to_use, is_dm: bool):
+    """
+    Hands an agent run to the admission controller.
+
+    If the run has to wait for a free slot, the message gets an hourglass reaction
+    and a note with its queue position; both are cleared once it starts.
+    Identical queries already in flight in the same thread are ignored.
+    """
+    async def run():
+        await run_agent_and_respond(
+            query=query,
+            user_id=user_id,
+            session_id=session_id,
+            channel_id=channel_id,
+            ts=ts,
+            client=client,
+            runner_to_use=runner_to_use,
+            is_dm=is_dm,
+        )
+
+    queue_note = {}
+
+    async def clear_queue_note():
+        if queue_note.get("reaction"):
+            await client.reactions_remove(name="hourglass_flowing_sand", channel=channel_id, timestamp=ts)
+        if queue_note.get("ts"):
+            await client.chat_delete(channel=channel_id, ts=queue_note["ts"])
+
+    async def on_start():
+        queue_note["started"] = True
+        # Until the reaction and note are posted, the queued path below clears them itself
+        if queue_note.get("posted"):
+            await clear_queue_note()
+
+    status, position = admission_controller.submit(
+        user_id=user_id,
+        channel_id=channel_id,
+        dedup_key=(session_id, " ".join(query.split()).lower()),
+        run=run,
+        on_start=on_start,
+    )
+    if status == "queued":
+        try:
+            await client.reactions_add(name="hourglass_flowing_sand", channel=channel_id, timestamp=ts)
+            queue_note["reaction"] = True
+            res = await client.chat_postMessage(
+                channel=channel_id,
+                thread_ts=ts,
+                text=f"Your request is queued (position {position}). It will start automatically.",
+            )
+            queue_note["ts"] = res.get("ts")
+        except Exception as e:
+            logger.warning(f"Failed to post queue position: {e}")
+        queue_note["posted"] = True
+        # The run may have started while the reaction and note were being posted
+        if queue_note.get("started"):
+            try:
+                await clear_queue_note()
+            except Exception as e:
+                logger.warning(f"Failed to clear queue position: {e}")
+    elif status == "rejected":
+        await client.chat_postMessage(
+            channel=channel_id,
+            thread_ts=ts,
+            text="The bot is handling too many requests right now. Please try again in a few minutes.",
+        )
+
 @app.event("message")
 async def handle_message_events(body, logger, client):
     logger.debug(f"Received message event {body=}")
@@ -153,7 +211,7 @@ async def handle_message_events(body, logger, client):
 
         session_id = f"{user_id}-{channel_id}-{thread_ts}"
 
-        asyncio.create_task(run_agent_and_respond(
+        await admit_agent_run(
             query=query,
             user_id=user_id,
             session_id=session_id,
@@ -162,7 +220,7 @@ async def handle_message_events(body, logger, client):
             client=client,
             runner_to_use=full_runner, # Use the full runner for DMs
             is_dm=True,
-        ))
+        )
 
 @app.event("app_mention")
 async def handle_app_mentions(body, logger, client):
@@ -187,7 +245,7 @@ async def handle_app_mentions(body, logger, client):
     # For public/private channels, always use the restricted runner
     runner_to_use = restricted_runner 
 
-    asyncio.create_task(run_agent_and_respond(
+    await admit_agent_run(
         query=query,
         user_id=user_id,
         session_id=session_id,
@@ -196,4 +254,4 @@ async def handle_app_mentions(body, logger, client):
         client=client,
         runner_to_use=runner_to_use,
         is_dm=False,
-    ))
\ No newline at end of file
+    )
\ No newline at end of file
@@ -0,0 +1,128 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+from google.adk.events import Event
+
+logger = logging.getLogger("jm.slack.progress")
+
+PLACEHOLDER_TEXT = ":hourglass_flowing_sand: Working on it..."
+
+
+class SlackProgressMessage:
+    """
+    A placeholder message in the request's thread that shows the steps of an
+    agent run as they happen, and is replaced by the final answer at the end.
+
+    Updates are debounced: at most one `chat_update` per `min_interval` seconds,
+    carrying every step reported in the meantime.
+    """
+
+    def __init__(self, client, channel_id: str, thread_ts: str, min_interval: float = 1.5, max_chars: int = 2900):
+        self.client = client
+        self.channel_id = channel_id
+        self.thread_ts = thread_ts
+        self.min_interval = min_interval
+        self.max_chars = max_chars
+        self.ts: Optional[str] = None
+        self._steps: OrderedDict[str, str] = OrderedDict()
+        self._counter = 0
+        self._last_update = 0.0
+        self._rendered = ""
+        self._flush_task: Optional[asyncio.Task] = None
+        self._closed = False
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        """Posts the placeholder message."""
+        try:
+            res = await self.client.chat_postMessage(channel=self.channel_id, thread_ts=self.thread_ts, text=PLACEHOLDER_TEXT)
+            self.ts = res.get("ts")
+            self._last_update = time.monotonic()
+        except Exception as e:
+            logger.warning(f"Failed to post the progress placeholder: {e}")
+
+    def _render(self) -> str:
+        lines = list(self._steps.values())
+        text = "\n".join([PLACEHOLDER_TEXT, *lines])
+        # Keep the most recent steps when the message grows too long
+        while len(text) > self.max_chars and len(lines) > 1:
+            lines.pop(0)
+            text = "\n".join([PLACEHOLDER_TEXT, "…", *lines])
+        return text[:self.max_chars]
+
+    async def _flush(self):
+        async with self._lock:
+            if self.ts is None or self._closed:
+                return
+            text = self._render()
+            if text == self._rendered:
+                return
+            self._rendered = text
+            self._last_update = time.monotonic()
+            try:
+                await self.client.chat_update(channel=self.channel_id, ts=self.ts, text=text)
+            except Exception as e:
+                logger.warning(f"Failed to update the progress message: {e}")
+
+    async def _flush_later(self, delay: float):
+        await asyncio.sleep(delay)
+        self._flush_task = None
+        await self._flush()
+
+    async def update(self, message: str, key: Optional[str] = None):
+        """
+        Adds a step, or replaces the step with the same `key`, and schedules a refresh.
+        Matches the `progress_listener` callback signature.
+        """
+        if key is None:
+            self._counter += 1
+            key = f"#{self._counter}"
+        self._steps[key] = message
+        if self._flush_task is not None:
+            return
+        wait = self.min_interval - (time.monotonic() - self._last_update)
+        if wait <= 0:
+            await self._flush()
+        else:
+            self._flush_task = asyncio.create_task(self._flush_later(wait))
+
+    async def on_event(self, event: Event):
+        """Turns the top-level agent events into steps: tool calls started and finished."""
+        for call in event.get_function_calls():
+            await self.update(f":arrows_counterclockwise: {call.name}...", key=call.name)
+        for response in event.get_function_responses():
+            await self.update(f":white_check_mark: {response.name}", key=response.name)
+
+    async def finish(self, text: str, blocks: Optional[list] = None) -> bool:
+        """
+        Replaces the placeholder with the final answer.
+
+        Returns:
+            bool: False if there is no placeholder, in which case the caller should
+                  post the answer itself. Slack API errors are raised.
+        """
+        self._closed = True
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if self.ts is None:
+            return False
+        kwargs = {"blocks": blocks} if blocks is not None else {}
+        # Waits for an in-flight progress update, so it cannot overwrite the answer
+        async with self._lock:
+            await self.client.chat_update(channel=self.channel_id, ts=self.ts, text=text, **kwargs)
+        return True
+
+    async def discard(self):
+        """Deletes the placeholder, e.g. when the answer had to be posted as a new message."""
+        self._closed = True
+        if self.ts is None:
+            return
+        try:
+            await self.client.chat_delete(channel=self.channel_id, ts=self.ts)
+        except Exception as e:
+            logger.warning(f"Failed to delete the progress message: {e}")
+
@@ -0,0 +1,356 @@
+"""
+End-to-end latency tracing of agent runs.
+
+`trace_request` opens a trace for one request. While it is open, `TracingPlugin`
+records a span tree of every agent invocation (including agents nested inside
+AgentTools), every LLM call with its token counts, and every tool call with its
+duration, payload size and the cache hits and misses reported through
+`record_cache`. Finished traces are appended as one JSON line each to the sink
+(db/traces.jsonl by default).
+
+Summarize them with:
+
+    python -m apis.tracing [--path db/traces.jsonl] [--since HOURS]
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import logging
+import argparse
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+
+logger = logging.getLogger("jm.tracing")
+
+
+class Span:
+    """A timed operation of a trace: an agent invocation, an LLM call or a tool call."""
+
+    def __init__(self, kind: str, name: str, parent: Optional["Span"] = None, **attributes: Any):
+        self.id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.name = name
+        self.parent_id = parent.id if parent else None
+        self.attributes = attributes
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.status = "ok"
+        self._lock = threading.Lock()
+
+    def end(self, status: str = "ok", **attributes: Any):
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._started
+        self.status = status
+        self.attributes.update({key: value for key, value in attributes.items() if value is not None})
+
+    def count(self, key: str, amount: int = 1):
+        # Cache lookups are reported from worker threads
+        with self._lock:
+            self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "parent_id": self.parent_id,
+            "kind": self.kind,
+            "name": self.name,
+            "started_at": round(self.started_at, 3),
+            "duration": round(self.duration, 4) if self.duration is not None else None,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class Trace:
+    """The spans of one request, rooted at a "request" span."""
+
+    def __init__(self, name: str, **attributes: Any):
+        self.id = uuid.uuid4().hex
+        self.root = Span("request", name, **attributes)
+        self.spans: list[Span] = [self.root]
+        # Open agent and LLM spans by (invocation id, agent name); open tool spans by function call id
+        self.agents: dict[tuple[str, str], Span] = {}
+        self.models: dict[tuple[str, str], Span] = {}
+        self.tools: dict[str, Span] = {}
+        # Tokens to restore the current tool span when a tool call ends, by function call id
+        self.tool_tokens: dict[str, Token] = {}
+
+    def start(self, kind: str, name: str, parent: Optional[Span], **attributes: Any) -> Span:
+        span = Span(kind, name, parent or self.root, **attributes)
+        self.spans.append(span)
+        return span
+
+    def end_tool(self, function_call_id: str) -> Optional[Span]:
+        """
+        Removes an open tool span and makes the span that was current before it current again.
+        The tool callbacks run in the context the tool runs in, so the reset applies there.
+        """
+        token = self.tool_tokens.pop(function_call_id, None)
+        if token is not None:
+            try:
+                _tool_span.reset(token)
+            except ValueError:
+                # Set in another context, which ended with its task
+                pass
+        return self.tools.pop(function_call_id, None)
+
+    def to_dict(self) -> dict:
+        return {"trace_id": self.id, "spans": [span.to_dict() for span in self.spans]}
+
+
+_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+# The tool call being executed; agents run by an AgentTool become its children
+_tool_span: ContextVar[Optional[Span]] = ContextVar("tool_span", default=None)
+
+
+class TraceSink:
+    """Appends finished traces to a JSONL file, starting a new file past `max_bytes`."""
+
+    def __init__(self, path: str = "db/traces.jsonl", max_bytes: int = 50 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def write(self, trace: Trace):
+        line = json.dumps(trace.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                os.replace(self.path, self.path + ".1")
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+# Global sink; set TRACING_ENABLED=false to stop recording
+trace_sink = TraceSink(path=os.environ.get("TRACE_PATH", "db/traces.jsonl"))
+TRACING_ENABLED = os.environ.get("TRACING_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+@contextmanager
+def trace_request(name: str, **attributes: Any):
+    """
+    Traces everything the block runs (including the tasks and worker threads it
+    spawns) as one trace, written to the sink when the block exits.
+    """
+    if not TRACING_ENABLED:
+        yield None
+        return
+    trace = Trace(name, **attributes)
+    token = _trace.set(trace)
+    status = "ok"
+    try:
+        yield trace
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        _trace.reset(token)
+        # Spans still open were abandoned, e.g. when the caller stopped at the final response
+        for span in trace.spans[1:]:
+            span.end(status="unfinished")
+        trace.root.end(status=status)
+        try:
+            trace_sink.write(trace)
+        except OSError as e:
+            logger.warning(f"Failed to write trace {trace.id}: {e}")
+
+
+def record_cache(cache: str, hit: bool):
+    """Counts a cache hit or miss on the tool call being executed, if it is traced."""
+    span = _tool_span.get()
+    if span is not None:
+        span.count(f"{cache}_{'hits' if hit else 'misses'}")
+
+
+def record_shaping(tokens: int, truncated: bool):
+    """Records the estimated tokens of a shaped tool result, and whether it was truncated, on the tool call being executed."""
+    span = _tool_span.get()
+    if span is not None:
+        span.count("result_tokens", tokens)
+        if truncated:
+            span.count("truncated")
+
+
+def _payload_bytes(payload: Any) -> int:
+    try:
+        return len(json.dumps(payload, ensure_ascii=False, default=str).encode())
+    except (TypeError, ValueError):
+        return len(str(payload).encode())
+
+
+class TracingPlugin(BasePlugin):
+    """
+    Records agent, LLM and tool spans into the trace of the current request.
+    Plugins are propagated to the runners of AgentTools, so nested agents are traced too.
+    """
+
+    def __init__(self):
+        super().__init__(name="tracing")
+
+    async def before_agent_callback(self, *, agent: BaseAgent, callback_context: CallbackContext):
+        trace = _trace.get()
+        if trace is not None:
+            key = (callback_context.invocation_id, agent.name)
+            trace.agents[key] = trace.start("agent", agent.name, _tool_span.get())
+        return None
+
+    async def after_agent_callback(self, *, agent: BaseAgent, callback_context: CallbackContext):
+        trace = _trace.get()
+        if trace is not None:
+            span = trace.agents.pop((callback_context.invocation_id, agent.name), None)
+            if span is not None:
+                span.end()
+        return None
+
+    async def before_model_callback(self, *, callback_context: CallbackContext, llm_request: LlmRequest):
+        trace = _trace.get()
+        if trace is not None:
+            key = (callback_context.invocation_id, callback_context.agent_name)
+            trace.models[key] = trace.start(
+                "llm", callback_context.agent_name, trace.agents.get(key), model=llm_request.model
+            )
+        return None
+
+    async def after_model_callback(self, *, callback_context: CallbackContext, llm_response: LlmResponse):
+        trace = _trace.get()
+        if trace is None or llm_response.partial:
+            return None
+        span = trace.models.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        if span is not None:
+            usage = llm_response.usage_metadata
+            span.end(
+                status="error" if llm_response.error_code else "ok",
+                prompt_tokens=getattr(usage, "prompt_token_count", None),
+                output_tokens=getattr(usage, "candidates_token_count", None),
+                cached_tokens=getattr(usage, "cached_content_token_count", None),
+            )
+        return None
+
+    async def on_model_error_callback(self, *, callback_context: CallbackContext, llm_request: LlmRequest, error: Exception):
+        trace = _trace.get()
+        if trace is not None:
+            span = trace.models.pop((callback_context.invocation_id, callback_context.agent_name), None)
+            if span is not None:
+                span.end(status="error", error=str(error))
+        return None
+
+    async def before_tool_callback(self, *, tool: BaseTool, tool_args: dict[str, Any], tool_context: ToolContext):
+        trace = _trace.get()
+        if trace is not None:
+            parent = trace.agents.get((tool_context.invocation_id, tool_context.agent_name))
+            span = trace.start("tool", tool.name, parent, args_bytes=_payload_bytes(tool_args))
+            trace.tools[tool_context.function_call_id] = span
+            # The before-tool context is the one the tool runs in; end_tool restores it
+            trace.tool_tokens[tool_context.function_call_id] = _tool_span.set(span)
+        return None
+
+    async def after_tool_callback(self, *, tool: BaseTool, tool_args: dict[str, Any], tool_context: ToolContext, result: Any):
+        trace = _trace.get()
+        if trace is not None:
+            span = trace.end_tool(tool_context.function_call_id)
+            if span is not None:
+                failed = isinstance(result, dict) and "error" in result
+                span.end(status="error" if failed else "ok", result_bytes=_payload_bytes(result))
+        return None
+
+    async def on_tool_error_callback(self, *, tool: BaseTool, tool_args: dict[str, Any], tool_context: ToolContext, error: Exception):
+        trace = _trace.get()
+        if trace is not None:
+            span = trace.end_tool(tool_context.function_call_id)
+            if span is not None:
+                span.end(status="error", error=str(error))
+        return None
+
+
+def _percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = q * (len(values) - 1)
+    lower, upper = int(index), min(int(index) + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (index - lower)
+
+
+def summarize(path: str, since: Optional[float] = None) -> list[dict]:
+    """
+    Aggregates the spans of the traces in `path` (optionally only those started in
+    the last `since` hours) by kind and name: count, errors, p50/p95/max duration,
+    tokens, payload bytes and cache hits.
+    """
+    cutoff = time.time() - since * 3600 if since else 0
+    groups: dict[tuple[str, str], dict] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                spans = json.loads(line)["spans"]
+            except (ValueError, KeyError):
+                continue
+            if not spans or spans[0]["started_at"] < cutoff:
+                continue
+            for span in spans:
+                group = groups.setdefault((span["kind"], span["name"]), {"durations": [], "errors": 0, "counters": {}})
+                if span["duration"] is not None:
+                    group["durations"].append(span["duration"])
+                if span["status"] == "error":
+                    group["errors"] += 1
+                for key, value in span["attributes"].items():
+                    if isinstance(value, (int, float)) and not isinstance(value, bool) and (
+                        key.endswith(("_tokens", "_bytes", "_hits", "_misses"))
+                    ):
+                        group["counters"][key] = group["counters"].get(key, 0) + value
+    rows = []
+    for (kind, name), group in groups.items():
+        durations = group["durations"]
+        rows.append({
+            "kind": kind,
+            "name": name,
+            "count": len(durations),
+            "errors": group["errors"],
+            "p50": _percentile(durations, 0.5),
+            "p95": _percentile(durations, 0.95),
+            "max": max(durations, default=0.0),
+            **group["counters"],
+        })
+    order = {"request": 0, "agent": 1, "llm": 2, "tool": 3}
+    return sorted(rows, key=lambda row: (order.get(row["kind"], 9), -row["p95"]))
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Summarizes agent traces: latency percentiles by agent, LLM and tool.")
+    parser.add_argument("--path", default=trace_sink.path, help="The JSONL trace file.")
+    parser.add_argument("--since", type=float, default=None, help="Only traces started in the last SINCE hours.")
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.path):
+        print(f"No traces at {args.path}", file=sys.stderr)
+        return 1
+
+    rows = summarize(args.path, args.since)
+    print(f"{'kind':<8} {'name':<36} {'count':>6} {'err':>4} {'p50 s':>8} {'p95 s':>8} {'max s':>8}  details")
+    for row in rows:
+        details = ", ".join(
+            f"{key}={value}" for key, value in row.items()
+            if key not in ("kind", "name", "count", "errors", "p50", "p95", "max")
+        )
+        print(
+            f"{row['kind']:<8} {row['name'][:36]:<36} {row['count']:>6} {row['errors']:>4} "
+            f"{row['p50']:>8.2f} {row['p95']:>8.2f} {row['max']:>8.2f}  {details}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,12 +8,25 @@ from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
 
 from apis.log_handler import initialize_loggers
 initialize_loggers()
-from apis.slack import app as slack_app
+from apis.slack import app as slack_app, session_service
+from apis.session_lifecycle import session_lifecycle
 
 async def main():
+    # Expires and compacts old agent sessions in the background
+    maintenance = asyncio.create_task(session_lifecycle.run_forever(session_service))
     # Initializes a handler for the Slack app
     handler = AsyncSocketModeHandler(slack_app, os.environ.get("SLACK_APP_TOKEN"))
-    await handler.start_async()
+    try:
+        await handler.start_async()
+    finally:
+        # Stops the maintenance loop before the last writes
+        maintenance.cancel()
+        try:
+            await maintenance
+        except asyncio.CancelledError:
+            pass
+        # Writes the session events still queued in write-behind mode
+        await session_service.flush()
 
 # Main execution block to run the app with socket mode
 if __name__ == "__main__":
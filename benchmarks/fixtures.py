@@ -0,0 +1,326 @@
+"""
+Recorded network responses for the offline benchmarks.
+
+`network(store, mode)` patches every external boundary the tools cross:
+
+- yfinance: `yf.Ticker(...).<attribute>` and `yf.download(...)`
+- FMP: `requests.get` to financialmodelingprep.com
+- KIS: the balance inquiries of the per-user `KoreaInvestmentAPI`
+- Notion: the client returned by `apis.notion.get_notion_client`
+
+In "record" mode the real services are called and each response is stored with
+its size and latency. In "replay" mode responses come from the store only, and a
+call that was never recorded raises `FixtureMissing`; with `synthetic=True`
+such calls are answered with generated data instead (see benchmarks/synthetic.py).
+Replayed calls can sleep for their recorded latency times `latency_scale`.
+"""
+import os
+import time
+import pickle
+import asyncio
+import logging
+import threading
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, Optional
+from unittest import mock
+
+logger = logging.getLogger("jm.benchmarks.fixtures")
+
+FMP_HOST = "financialmodelingprep.com"
+
+# Account methods of KoreaInvestmentAPI used by the tools
+KIS_METHODS = ("ainquire_domestic_stock_balance", "ainquire_overseas_stock_balance", "ainquire_account_balance")
+
+# `fast_info` is a lazy object; only these fields are recorded
+FAST_INFO_FIELDS = ("currency", "last_price", "previous_close", "market_cap")
+
+
+class FixtureMissing(LookupError):
+    """A replayed call has no recorded response."""
+
+
+class FixtureStore:
+    """
+    A pickle file of recorded responses, keyed by a readable description of the call.
+    Each entry holds the pickled value, its size in bytes and the recorded latency.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._stats: dict[str, dict[str, float]] = {}
+        # Replayed calls that had no recording
+        self.missing: set[str] = set()
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                self.entries = pickle.load(f)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "wb") as f:
+            pickle.dump(self.entries, f)
+
+    def put(self, key: str, value: Any, elapsed: float) -> dict:
+        blob = pickle.dumps(value)
+        entry = {"blob": blob, "bytes": len(blob), "elapsed": elapsed}
+        with self._lock:
+            self.entries.setdefault(key, entry)
+        return entry
+
+    def get(self, key: str) -> Optional[dict]:
+        return self.entries.get(key)
+
+    def count(self, source: str, entry: dict):
+        with self._lock:
+            stats = self._stats.setdefault(source, {"calls": 0, "bytes": 0, "latency": 0.0})
+            stats["calls"] += 1
+            stats["bytes"] += entry["bytes"]
+            stats["latency"] += entry["elapsed"]
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {}
+            self.missing = set()
+
+    def stats(self) -> dict:
+        """Calls, bytes and recorded latency per source since the last reset."""
+        with self._lock:
+            return {source: dict(stats) for source, stats in self._stats.items()}
+
+
+class _Replayer:
+    """Answers one call from the store, recording or synthesizing it as the mode requires."""
+
+    def __init__(self, store: FixtureStore, mode: str, synthetic: bool, latency_scale: float):
+        self.store = store
+        self.mode = mode
+        self.synthetic = synthetic
+        self.latency_scale = latency_scale
+
+    def _entry(self, source: str, key: str, fetch: Callable[[], Any], generate: Callable[[], Any]) -> dict:
+        entry = self.store.get(key)
+        if entry is None:
+            if self.mode == "record":
+                started = time.perf_counter()
+                value = fetch()
+                entry = self.store.put(key, value, time.perf_counter() - started)
+            elif self.synthetic:
+                from benchmarks.synthetic import DEFAULT_LATENCY
+                entry = self.store.put(key, generate(), DEFAULT_LATENCY[source])
+            else:
+                self.store.missing.add(key)
+                raise FixtureMissing(f"No recorded response for {key}. Record it with `python -m benchmarks.replay record`.")
+        self.store.count(source, entry)
+        return entry
+
+    def call(self, source: str, key: str, fetch: Callable[[], Any], generate: Callable[[], Any]) -> Any:
+        entry = self._entry(source, key, fetch, generate)
+        if self.mode != "record" and self.latency_scale:
+            time.sleep(entry["elapsed"] * self.latency_scale)
+        # Every caller gets its own copy, as it would from the network
+        return pickle.loads(entry["blob"])
+
+    async def acall(self, source: str, key: str, fetch: Callable[[], Any], generate: Callable[[], Any]) -> Any:
+        if self.mode == "record" and self.store.get(key) is None:
+            started = time.perf_counter()
+            value = await fetch()
+            self.store.put(key, value, time.perf_counter() - started)
+        entry = self._entry(source, key, lambda: None, generate)
+        if self.mode != "record" and self.latency_scale:
+            await asyncio.sleep(entry["elapsed"] * self.latency_scale)
+        return pickle.loads(entry["blob"])
+
+
+def _call_key(name: str, args: tuple, kwargs: dict) -> str:
+    parts = [repr(list(a) if isinstance(a, (list, tuple)) else a) for a in args]
+    parts += [f"{k}={v!r}" for k, v in sorted(kwargs.items()) if k != "progress"]
+    return f"{name}({', '.join(parts)})"
+
+
+class _FastInfo(dict):
+    """A recorded `fast_info`, readable by key or attribute like the real one."""
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class ReplayTicker:
+    """Stands in for `yf.Ticker`; every attribute read is one recorded call."""
+
+    def __init__(self, replayer: _Replayer, real: type, ticker: str, **kwargs):
+        self._replayer = replayer
+        self._real = real
+        self._ticker = ticker
+        self._kwargs = kwargs
+        self._instance = None
+
+    def _fetch(self, name: str) -> Any:
+        if self._instance is None:
+            self._instance = self._real(self._ticker, **self._kwargs)
+        value = getattr(self._instance, name)
+        if name == "fast_info":
+            value = _FastInfo({field: value.get(field) for field in FAST_INFO_FIELDS})
+        return value
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        from benchmarks import synthetic
+        return self._replayer.call(
+            "yfinance",
+            f"yf.Ticker({self._ticker!r}).{name}",
+            lambda: self._fetch(name),
+            lambda: synthetic.ticker_attribute(self._ticker, name),
+        )
+
+
+class ReplayResponse:
+    """The parts of `requests.Response` the FMP tools read."""
+
+    def __init__(self, status_code: int, content: bytes, url: str):
+        self.status_code = status_code
+        self.content = content
+        self.url = url
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        import json
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+            raise requests.HTTPError(f"{self.status_code} for {self.url}", response=self)
+
+
+class ReplayAccount:
+    """Stands in for a user's `KoreaInvestmentAPI`, replaying its balance inquiries."""
+
+    def __init__(self, replayer: _Replayer, user_id: str, real_factory: Callable[[], Any]):
+        self._replayer = replayer
+        self._user_id = user_id
+        self._real_factory = real_factory
+        self._real = None
+
+    def _account(self):
+        if self._real is None:
+            self._real = self._real_factory()
+            if self._real is None:
+                raise FixtureMissing(f"Recording needs a KIS profile at profiles/{self._user_id}.json")
+        return self._real
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in KIS_METHODS:
+            raise AttributeError(name)
+        from benchmarks import synthetic
+
+        async def inquire():
+            return await self._replayer.acall(
+                "kis",
+                f"kis.{name}()",
+                lambda: getattr(self._account(), name)(),
+                lambda: synthetic.kis_response(name),
+            )
+        return inquire
+
+
+class ReplayNotion:
+    """Stands in for `notion_client.Client`: `notion.<endpoint>.<method>(**kwargs)`."""
+
+    def __init__(self, replayer: _Replayer, real_factory: Callable[[], Any], path: tuple[str, ...] = ()):
+        self._replayer = replayer
+        self._real_factory = real_factory
+        self._path = path
+
+    def __getattr__(self, name: str) -> "ReplayNotion":
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return ReplayNotion(self._replayer, self._real_factory, self._path + (name,))
+
+    def __call__(self, **kwargs) -> Any:
+        from benchmarks import synthetic
+
+        def fetch():
+            target = self._real_factory()
+            for name in self._path:
+                target = getattr(target, name)
+            return target(**kwargs)
+
+        # Page titles carry a timestamp, so calls are keyed by endpoint only
+        endpoint = ".".join(self._path)
+        return self._replayer.call(
+            "notion", f"notion.{endpoint}()", fetch, lambda: synthetic.notion_response(endpoint)
+        )
+
+
+@contextmanager
+def network(
+    store: FixtureStore,
+    mode: str = "replay",
+    synthetic: bool = False,
+    latency_scale: float = 0.0,
+    user_id: str = "benchmark",
+):
+    """
+    Routes the external calls of the tools through `store` while the block runs.
+    `mode` is "record" (call the services and store their responses) or "replay".
+    """
+    import requests
+    import yfinance as yf
+    from apis import notion
+    from apis.user_api_manager import user_api_handler, user_notion_handler
+    from benchmarks import synthetic as generated
+
+    if mode not in ("record", "replay"):
+        raise ValueError(f"Unsupported mode '{mode}'. Use 'record' or 'replay'.")
+    replayer = _Replayer(store, mode, synthetic, latency_scale)
+    real_ticker, real_download, real_get = yf.Ticker, yf.download, requests.get
+    real_account, real_notion = user_api_handler.get_api_for_user, notion.get_notion_client
+
+    def download(*args, **kwargs):
+        return replayer.call(
+            "yfinance",
+            _call_key("yf.download", args, kwargs),
+            lambda: real_download(*args, **kwargs),
+            lambda: generated.download(*args, **kwargs),
+        )
+
+    def get(url, params=None, **kwargs):
+        if FMP_HOST not in url:
+            return real_get(url, params=params, **kwargs)
+        # The API key is not part of the recording
+        query = {k: v for k, v in (params or {}).items() if k != "apikey"}
+
+        def fetch():
+            response = real_get(url, params=params, **kwargs)
+            return (response.status_code, response.content)
+
+        status, content = replayer.call(
+            "fmp", _call_key(f"GET {url}", (), query), fetch, lambda: generated.fmp_response(url, query)
+        )
+        return ReplayResponse(status, content, url)
+
+    def get_account(user_id: str):
+        return ReplayAccount(replayer, user_id, lambda: real_account(user_id))
+
+    def get_notion_client(api_key: str):
+        return ReplayNotion(replayer, lambda: real_notion(api_key))
+
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch.object(yf, "Ticker", lambda ticker, **kw: ReplayTicker(replayer, real_ticker, ticker, **kw)))
+        stack.enter_context(mock.patch.object(yf, "download", download))
+        stack.enter_context(mock.patch.object(requests, "get", get))
+        stack.enter_context(mock.patch.object(user_api_handler, "get_api_for_user", get_account))
+        stack.enter_context(mock.patch.object(notion, "get_notion_client", get_notion_client))
+        if mode == "replay":
+            # Replay needs no credentials; recording uses the real configuration
+            stack.enter_context(mock.patch.object(user_notion_handler, "get_notion_config_for_user", lambda _: ("replay", "replay-db")))
+            stack.enter_context(mock.patch.object(user_notion_handler, "get_public_notion_config", lambda: ("replay", "replay-db")))
+        yield replayer
@@ -0,0 +1,359 @@
+"""
+Micro-benchmarks of the numeric kernels of the tools.
+
+Each case feeds synthetic inputs of a given size (tickers x years of history)
+to one function and measures its CPU time (best of several rounds) and peak
+Python heap (tracemalloc, in a separate round). Results are compared with the
+baselines stored in benchmarks/baselines.json; a case regresses when it is
+slower or larger than its baseline by more than the threshold. Right before
+each case a fixed calibration workload is timed as well, and the baseline CPU
+time is scaled by how much slower or faster that workload ran than when the
+baseline was recorded, so shared or throttled machines do not fail the check.
+
+    python -m benchmarks.micro                      # quick profile, compared with the baselines
+    python -m benchmarks.micro --profile full       # up to 2,000 tickers x 20 years
+    python -m benchmarks.micro --update-baselines   # after an intended change
+    python -m pytest benchmarks/test_micro.py       # the same check as a test suite
+
+The calibration absorbs most of the difference between machines, but baselines
+are best recorded on the machine that runs the check.
+"""
+import gc
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+# (tickers, years) per profile
+PROFILES = {
+    "quick": [(10, 1), (100, 5)],
+    "full": [(10, 1), (100, 5), (500, 10), (2000, 20)],
+}
+
+# Allowed slowdown / growth over the baseline, as a fraction
+TIME_THRESHOLD = float(os.environ.get("MICROBENCH_TIME_THRESHOLD", "0.3"))
+MEMORY_THRESHOLD = float(os.environ.get("MICROBENCH_MEMORY_THRESHOLD", "0.2"))
+# Differences below these are noise, whatever the ratio
+MIN_TIME_DELTA = 0.002
+MIN_MEMORY_DELTA = 1.0
+
+# Rounds per case: at least MIN_ROUNDS, more while the time budget lasts
+MIN_ROUNDS = 3
+MAX_ROUNDS = 20
+ROUND_BUDGET = 1.0
+# Re-measurements of a case that looks regressed before it fails
+CONFIRM_RUNS = 2
+
+
+class Skip(Exception):
+    """A case cannot run here, e.g. because an optional library is missing."""
+
+
+@dataclass
+class Case:
+    """One function at one input size. `setup` builds the inputs and returns the call to time."""
+    function: str
+    tickers: int
+    years: int
+    setup: Callable[[int, int], Callable[[], Any]]
+
+    @property
+    def name(self) -> str:
+        return f"{self.function}[{self.tickers}x{self.years}y]"
+
+
+class StatementSource:
+    """Serves synthetic `.info` and statements in place of `fa_cache`."""
+
+    def __init__(self, tickers: list[str], periods: int):
+        from benchmarks import synthetic
+        self._data = {
+            (ticker, kind): synthetic.statement(ticker, kind, periods)
+            for ticker in tickers for kind in ("income_stmt", "balance_sheet", "cashflow")
+        }
+        self._info = {ticker: synthetic.ticker_attribute(ticker, "info") for ticker in tickers}
+
+    def get(self, kind: str, ticker: str, force_refresh: bool = False) -> Any:
+        return self._info[ticker] if kind == "info" else self._data[(ticker, kind)]
+
+    def get_info(self, ticker: str) -> dict:
+        return self._info[ticker]
+
+
+class PanelSource:
+    """Serves a fixed price panel in place of `price_store`."""
+
+    def __init__(self, panel: pd.DataFrame):
+        self.panel = panel
+
+    def get_closes(self, tickers: list[str], period: str = "1y", auto_adjust: bool = True) -> pd.DataFrame:
+        return self.panel[[ticker for ticker in dict.fromkeys(tickers) if ticker in self.panel.columns]]
+
+
+def _advanced_financial_metrics(tickers: int, years: int) -> Callable[[], Any]:
+    from tools import fa
+    symbols = [f"T{i:04d}" for i in range(tickers)]
+    source = StatementSource(symbols, periods=years)
+
+    def run():
+        with mock.patch.object(fa, "fa_cache", source):
+            return [fa.get_advanced_financial_metrics(symbol) for symbol in symbols]
+    return run
+
+
+def _import_ta():
+    try:
+        from tools import ta
+    except ImportError as e:
+        raise Skip(f"tools.ta cannot be imported: {e}")
+    return ta
+
+
+def _risk_metrics(tickers: int, years: int) -> Callable[[], Any]:
+    from benchmarks.synthetic import price_panel
+    ta = _import_ta()
+    panel, benchmark = price_panel(tickers, years)
+    return lambda: ta._compute_risk_metrics(panel, benchmark, 0.04)
+
+
+def _portfolio_tool(name: str) -> Callable[[int, int], Callable[[], Any]]:
+    """A case of a tools.portfolio_math tool over a portfolio of the whole synthetic panel."""
+    def setup(tickers: int, years: int) -> Callable[[], Any]:
+        from benchmarks.synthetic import price_panel
+        from tools import portfolio_math
+        panel, _ = price_panel(tickers, years)
+        rng = np.random.default_rng(1)
+        portfolio = [{"ticker": ticker, "market_value": float(value)}
+                     for ticker, value in zip(panel.columns, rng.uniform(1e6, 1e8, size=tickers))]
+        source = PanelSource(panel)
+        tool = getattr(portfolio_math, name)
+
+        def run():
+            with mock.patch.object(portfolio_math, "price_store", source):
+                return tool(portfolio)
+        return run
+    return setup
+
+
+def _indicator_bundle(tickers: int, years: int) -> Callable[[], Any]:
+    from benchmarks.synthetic import bars
+    ta = _import_ta()
+    end = pd.Timestamp("2025-12-31")
+    frames = [bars(f"T{i:04d}", end - pd.DateOffset(years=years), end) for i in range(tickers)]
+    spec = [ta._parse_indicator(entry) for entry in ta.DEFAULT_INDICATOR_SPEC]
+
+    def run():
+        return [[ta._compute_indicator(df, name, params) for name, params in spec] for df in frames]
+    return run
+
+
+KERNELS: dict[str, Callable[[int, int], Callable[[], Any]]] = {
+    "get_advanced_financial_metrics": _advanced_financial_metrics,
+    "compute_risk_metrics": _risk_metrics,
+    "get_portfolio_analysis": _portfolio_tool("get_portfolio_analysis"),
+    "get_portfolio_risk": _portfolio_tool("get_portfolio_risk"),
+    "indicator_bundle": _indicator_bundle,
+}
+
+# Per-ticker kernels loop in Python; their largest sizes are not worth the wait
+MAX_TICKERS = {"get_advanced_financial_metrics": 500, "indicator_bundle": 500}
+
+
+def cases(profile: str = "quick", functions: Optional[list[str]] = None) -> list[Case]:
+    return [
+        Case(function, tickers, years, setup)
+        for function, setup in KERNELS.items() if not functions or function in functions
+        for tickers, years in PROFILES[profile] if tickers <= MAX_TICKERS.get(function, tickers)
+    ]
+
+
+def calibrate(rounds: int = 15) -> float:
+    """
+    CPU seconds of a fixed mix of NumPy, pandas and interpreter work, to compare machine speeds.
+    Each part is timed separately and its best round counts, which keeps the sum steady.
+    """
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(1000, 200))
+    frame = pd.DataFrame(values)
+    parts = [
+        lambda: np.corrcoef(values, rowvar=False),
+        lambda: np.maximum.accumulate(np.cumprod(1 + values / 100, axis=0), axis=0),
+        lambda: frame.pct_change().rolling(20).mean(),
+        lambda: sum(float(frame.iat[i % 1000, i % 200]) for i in range(2000)),
+    ]
+    total = 0.0
+    for part in parts:
+        part()
+        times = []
+        for _ in range(rounds):
+            started = time.process_time()
+            part()
+            times.append(time.process_time() - started)
+        total += min(times)
+    return total
+
+
+def measure(case: Case) -> dict:
+    """Best-of-N CPU time and peak traced memory of one case, with the calibration time next to it."""
+    run = case.setup(case.tickers, case.years)
+    calibration = calibrate()
+    run()  # warm-up: imports, caches, first-call allocations
+    times = []
+    # As in timeit: a collection landing in one round would swamp the kernel's own time
+    gc.collect()
+    gc.disable()
+    try:
+        budget_end = time.perf_counter() + ROUND_BUDGET
+        while len(times) < MIN_ROUNDS or (len(times) < MAX_ROUNDS and time.perf_counter() < budget_end):
+            started = time.process_time()
+            run()
+            times.append(time.process_time() - started)
+    finally:
+        gc.enable()
+
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "cpu_s": round(min(times), 6),
+        "cpu_median_s": round(float(np.median(times)), 6),
+        "rounds": len(times),
+        "peak_mb": round(peak / 1024 / 1024, 3),
+        "calibration_s": round(calibration, 6),
+    }
+
+
+def scaled_baseline(result: dict, baseline: dict) -> float:
+    """The baseline CPU time at the machine speed of `result`, by the ratio of their calibration times."""
+    if not baseline.get("calibration_s"):
+        return baseline["cpu_s"]
+    return baseline["cpu_s"] * result["calibration_s"] / baseline["calibration_s"]
+
+
+def compare(result: dict, baseline: Optional[dict], time_threshold: float = TIME_THRESHOLD,
+            memory_threshold: float = MEMORY_THRESHOLD) -> list[str]:
+    """Returns the regressions of a result against its baseline (none without a baseline)."""
+    if not baseline:
+        return []
+    problems = []
+    cpu, base_cpu = result["cpu_s"], scaled_baseline(result, baseline)
+    if cpu > base_cpu * (1 + time_threshold) and cpu - base_cpu > MIN_TIME_DELTA:
+        problems.append(f"CPU time {cpu * 1000:.1f} ms vs baseline {base_cpu * 1000:.1f} ms (+{cpu / base_cpu - 1:.0%})")
+    peak, base_peak = result["peak_mb"], baseline["peak_mb"]
+    if peak > base_peak * (1 + memory_threshold) and peak - base_peak > MIN_MEMORY_DELTA:
+        problems.append(f"peak memory {peak:.1f} MB vs baseline {base_peak:.1f} MB (+{peak / base_peak - 1:.0%})")
+    return problems
+
+
+def _measure_fresh(function: str, tickers: int, years: int) -> dict:
+    return measure(Case(function, tickers, years, KERNELS[function]))
+
+
+def check(case: Case, baseline: Optional[dict], time_threshold: float = TIME_THRESHOLD,
+          memory_threshold: float = MEMORY_THRESHOLD) -> tuple[dict, list[str]]:
+    """
+    Measures a case and compares it with its baseline. A regression is measured
+    again in a fresh process before it counts: shared machines slow down for
+    seconds at a time, and the speed of Python code varies with the memory
+    layout of the process.
+    """
+    result = measure(case)
+    problems = compare(result, baseline, time_threshold, memory_threshold)
+    for _ in range(CONFIRM_RUNS):
+        if not problems:
+            break
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            retry = pool.submit(_measure_fresh, case.function, case.tickers, case.years).result()
+        retry_problems = compare(retry, baseline, time_threshold, memory_threshold)
+        if len(retry_problems) <= len(problems):
+            result, problems = retry, retry_problems
+    return result, problems
+
+
+def load_baselines(path: str = BASELINES_PATH) -> dict:
+    """Baselines per case name: {"cpu_s", "peak_mb", "calibration_s"}."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("cases", {})
+
+
+def save_baselines(results: dict[str, dict], path: str = BASELINES_PATH):
+    """Merges `results` into the baselines file, keeping the cases that were not run."""
+    baselines = load_baselines(path)
+    baselines.update({
+        name: {"cpu_s": r["cpu_s"], "peak_mb": r["peak_mb"], "calibration_s": r["calibration_s"]}
+        for name, r in results.items()
+    })
+    document = {
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+        },
+        "cases": dict(sorted(baselines.items())),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+        f.write("\n")
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the numeric tool kernels.")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick", help="Input sizes to run.")
+    parser.add_argument("--function", action="append", choices=sorted(KERNELS), help="Only this function (repeatable).")
+    parser.add_argument("--update-baselines", action="store_true", help="Store the results as the new baselines.")
+    parser.add_argument("--time-threshold", type=float, default=TIME_THRESHOLD, help="Allowed CPU time increase (fraction).")
+    parser.add_argument("--memory-threshold", type=float, default=MEMORY_THRESHOLD, help="Allowed peak memory increase (fraction).")
+    parser.add_argument("--baselines", default=BASELINES_PATH, help="The baselines file.")
+    args = parser.parse_args(argv)
+
+    baselines = load_baselines(args.baselines)
+    results, regressions = {}, 0
+    print(f"{'case':<48} {'cpu ms':>10} {'median ms':>10} {'rounds':>6} {'peak MB':>9} {'baseline ms':>12}  status")
+    for case in cases(args.profile, args.function):
+        baseline = None if args.update_baselines else baselines.get(case.name)
+        try:
+            result, problems = check(case, baseline, args.time_threshold, args.memory_threshold)
+        except Skip as e:
+            print(f"{case.name:<48} {'':>10} {'':>10} {'':>6} {'':>9} {'':>12}  skipped: {e}")
+            continue
+        results[case.name] = result
+        regressions += bool(problems)
+        status = "; ".join(problems) if problems else ("ok" if baseline else "no baseline")
+        base_ms = f"{scaled_baseline(result, baseline) * 1000:>12.2f}" if baseline else f"{'-':>12}"
+        print(
+            f"{case.name:<48} {result['cpu_s'] * 1000:>10.2f} {result['cpu_median_s'] * 1000:>10.2f} "
+            f"{result['rounds']:>6} {result['peak_mb']:>9.2f} {base_ms}  {status}"
+        )
+
+    if args.update_baselines:
+        save_baselines(results, args.baselines)
+        print(f"\nBaselines of {len(results)} cases written to {args.baselines}")
+        return 0
+    if regressions:
+        print(f"\n{regressions} case(s) regressed beyond the threshold.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""
+Offline replay benchmark of the agent pipeline.
+
+Runs each scenario of benchmarks/scenarios.py end to end (Runner, plugins,
+session resolver, AgentTools, tools and caches) with a scripted LLM and the
+external services replayed from recorded fixtures, and reports per run the wall
+time, LLM and tool call counts, prompt tokens, network calls and bytes, cache
+hits and peak memory. Every scenario runs in a fresh process with empty caches,
+so the first run is cold and the following ones are warm.
+
+Record the fixtures once (this calls yfinance, FMP, KIS and Notion for real;
+the portfolio scenario needs a KIS profile at profiles/<user-id>.json):
+
+    python -m benchmarks.replay record --user-id U012ABCDE
+
+Then replay them as often as needed:
+
+    python -m benchmarks.replay run [--scenario portfolio] [--repeat 3] [--latency-scale 1]
+
+`--synthetic` replays generated data for every call that was not recorded,
+which needs no fixtures at all (`--holdings N` sets the size of the generated
+portfolio). Recordings hold account data and are not committed.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import tracemalloc
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from benchmarks.scenarios import SCENARIOS
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def _prepare_environment(workdir: str, mode: str):
+    """Points every cache at an empty directory. Must run before the agents are imported."""
+    os.environ.update({
+        "FA_CACHE_PATH": os.path.join(workdir, "fundamentals.db"),
+        "PRICE_STORE_PATH": os.path.join(workdir, "market_data.db"),
+        "REPORT_CACHE_PATH": os.path.join(workdir, "report_cache.db"),
+        "AGENT_SESSION_DB_PATH": os.path.join(workdir, "agent_sessions.db"),
+        "TRACE_PATH": os.path.join(workdir, "traces.jsonl"),
+        "TRACING_ENABLED": "true",
+    })
+    if mode == "replay":
+        os.environ["KIS_TOKEN_STORE_PATH"] = os.path.join(workdir, "kis_tokens.db")
+        os.environ.setdefault("FMP_API_KEY", "replay")
+        os.environ.setdefault("GOOGLE_API_KEY", "replay")
+
+
+def _last_trace(path: str) -> list[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    return json.loads(lines[-1])["spans"] if lines else []
+
+
+def _trace_metrics(spans: list[dict]) -> dict:
+    metrics = {"agent_runs": 0, "llm_calls": 0, "tool_calls": 0, "tool_errors": 0,
+               "prompt_tokens": 0, "tool_result_bytes": 0, "cache_hits": 0, "cache_misses": 0}
+    tools: dict[str, int] = {}
+    for span in spans:
+        attributes = span["attributes"]
+        if span["kind"] == "agent":
+            metrics["agent_runs"] += 1
+        elif span["kind"] == "llm":
+            metrics["llm_calls"] += 1
+            metrics["prompt_tokens"] += attributes.get("prompt_tokens") or 0
+        elif span["kind"] == "tool":
+            metrics["tool_calls"] += 1
+            metrics["tool_errors"] += span["status"] == "error"
+            metrics["tool_result_bytes"] += attributes.get("result_bytes") or 0
+            tools[span["name"]] = tools.get(span["name"], 0) + 1
+        for key, value in attributes.items():
+            if key.endswith("_hits"):
+                metrics["cache_hits"] += value
+            elif key.endswith("_misses"):
+                metrics["cache_misses"] += value
+    metrics["tools"] = dict(sorted(tools.items()))
+    return metrics
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Kilobytes on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def run_scenario(name: str, options: dict) -> list[dict]:
+    """Runs one scenario `options["repeat"]` times in this process and returns one result per run."""
+    logging.basicConfig(level=options["log_level"])
+    with tempfile.TemporaryDirectory(prefix=f"jm-bench-{name}-", ignore_cleanup_errors=True) as workdir:
+        _prepare_environment(workdir, options["mode"])
+        return _run_scenario(name, options)
+
+
+def _run_scenario(name: str, options: dict) -> list[dict]:
+
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+    from agents.root_agent import agent as root_agent
+    from apis import tracing
+    from apis.agent_handler import APP_NAME, call_agent_async, get_plugins
+    from apis.session_resolver import SessionResolver
+    from benchmarks import scripted_llm, synthetic
+    from benchmarks.fixtures import FixtureStore, network
+
+    scenario = SCENARIOS[name]
+    synthetic.portfolio_size = options["holdings"]
+    store = FixtureStore(os.path.join(options["fixtures"], f"{name}.pkl"))
+    scripted_llm.install(root_agent, scenario.all_scripts(), latency=options["llm_latency"])
+    session_service = InMemorySessionService()
+    resolver = SessionResolver(session_service, APP_NAME)
+    runner = Runner(agent=root_agent, app_name=APP_NAME, session_service=session_service, plugins=get_plugins())
+
+    async def run_all() -> list[dict]:
+        results = []
+        for i in range(options["repeat"]):
+            store.reset_stats()
+            if options["tracemalloc"]:
+                tracemalloc.start()
+            started = time.perf_counter()
+            answer = await call_agent_async(
+                scenario.query, resolver, runner, options["user_id"], f"bench-{name}-{i}", is_dm=True
+            )
+            wall = time.perf_counter() - started
+            heap_peak = None
+            if options["tracemalloc"]:
+                heap_peak = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+                tracemalloc.stop()
+            network_stats = store.stats()
+            results.append({
+                "scenario": name,
+                "run": i + 1,
+                "cache": "cold" if i == 0 else "warm",
+                "wall_s": round(wall, 3),
+                **_trace_metrics(_last_trace(tracing.trace_sink.path)),
+                "network_calls": sum(int(s["calls"]) for s in network_stats.values()),
+                "network_bytes": sum(int(s["bytes"]) for s in network_stats.values()),
+                "network": network_stats,
+                "missing_fixtures": sorted(store.missing),
+                "answer_chars": len(answer or ""),
+                "peak_rss_mb": _peak_rss_mb(),
+                "heap_peak_mb": heap_peak,
+            })
+        return results
+
+    with network(store, mode=options["mode"], synthetic=options["synthetic"],
+                 latency_scale=options["latency_scale"], user_id=options["user_id"]):
+        results = asyncio.run(run_all())
+    if options["mode"] == "record":
+        store.save()
+    return results
+
+
+def print_report(results: list[dict]):
+    header = (f"{'scenario':<15} {'run':>3} {'cache':<5} {'wall s':>8} {'llm':>4} {'tools':>5} {'err':>4} "
+              f"{'prompt tok':>10} {'net calls':>9} {'net KB':>8} {'hits':>5} {'miss':>5} {'rss MB':>7} {'heap MB':>7}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        heap = f"{r['heap_peak_mb']:>7.1f}" if r["heap_peak_mb"] is not None else f"{'-':>7}"
+        rss = f"{r['peak_rss_mb']:>7.1f}" if r["peak_rss_mb"] is not None else f"{'-':>7}"
+        print(
+            f"{r['scenario']:<15} {r['run']:>3} {r['cache']:<5} {r['wall_s']:>8.3f} {r['llm_calls']:>4} "
+            f"{r['tool_calls']:>5} {r['tool_errors']:>4} {r['prompt_tokens']:>10} {r['network_calls']:>9} "
+            f"{r['network_bytes'] / 1024:>8.1f} {r['cache_hits']:>5} {r['cache_misses']:>5} {rss} {heap}"
+        )
+    missing = sorted({key for r in results for key in r["missing_fixtures"]})
+    if missing:
+        print(f"\n{len(missing)} calls had no recorded response (record them, or pass --synthetic):", file=sys.stderr)
+        for key in missing[:20]:
+            print(f"  {key}", file=sys.stderr)
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Offline replay benchmark of the agent pipeline.")
+    parser.add_argument("mode", choices=["run", "record"], help="Replay the fixtures, or record them from the real services.")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Scenario to run (repeatable). Defaults to all.")
+    parser.add_argument("--repeat", type=int, default=2, help="Runs per scenario; the first one is cold.")
+    parser.add_argument("--holdings", type=int, default=6, help="Holdings of the generated portfolio (--synthetic).")
+    parser.add_argument("--synthetic", action="store_true", help="Answer calls without a recording with generated data.")
+    parser.add_argument("--latency-scale", type=float, default=0.0, help="Sleep for the recorded latency of each call times this factor.")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds each scripted LLM turn takes.")
+    parser.add_argument("--tracemalloc", action="store_true", help="Also measure the peak Python heap (slows the runs down).")
+    parser.add_argument("--user-id", default="benchmark", help="User whose KIS and Notion profile is used when recording.")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="Directory of the recorded fixtures.")
+    parser.add_argument("--json", help="Also write the results to this file.")
+    parser.add_argument("--log-level", default="ERROR", help="Log level of the runs.")
+    args = parser.parse_args(argv)
+
+    options = {
+        "mode": "record" if args.mode == "record" else "replay",
+        "repeat": 1 if args.mode == "record" else max(1, args.repeat),
+        "holdings": args.holdings,
+        "synthetic": args.synthetic,
+        "latency_scale": args.latency_scale,
+        "llm_latency": args.llm_latency,
+        "tracemalloc": args.tracemalloc,
+        "user_id": args.user_id,
+        "fixtures": args.fixtures,
+        "log_level": args.log_level.upper(),
+    }
+    results = []
+    for name in args.scenario or sorted(SCENARIOS):
+        # A fresh process per scenario: empty caches and its own peak memory
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results += pool.submit(run_scenario, name, options).result()
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    return 1 if any(r["missing_fixtures"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Benchmark scenarios: the user query and the scripted turns of every agent involved.
+
+The scripts follow the workflows the agent instructions ask for, so the tools
+see the same calls (and the same parallelism) as in a real run.
+"""
+from dataclasses import dataclass, field
+from typing import Any
+
+from benchmarks.scripted_llm import ScriptContext, Turn
+
+STATEMENT_ITEMS = ["Total Revenue", "Operating Income", "Net Income", "Total Assets", "Free Cash Flow"]
+
+# Overseas holdings are valued in KRW at a fixed rate, as the agent would after looking it up
+USD_KRW = 1400.0
+
+
+def _result(response: Any) -> Any:
+    """The payload of a tool response; ADK wraps non-dict results as {"result": ...}."""
+    if isinstance(response, dict) and set(response) == {"result"}:
+        return response["result"]
+    return response
+
+
+def _report(title: str) -> str:
+    return (
+        f"# {{ticker}} {title}\n\n"
+        "## 요약\n"
+        "- 종합 의견: 보유\n"
+        "- 핵심 근거: 수익성 개선과 안정적인 현금흐름\n\n"
+        "## 상세\n"
+        "| 항목 | 평가 |\n|---|---|\n| 밸류에이션 | 적정 |\n| 추세 | 상승 |\n| 뉴스 심리 | 중립 |\n"
+    )
+
+
+def _holdings(context: ScriptContext) -> list[dict]:
+    portfolio = _result(context.responses.get("get_current_portfolio")) or {}
+    holdings = [
+        {"ticker": f"{stock['ticker']}.KS", "market_value": stock["evaluation_amount"]}
+        for stock in portfolio.get("domestic_stocks", [])
+    ]
+    holdings += [
+        {"ticker": stock["ticker"], "market_value": stock["evaluation_amount"] * USD_KRW}
+        for stock in portfolio.get("overseas_stocks", [])
+    ]
+    return [holding for holding in holdings if holding["market_value"] > 0]
+
+
+def _candidates(context: ScriptContext, count: int = 3) -> list[str]:
+    results = _result(context.responses.get("run_screener_query"))
+    if not isinstance(results, list):
+        return []
+    ranked = sorted(results, key=lambda row: row.get("marketCap") or 0, reverse=True)
+    return [row["symbol"] for row in ranked[:count]]
+
+
+# Agents shared by every scenario
+ANALYST_SCRIPTS: dict[str, list[Turn]] = {
+    "SingleAssetAnalyzer": [
+        lambda c: [
+            ("FundamentalAnalyzer", {"request": c.ticker}),
+            ("TechnicalAnalyzer", {"request": c.ticker}),
+            ("StockNewsAnalyzer", {"request": c.ticker}),
+        ],
+        _report("종합 분석 보고서"),
+    ],
+    "FundamentalAnalyzer": [
+        lambda c: [("get_fundamental_snapshot", {"ticker": c.ticker})],
+        lambda c: [
+            ("get_income_statement", {"ticker": c.ticker, "line_items": STATEMENT_ITEMS}),
+            ("get_balance_sheet", {"ticker": c.ticker}),
+            ("get_cash_flow", {"ticker": c.ticker, "period": "quarterly"}),
+        ],
+        _report("펀더멘털 분석"),
+    ],
+    "TechnicalAnalyzer": [
+        lambda c: [("get_technical_snapshot", {"ticker": c.ticker})],
+        _report("기술적 분석"),
+    ],
+    "StockNewsAnalyzer": [
+        lambda c: [("get_company_news", {"ticker": c.ticker})],
+        _report("뉴스 분석"),
+    ],
+}
+
+
+def _delegate(agent: str, request: str) -> list[Turn]:
+    """Root script: hand the request to one agent, then relay its answer."""
+    return [
+        lambda c: [(agent, {"request": request.format(ticker=c.ticker)})],
+        lambda c: str(_result(c.responses.get(agent)) or "").replace("{", "{{").replace("}", "}}"),
+    ]
+
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    query: str
+    scripts: dict[str, list[Turn]] = field(default_factory=dict)
+
+    def all_scripts(self) -> dict[str, list[Turn]]:
+        return {**ANALYST_SCRIPTS, **self.scripts}
+
+
+SCENARIOS = {
+    "single_asset": Scenario(
+        name="single_asset",
+        description="Comprehensive report on one stock",
+        query="AAPL 종목을 종합적으로 분석해줘",
+        scripts={"JellyMonster": _delegate("SingleAssetAnalyzer", "{ticker}")},
+    ),
+    "portfolio": Scenario(
+        name="portfolio",
+        description="Rebalancing plan for the user's KIS account",
+        query="내 포트폴리오를 분석하고 리밸런싱 방안을 알려줘",
+        scripts={
+            "JellyMonster": _delegate("PortfolioAnalyzer", "내 포트폴리오를 분석하고 리밸런싱 방안을 알려줘"),
+            "PortfolioAnalyzer": [
+                [("get_current_portfolio", {})],
+                lambda c: [
+                    ("get_portfolio_analysis", {"portfolio": _holdings(c)}),
+                    ("get_portfolio_risk", {"portfolio": _holdings(c)}),
+                    ("get_risk_metrics_batch", {"tickers": [h["ticker"] for h in _holdings(c)]}),
+                ],
+                lambda c: [("analyze_holdings", {"tickers": [h["ticker"] for h in _holdings(c)]})],
+                "# 포트폴리오 리밸런싱 제안\n\n- 집중도: 보통\n- 상관관계가 높은 종목 비중 축소\n- 현금 비중 유지\n",
+            ],
+        },
+    ),
+    "recommendation": Scenario(
+        name="recommendation",
+        description="Screen for large-cap tech stocks and compare the top candidates",
+        query="시가총액 1000억 달러 이상인 미국 기술주 중에서 볼린저 밴드 하단에 가까운 종목을 추천해줘",
+        scripts={
+            "JellyMonster": _delegate("Recommender", "시가총액 1000억 달러 이상 미국 기술주 중 볼린저 밴드 하단 근처 종목 추천"),
+            "Recommender": [
+                [("run_screener_query", {"sector": "Technology", "market_cap_more_than": 100_000_000_000, "country": "US", "limit": 20})],
+                lambda c: [
+                    ("get_technical_indicator", {"symbol": symbol, "period": 20, "indicator_type": indicator})
+                    for symbol in _candidates(c)
+                    for indicator in ("sma", "standardDeviation")
+                ],
+                lambda c: [("SingleAssetAnalyzer", {"request": symbol}) for symbol in _candidates(c)],
+                "# 추천 종목\n\n1. 최우선 추천 종목과 근거\n2. 후보별 장단점 비교\n",
+            ],
+        },
+    ),
+    "notion_report": Scenario(
+        name="notion_report",
+        description="Report on one stock saved to Notion",
+        query="MSFT 분석 보고서를 노션에 저장해줘",
+        scripts={
+            "JellyMonster": [
+                lambda c: [("SingleAssetAnalyzer", {"request": c.ticker})],
+                lambda c: [("create_notion_page", {
+                    "title": f"{c.ticker} 분석 보고서",
+                    "content": str(_result(c.responses.get("SingleAssetAnalyzer")) or ""),
+                })],
+                "노션에 보고서를 저장했습니다.",
+            ],
+        },
+    ),
+}
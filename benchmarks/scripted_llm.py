@@ -0,0 +1,147 @@
+"""
+A stand-in LLM that follows a script instead of calling Gemini.
+
+Each agent gets a list of turns. Turn N of a run is played once the agent has
+made N tool-calling turns since its request. A turn is the final text answer
+(a string) or a list of `(tool name, args)` calls, issued together; either can
+instead be a callable of the `ScriptContext`, to build arguments from the
+request or from earlier tool responses. Once the script is exhausted the agent
+answers with a short generic report.
+"""
+import json
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, Callable, Optional, Union
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.tools.agent_tool import AgentTool
+from google.genai import types
+
+from tools.market_session import find_tickers
+
+Call = tuple[str, dict]
+Turn = Union[str, list[Call], Callable[["ScriptContext"], Union[str, list[Call]]]]
+
+# Same estimate the tools use for their token budgets
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class ScriptContext:
+    """What a scripted turn can see: the agent's request and the latest response of each tool."""
+    agent: str
+    request: str
+    responses: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def ticker(self) -> str:
+        tickers = find_tickers(self.request)
+        return tickers[0] if tickers else self.request.strip()
+
+
+def _part_chars(part: types.Part) -> int:
+    if part.text:
+        return len(part.text)
+    if part.function_call:
+        return len(json.dumps(part.function_call.args or {}, default=str, ensure_ascii=False))
+    if part.function_response:
+        return len(json.dumps(part.function_response.response or {}, default=str, ensure_ascii=False))
+    return 0
+
+
+class ScriptedLlm(BaseLlm):
+    """
+    Plays an agent's script. The model name keeps the "gemini-" prefix so that
+    Gemini-only built-in tools (google_search) still accept it.
+    """
+
+    model: str = "gemini-2.5-flash-scripted"
+    agent_name: str = ""
+    turns: list[Any] = []
+    latency: float = 0.0
+
+    def _context(self, llm_request: LlmRequest) -> tuple[ScriptContext, int]:
+        contents = llm_request.contents or []
+        # The request is the last user message with text; every model turn with calls after it is one step
+        start = 0
+        for i, content in enumerate(contents):
+            if content.role == "user" and any(part.text for part in content.parts or []):
+                start = i
+        request = " ".join(part.text for part in contents[start].parts or [] if part.text) if contents else ""
+        context = ScriptContext(agent=self.agent_name, request=request)
+        step = 0
+        for content in contents[start + 1:]:
+            parts = content.parts or []
+            if content.role == "model" and any(part.function_call for part in parts):
+                step += 1
+            for part in parts:
+                if part.function_response:
+                    context.responses[part.function_response.name] = part.function_response.response
+        return context, step
+
+    def _turn(self, context: ScriptContext, step: int) -> Union[str, list[Call]]:
+        if step >= len(self.turns):
+            return f"## {self.agent_name} report\n\n- Request: {context.request[:200]}\n- Tools called: {len(context.responses)}"
+        turn = self.turns[step]
+        if callable(turn):
+            turn = turn(context)
+        if isinstance(turn, str):
+            return turn.format(request=context.request, ticker=context.ticker, agent=self.agent_name)
+        return turn
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        context, step = self._context(llm_request)
+        turn = self._turn(context, step)
+        if isinstance(turn, str):
+            parts = [types.Part(text=turn)]
+        else:
+            parts = [types.Part(function_call=types.FunctionCall(name=name, args=args)) for name, args in turn]
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        system = llm_request.config.system_instruction if llm_request.config else None
+        prompt_chars = len(system) if isinstance(system, str) else 0
+        prompt_chars += sum(_part_chars(part) for content in llm_request.contents or [] for part in content.parts or [])
+        yield LlmResponse(
+            content=types.Content(role="model", parts=parts),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_chars // CHARS_PER_TOKEN,
+                candidates_token_count=sum(_part_chars(part) for part in parts) // CHARS_PER_TOKEN,
+            ),
+        )
+
+
+def walk_agents(agent: BaseAgent, seen: Optional[dict[str, BaseAgent]] = None) -> dict[str, BaseAgent]:
+    """Every agent reachable from `agent` through sub-agents and AgentTools, by name."""
+    seen = {} if seen is None else seen
+    if agent.name in seen:
+        return seen
+    seen[agent.name] = agent
+    for sub_agent in agent.sub_agents:
+        walk_agents(sub_agent, seen)
+    for tool in getattr(agent, "tools", []):
+        if isinstance(tool, AgentTool):
+            walk_agents(tool.agent, seen)
+    return seen
+
+
+def install(root: BaseAgent, scripts: dict[str, list[Turn]], latency: float = 0.0) -> dict[str, Any]:
+    """
+    Replaces the model of every LLM agent under `root` with its script.
+    Returns the original models, for `restore`.
+    """
+    originals = {}
+    for name, agent in walk_agents(root).items():
+        if isinstance(agent, LlmAgent):
+            originals[name] = agent.model
+            agent.model = ScriptedLlm(agent_name=name, turns=list(scripts.get(name, [])), latency=latency)
+    return originals
+
+
+def restore(root: BaseAgent, originals: dict[str, Any]):
+    for name, agent in walk_agents(root).items():
+        if name in originals:
+            agent.model = originals[name]
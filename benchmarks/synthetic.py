@@ -0,0 +1,377 @@
+"""
+Deterministic stand-ins for the external services, used by `--synthetic` replays,
+and input frames of any size for the micro-benchmarks (`statement`, `price_panel`).
+
+They only need to look like the real responses to the code that parses them:
+the same shapes, field names and rough sizes (a year of daily bars, a few dozen
+statement line items over four periods, ...). Values are seeded by ticker, so a
+run is reproducible.
+"""
+import json
+import zlib
+from datetime import date, datetime, timedelta
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+# Typical latency of each service, replayed with --latency-scale
+DEFAULT_LATENCY = {"yfinance": 0.4, "fmp": 0.3, "kis": 0.25, "notion": 0.5}
+
+DOMESTIC_HOLDINGS = ["005930", "000660", "035420", "051910", "005380", "035720", "068270", "105560"]
+OVERSEAS_HOLDINGS = ["AAPL", "MSFT", "NVDA", "GOOGL", "AMZN", "META", "TSLA", "AVGO", "JPM", "V", "COST", "NFLX"]
+
+# Number of holdings in the synthetic account; set by the benchmark runner
+portfolio_size = 6
+
+INCOME_ITEMS = [
+    "Total Revenue", "Operating Revenue", "Cost Of Revenue", "Gross Profit", "Operating Expense",
+    "Selling General And Administration", "Research And Development", "Operating Income", "EBIT", "EBITDA",
+    "Normalized EBITDA", "Interest Expense", "Interest Income", "Net Interest Income", "Other Income Expense",
+    "Pretax Income", "Tax Provision", "Tax Rate For Calcs", "Net Income", "Net Income Common Stockholders",
+    "Diluted NI Availto Com Stockholders", "Basic EPS", "Diluted EPS", "Basic Average Shares",
+    "Diluted Average Shares", "Total Expenses", "Reconciled Depreciation", "Normalized Income",
+]
+BALANCE_ITEMS = [
+    "Total Assets", "Current Assets", "Cash And Cash Equivalents", "Cash Cash Equivalents And Short Term Investments",
+    "Other Short Term Investments", "Receivables", "Accounts Receivable", "Inventory", "Other Current Assets",
+    "Total Non Current Assets", "Net PPE", "Gross PPE", "Accumulated Depreciation", "Goodwill And Other Intangible Assets",
+    "Investments And Advances", "Total Liabilities Net Minority Interest", "Current Liabilities", "Accounts Payable",
+    "Current Debt", "Long Term Debt", "Total Debt", "Net Debt", "Total Non Current Liabilities Net Minority Interest",
+    "Stockholders Equity", "Common Stock Equity", "Retained Earnings", "Total Capitalization", "Working Capital",
+    "Invested Capital", "Tangible Book Value", "Share Issued", "Ordinary Shares Number", "Treasury Shares Number",
+]
+CASHFLOW_ITEMS = [
+    "Operating Cash Flow", "Net Income From Continuing Operations", "Depreciation And Amortization", "Depreciation",
+    "Stock Based Compensation", "Change In Working Capital", "Change In Receivables", "Change In Inventory",
+    "Change In Payable", "Investing Cash Flow", "Capital Expenditure", "Purchase Of PPE", "Purchase Of Investment",
+    "Sale Of Investment", "Financing Cash Flow", "Repurchase Of Capital Stock", "Cash Dividends Paid",
+    "Issuance Of Debt", "Repayment Of Debt", "End Cash Position", "Beginning Cash Position", "Free Cash Flow",
+]
+
+STATEMENTS = {
+    "income_stmt": (INCOME_ITEMS, "annual"),
+    "balance_sheet": (BALANCE_ITEMS, "annual"),
+    "cashflow": (CASHFLOW_ITEMS, "annual"),
+    "quarterly_income_stmt": (INCOME_ITEMS, "quarterly"),
+    "quarterly_balance_sheet": (BALANCE_ITEMS, "quarterly"),
+    "quarterly_cashflow": (CASHFLOW_ITEMS, "quarterly"),
+}
+
+
+def _rng(*key: Any) -> np.random.Generator:
+    return np.random.default_rng(zlib.crc32(repr(key).encode()))
+
+
+def _is_korean(ticker: str) -> bool:
+    return ticker.endswith((".KS", ".KQ")) or ticker in ("^KS11", "^KQ11")
+
+
+def _period_ends(period: str, count: int = 4) -> list[pd.Timestamp]:
+    today = pd.Timestamp(date.today())
+    if period == "annual":
+        last = pd.Timestamp(today.year - 1, 12, 31)
+        return [last - pd.DateOffset(years=i) for i in range(count)]
+    last = (today - pd.offsets.QuarterEnd(1)).normalize()
+    return [last - pd.offsets.QuarterEnd(i) for i in range(count)]
+
+
+def statement(ticker: str, kind: str, periods: int = 4) -> pd.DataFrame:
+    """A financial statement (line items x periods, newest first) as `yf.Ticker.<kind>` returns it."""
+    items, period = STATEMENTS[kind]
+    rng = _rng(ticker, kind)
+    scale = 1e11 if _is_korean(ticker) else 1e9
+    base = rng.uniform(5, 200, size=len(items)) * scale / (4 if period == "quarterly" else 1)
+    growth = (1 - rng.uniform(-0.05, 0.15, size=(len(items), 1))) ** np.arange(periods)
+    values = base[:, None] * growth
+    frame = pd.DataFrame(values, index=items, columns=_period_ends(period, periods))
+    if "Capital Expenditure" in frame.index:
+        frame.loc[["Capital Expenditure", "Purchase Of PPE"]] *= -1
+    return frame
+
+
+def _info(ticker: str) -> dict:
+    rng = _rng(ticker, "info")
+    korean = _is_korean(ticker)
+    price = float(rng.uniform(20_000, 300_000) if korean else rng.uniform(20, 600))
+    shares = float(rng.uniform(1e8, 6e9))
+    annual_end = _period_ends("annual", 1)[0]
+    quarter_end = _period_ends("quarterly", 1)[0]
+    return {
+        "symbol": ticker,
+        "shortName": f"{ticker} Corp",
+        "longName": f"{ticker} Corporation",
+        "sector": "Technology",
+        "industry": "Semiconductors" if korean else "Consumer Electronics",
+        "country": "South Korea" if korean else "United States",
+        "website": f"https://www.{ticker.split('.')[0].lower()}.example.com",
+        "longBusinessSummary": " ".join(
+            f"{ticker} designs, manufactures and markets products and services worldwide (segment {i})." for i in range(12)
+        ),
+        "fullTimeEmployees": int(rng.integers(1_000, 200_000)),
+        "currency": "KRW" if korean else "USD",
+        "exchange": "KSC" if korean else "NMS",
+        "regularMarketPrice": price,
+        "currentPrice": price,
+        "previousClose": price * float(rng.uniform(0.97, 1.03)),
+        "marketCap": price * shares,
+        "enterpriseValue": price * shares * float(rng.uniform(0.9, 1.2)),
+        "sharesOutstanding": shares,
+        "trailingPE": float(rng.uniform(8, 45)),
+        "forwardPE": float(rng.uniform(8, 40)),
+        "pegRatio": float(rng.uniform(0.5, 3)),
+        "priceToBook": float(rng.uniform(0.8, 30)),
+        "trailingEps": price / float(rng.uniform(8, 45)),
+        "forwardEps": price / float(rng.uniform(8, 40)),
+        "dividendYield": float(rng.uniform(0, 4)),
+        "profitMargins": float(rng.uniform(0.02, 0.35)),
+        "operatingMargins": float(rng.uniform(0.05, 0.45)),
+        "returnOnAssets": float(rng.uniform(0.01, 0.25)),
+        "returnOnEquity": float(rng.uniform(0.05, 1.5)),
+        "revenueGrowth": float(rng.uniform(-0.1, 0.4)),
+        "earningsGrowth": float(rng.uniform(-0.2, 0.6)),
+        "currentRatio": float(rng.uniform(0.8, 3)),
+        "debtToEquity": float(rng.uniform(5, 200)),
+        "totalCash": shares * float(rng.uniform(1, 30)),
+        "totalDebt": shares * float(rng.uniform(1, 30)),
+        "beta": float(rng.uniform(0.6, 1.8)),
+        "fiftyTwoWeekHigh": price * 1.25,
+        "fiftyTwoWeekLow": price * 0.7,
+        "targetMeanPrice": price * float(rng.uniform(0.9, 1.4)),
+        "recommendationKey": "buy",
+        "lastFiscalYearEnd": int(annual_end.timestamp()),
+        "mostRecentQuarter": int(quarter_end.timestamp()),
+    }
+
+
+def _recommendations(ticker: str) -> pd.DataFrame:
+    rng = _rng(ticker, "recommendations")
+    counts = rng.integers(0, 25, size=(4, 5))
+    frame = pd.DataFrame(counts, columns=["strongBuy", "buy", "hold", "sell", "strongSell"])
+    frame.insert(0, "period", ["0m", "-1m", "-2m", "-3m"])
+    return frame
+
+
+def _major_holders(ticker: str) -> pd.DataFrame:
+    rng = _rng(ticker, "major_holders")
+    values = [float(rng.uniform(0, 0.1)), float(rng.uniform(0.4, 0.8)), float(rng.uniform(0.4, 0.8)), float(rng.integers(500, 6000))]
+    index = pd.Index(["insidersPercentHeld", "institutionsPercentHeld", "institutionsFloatPercentHeld", "institutionsCount"], name="Breakdown")
+    return pd.DataFrame({"Value": values}, index=index)
+
+
+def _insider_transactions(ticker: str, rows: int = 60) -> pd.DataFrame:
+    rng = _rng(ticker, "insider_transactions")
+    start = pd.Timestamp(date.today())
+    return pd.DataFrame({
+        "Shares": rng.integers(1_000, 500_000, size=rows),
+        "Value": rng.uniform(1e5, 5e7, size=rows).round(),
+        "URL": [f"https://www.sec.gov/Archives/edgar/data/{ticker}/{i:06d}.htm" for i in range(rows)],
+        "Text": [f"Sale at price {p:.2f} per share." for p in rng.uniform(50, 500, size=rows)],
+        "Insider": [f"INSIDER {chr(65 + i % 26)}{i}" for i in range(rows)],
+        "Position": ["Officer" if i % 3 else "Director" for i in range(rows)],
+        "Transaction": ["" for _ in range(rows)],
+        "Start Date": [start - pd.Timedelta(days=int(3 * i)) for i in range(rows)],
+        "Ownership": ["D" if i % 4 else "I" for i in range(rows)],
+    })
+
+
+def _news(ticker: str, count: int = 10) -> list[dict]:
+    now = datetime.utcnow()
+    return [
+        {
+            "id": f"{ticker}-{i}",
+            "content": {
+                "title": f"{ticker} headline number {i}: what investors should know",
+                "summary": f"A summary of the story about {ticker}. " * 6,
+                "pubDate": (now - timedelta(hours=6 * i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "provider": {"displayName": "Synthetic Wire", "url": "https://news.example.com"},
+                "canonicalUrl": {"url": f"https://news.example.com/{ticker.lower()}/{i}"},
+                "clickThroughUrl": {"url": f"https://news.example.com/{ticker.lower()}/{i}"},
+                "thumbnail": {"resolutions": [{"url": f"https://img.example.com/{i}.jpg", "width": 640, "height": 360}]},
+                "link": f"https://news.example.com/{ticker.lower()}/{i}",
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def ticker_attribute(ticker: str, name: str) -> Any:
+    """The value of `yf.Ticker(ticker).<name>`."""
+    if name in STATEMENTS:
+        return statement(ticker, name)
+    if name == "info":
+        return _info(ticker)
+    if name == "fast_info":
+        info = _info(ticker)
+        return {"currency": info["currency"], "last_price": info["currentPrice"],
+                "previous_close": info["previousClose"], "market_cap": info["marketCap"]}
+    if name == "recommendations":
+        return _recommendations(ticker)
+    if name == "major_holders":
+        return _major_holders(ticker)
+    if name == "insider_transactions":
+        return _insider_transactions(ticker)
+    if name == "news":
+        return _news(ticker)
+    raise AttributeError(f"No synthetic data for yf.Ticker.{name}")
+
+
+def bars(ticker: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+    """Daily OHLCV bars of a ticker between two dates, oldest first."""
+    rng = _rng(ticker, "bars")
+    # A fixed path from a fixed origin, so that overlapping downloads agree
+    origin = pd.Timestamp("2000-01-03")
+    days = pd.bdate_range(origin, end)
+    returns = rng.normal(0.0004, 0.018, size=len(days))
+    base = 50_000 if _is_korean(ticker) else 100
+    close = base * np.exp(np.cumsum(returns))
+    spread = np.abs(rng.normal(0, 0.01, size=len(days)))
+    frame = pd.DataFrame({
+        "Close": close,
+        "High": close * (1 + spread),
+        "Low": close * (1 - spread),
+        "Open": close * (1 + rng.normal(0, 0.005, size=len(days))),
+        "Volume": rng.integers(100_000, 20_000_000, size=len(days)),
+    }, index=pd.DatetimeIndex(days, name="Date"))
+    return frame[frame.index >= start]
+
+
+def download(tickers, period: Optional[str] = None, start: Optional[str] = None, interval: str = "1d", **kwargs) -> pd.DataFrame:
+    """The result of `yf.download`: a (Price, Ticker) column MultiIndex, as yfinance returns it."""
+    from tools.price_store import period_start
+
+    symbols = [tickers] if isinstance(tickers, str) else list(tickers)
+    end = pd.Timestamp(date.today())
+    if start is not None:
+        first = pd.Timestamp(start)
+    else:
+        covered = period_start(period or "1mo")
+        first = pd.Timestamp(covered) if covered is not None else pd.Timestamp("2000-01-03")
+    frames = {symbol: bars(symbol, first, end) for symbol in symbols}
+    frame = pd.concat(frames, axis=1)
+    frame.columns = frame.columns.swaplevel(0, 1)
+    frame.columns.names = ["Price", "Ticker"]
+    return frame.sort_index(axis=1, level=0, sort_remaining=False)
+
+
+def price_panel(tickers: int, years: int, seed: int = 0) -> tuple[pd.DataFrame, pd.Series]:
+    """
+    Daily closes of `tickers` synthetic stocks over `years` years (one column each),
+    driven by a common market factor and one of eleven sector factors, and the closes
+    of that market as the benchmark. Idiosyncratic volatility varies, so some stocks of
+    a sector move closely together. A tenth of the stocks list partway through the
+    first year, leaving leading NaNs.
+    """
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range(end=pd.Timestamp("2025-12-31"), periods=years * 252, name="Date")
+    market = rng.normal(0.0003, 0.01, size=len(days))
+    sectors = rng.normal(0.0, 0.012, size=(len(days), 11))
+    betas = rng.uniform(0.5, 1.6, size=tickers)
+    sector = rng.integers(0, 11, size=tickers)
+    loadings = rng.uniform(0.6, 1.2, size=tickers)
+    noise = rng.normal(0.0001, 1.0, size=(len(days), tickers)) * rng.uniform(0.004, 0.02, size=tickers)
+    returns = market[:, None] * betas + sectors[:, sector] * loadings + noise
+    closes = 100 * np.exp(np.cumsum(returns, axis=0))
+    listed = rng.integers(0, min(len(days) // 2, 126), size=tickers)
+    late = rng.random(tickers) < 0.1
+    for column in np.flatnonzero(late):
+        closes[:listed[column], column] = np.nan
+    columns = [f"T{i:04d}" for i in range(tickers)]
+    panel = pd.DataFrame(closes, index=days, columns=columns)
+    benchmark = pd.Series(100 * np.exp(np.cumsum(market)), index=days, name="^GSPC")
+    return panel, benchmark
+
+
+def fmp_response(url: str, params: dict) -> tuple[int, bytes]:
+    """(status code, body) of an FMP request."""
+    rng = _rng(url, sorted(params.items()))
+    if "stock-screener" in url:
+        limit = int(params.get("limit") or 100)
+        body = [
+            {
+                "symbol": symbol,
+                "companyName": f"{symbol} Corporation",
+                "marketCap": int(rng.uniform(1e10, 3e12)),
+                "sector": params.get("sector") or "Technology",
+                "industry": "Software",
+                "beta": round(float(rng.uniform(0.5, 2)), 3),
+                "price": round(float(rng.uniform(20, 600)), 2),
+                "lastAnnualDividend": round(float(rng.uniform(0, 3)), 2),
+                "volume": int(rng.integers(1e5, 5e7)),
+                "exchange": "NASDAQ Global Select",
+                "exchangeShortName": "NASDAQ",
+                "country": params.get("country") or "US",
+                "isEtf": False,
+                "isFund": False,
+                "isActivelyTrading": True,
+            }
+            for symbol in (OVERSEAS_HOLDINGS * (limit // len(OVERSEAS_HOLDINGS) + 1))[:limit]
+        ]
+    elif "technical_indicator" in url:
+        indicator = url.rsplit("type=", 1)[-1]
+        days = pd.bdate_range(end=pd.Timestamp(date.today()), periods=120)[::-1]
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, size=len(days))))
+        body = [
+            {"date": day.strftime("%Y-%m-%d 00:00:00"), "open": c, "high": c * 1.01, "low": c * 0.99,
+             "close": c, "volume": int(rng.integers(1e5, 5e7)), indicator: c * float(rng.uniform(0.02, 1))}
+            for day, c in zip(days, close.round(2))
+        ]
+    elif "search-name" in url:
+        query = str(params.get("query", "")).upper()
+        body = [{"symbol": query[:4] or "AAPL", "name": f"{query} Inc.", "currency": "USD", "exchange": "NASDAQ"}]
+    else:
+        return 404, b'{"error": "Unknown endpoint"}'
+    return 200, json.dumps(body).encode()
+
+
+def kis_response(method: str) -> dict:
+    """{"status_code", "message"} of a KIS balance inquiry, for an account of `portfolio_size` holdings."""
+    domestic = DOMESTIC_HOLDINGS[:portfolio_size // 2]
+    overseas = OVERSEAS_HOLDINGS[:portfolio_size - len(domestic)]
+    rng = _rng(method, portfolio_size)
+    if method == "ainquire_domestic_stock_balance":
+        rows = []
+        for code in domestic:
+            quantity, price = int(rng.integers(1, 200)), float(rng.integers(20_000, 300_000))
+            average = price * float(rng.uniform(0.7, 1.2))
+            rows.append({
+                "pdno": code, "prdt_name": f"종목{code}", "hldg_qty": str(quantity),
+                "pchs_avg_pric": f"{average:.2f}", "prpr": f"{price:.0f}", "evlu_amt": f"{quantity * price:.0f}",
+                "evlu_pfls_amt": f"{quantity * (price - average):.0f}", "evlu_pfls_rt": f"{(price / average - 1) * 100:.2f}",
+            })
+        total = sum(float(row["evlu_amt"]) for row in rows)
+        payload = {"output1": rows, "output2": [{
+            "pchs_amt_smtl_amt": f"{total * 0.9:.0f}", "evlu_amt_smtl_amt": f"{total:.0f}",
+            "evlu_pfls_smtl_amt": f"{total * 0.1:.0f}", "nass_amt": f"{total * 1.2:.0f}", "dnca_tot_amt": "5000000",
+        }]}
+    elif method == "ainquire_overseas_stock_balance":
+        rows = []
+        for symbol in overseas:
+            quantity, price = int(rng.integers(1, 100)), float(rng.uniform(20, 600))
+            average = price * float(rng.uniform(0.7, 1.2))
+            rows.append({
+                "ovrs_pdno": symbol, "ovrs_item_name": f"{symbol} Corporation", "ovrs_cblc_qty": str(quantity),
+                "pchs_avg_pric": f"{average:.4f}", "now_pric2": f"{price:.4f}", "ovrs_stck_evlu_amt": f"{quantity * price:.2f}",
+                "frcr_evlu_pfls_amt": f"{quantity * (price - average):.2f}", "evlu_pfls_rt": f"{(price / average - 1) * 100:.2f}",
+                "tr_crcy_cd": "USD",
+            })
+        total = sum(float(row["ovrs_stck_evlu_amt"]) for row in rows)
+        payload = {"output1": rows, "output2": {
+            "frcr_pchs_amt1": f"{total * 0.9:.2f}", "tot_evlu_pfls_amt": f"{total:.2f}", "ovrs_tot_pfls": f"{total * 0.1:.2f}",
+        }}
+    else:
+        payload = {"Output2": {"dncl_amt": "5000000", "frcr_evlu_tota": "0"}}
+    return {"status_code": 200, "message": json.dumps(payload, ensure_ascii=False)}
+
+
+def notion_response(endpoint: str) -> dict:
+    """The JSON body of a Notion API call."""
+    if endpoint == "databases.retrieve":
+        return {"object": "database", "id": "replay-db", "data_sources": [{"id": "replay-ds", "name": "Reports"}]}
+    if endpoint == "data_sources.retrieve":
+        return {"object": "data_source", "id": "replay-ds", "properties": {
+            "Name": {"id": "title", "type": "title"}, "Tags": {"id": "tags", "type": "multi_select"},
+        }}
+    if endpoint == "pages.create":
+        return {"object": "page", "id": "replay-page", "url": "https://www.notion.so/replay-page"}
+    return {"object": "list", "results": []}
@@ -0,0 +1,26 @@
+"""
+Regression gate over the micro-benchmarks of benchmarks/micro.py.
+
+    python -m pytest benchmarks/test_micro.py [-s]
+
+MICROBENCH_PROFILE=full runs the large input sizes as well.
+"""
+import os
+
+import pytest
+
+from benchmarks import micro
+
+BASELINES = micro.load_baselines()
+
+
+@pytest.mark.parametrize(
+    "case", micro.cases(os.environ.get("MICROBENCH_PROFILE", "quick")), ids=lambda case: case.name
+)
+def test_no_regression(case):
+    try:
+        result, problems = micro.check(case, BASELINES.get(case.name))
+    except micro.Skip as e:
+        pytest.skip(str(e))
+    print(f"{case.name}: {result['cpu_s'] * 1000:.2f} ms, {result['peak_mb']:.2f} MB")
+    assert not problems, f"{case.name} regressed: " + "; ".join(problems)
@@ -0,0 +1,82 @@
+"""
+Checks SessionLifecycleManager against a database written by DatabaseSessionService,
+so that a google-adk upgrade that changes its tables fails here rather than in production.
+
+    python -m pytest tests/test_session_lifecycle.py
+
+Needs the database extra of google-adk (sqlalchemy) and aiosqlite.
+"""
+import time
+import sqlite3
+import asyncio
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("aiosqlite")
+
+from google.adk.events import Event
+from google.adk.sessions import DatabaseSessionService
+from google.genai import types
+
+from apis.session_lifecycle import SUMMARY_KEY, SessionLifecycleManager
+
+APP_NAME = "JellyMonster"
+
+
+def _event(invocation_id: str, author: str, text: str) -> Event:
+    role = "user" if author == "user" else "model"
+    return Event(invocation_id=invocation_id, author=author, content=types.Content(role=role, parts=[types.Part(text=text)]))
+
+
+async def _conversation(service: DatabaseSessionService, session_id: str, turns: int):
+    session = await service.create_session(app_name=APP_NAME, user_id="U1", session_id=session_id)
+    for i in range(turns):
+        await service.append_event(session, _event(f"inv{i}", "user", f"question {i}"))
+        await service.append_event(session, _event(f"inv{i}", "JellyMonster", f"answer {i}"))
+    return session
+
+
+def test_expire_deletes_idle_sessions_through_the_service(tmp_path):
+    async def run():
+        service = DatabaseSessionService(db_url=f"sqlite+aiosqlite:///{tmp_path / 'sessions.db'}")
+        await _conversation(service, "old", turns=1)
+        await asyncio.sleep(1.5)
+        await _conversation(service, "new", turns=1)
+        manager = SessionLifecycleManager(db_path=str(tmp_path / "sessions.db"), app_name=APP_NAME, ttl=1)
+        expired = await manager.expire(service)
+        remaining = await service.list_sessions(app_name=APP_NAME)
+        return expired, [session.id for session in remaining.sessions]
+
+    expired, remaining = asyncio.run(run())
+    assert expired == 1
+    assert remaining == ["new"]
+    with sqlite3.connect(tmp_path / "sessions.db") as conn:
+        assert conn.execute("SELECT DISTINCT session_id FROM events").fetchall() == [("new",)]
+
+
+def test_compaction_keeps_recent_invocations_and_a_digest(tmp_path):
+    db_path = tmp_path / "sessions.db"
+
+    async def run():
+        service = DatabaseSessionService(db_url=f"sqlite+aiosqlite:///{db_path}")
+        await _conversation(service, "long", turns=10)
+        time.sleep(0.01)
+        manager = SessionLifecycleManager(
+            db_path=str(db_path), app_name=APP_NAME, max_events=10, keep_events=4, idle_grace=0
+        )
+        deleted = await asyncio.to_thread(manager.maintain_file, False)
+        session = await service.get_session(app_name=APP_NAME, user_id="U1", session_id="long")
+        kept = [event.invocation_id for event in session.events]
+        # The session service still accepts events: its revision marker was left alone
+        await service.append_event(session, _event("inv10", "user", "question 10"))
+        reloaded = await service.get_session(app_name=APP_NAME, user_id="U1", session_id="long")
+        return deleted, kept, session.state, reloaded
+
+    deleted, kept, state, reloaded = asyncio.run(run())
+    assert deleted == 16
+    assert kept == ["inv8", "inv8", "inv9", "inv9"]
+    summary = state[SUMMARY_KEY].split("\n")
+    assert summary[0] == "- Q: question 0 / A: answer 0"
+    assert len(summary) == 8
+    assert len(reloaded.events) == 5
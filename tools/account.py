@@ -1,5 +1,6 @@
 import os
 import json
+import asyncio
 import logging
 from apis.koreainvestment import KoreaInvestmentAPI
 from apis.user_api_manager import user_api_handler # Import the global instance
@@ -7,7 +8,7 @@ from google.adk.tools.tool_context import ToolContext
 
 logger = logging.getLogger("jm.tools.account")
 
-def get_current_portfolio(tool_context: ToolContext):
+async def get_current_portfolio(tool_context: ToolContext):
     """
     Retrieves the current investment portfolio for a specific user, including stocks and cash balances,
     by consolidating information from domestic, overseas, and general account balance APIs.
@@ -40,8 +41,15 @@ def get_current_portfolio(tool_context: ToolContext):
         "summary": {}
     }
 
+    # The three inquiries are independent, so they are issued concurrently.
+    # Results are still processed in order, so the first failure reported is unchanged.
+    domestic_res, overseas_res, balance_res = await asyncio.gather(
+        account.ainquire_domestic_stock_balance(),
+        account.ainquire_overseas_stock_balance(),
+        account.ainquire_account_balance(),
+    )
+
     # Inquire Domestic Stock Balance
-    domestic_res = account.inquire_domestic_stock_balance()
     if domestic_res['status_code'] == 200:
         domestic_data = json.loads(domestic_res['message'])
         if domestic_data.get('output1'):
@@ -67,7 +75,6 @@ def get_current_portfolio(tool_context: ToolContext):
         return {"status_code": domestic_res['status_code'], "message": f"Failed to get domestic balance: {domestic_res['message']}"}
 
     # Inquire Overseas Stock Balance
-    overseas_res = account.inquire_overseas_stock_balance()
     if overseas_res['status_code'] == 200:
         overseas_data = json.loads(overseas_res['message'])
         if overseas_data.get('output1'):
@@ -92,7 +99,6 @@ def get_current_portfolio(tool_context: ToolContext):
         return {"status_code": overseas_res['status_code'], "message": f"Failed to get overseas balance: {overseas_res['message']}"}
 
     # Inquire Account Balance for Cash
-    balance_res = account.inquire_account_balance()
     if balance_res['status_code'] == 200:
         balance_data = json.loads(balance_res['message'])
         if balance_data.get('Output2'):
@@ -0,0 +1,121 @@
+"""
+Execution layer for the synchronous ADK tools.
+
+The tools in this package do blocking yfinance/requests I/O and pandas math.
+ADK calls sync tools inline on the event loop that also serves Slack, so one
+slow call stalls every conversation. `offload` turns a sync tool into a
+coroutine function that runs it on a bounded thread pool, with a timeout and an
+optional concurrency cap. The numeric kernels take milliseconds and NumPy releases
+the GIL in its heavy loops, so threads serve them as well.
+"""
+import os
+import asyncio
+import inspect
+import logging
+import functools
+import contextvars
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+logger = logging.getLogger("jm.tools.executor")
+
+
+class ToolExecutor:
+    """
+    Runs blocking tool functions off the event loop, on a shared thread pool of
+    `thread_workers` threads.
+
+    Threads cannot be interrupted, so a timed-out call keeps its worker busy until
+    it returns on its own; the timeout only frees the agent waiting on it.
+    """
+
+    def __init__(self, thread_workers: int = 16, timeout: float = 60.0):
+        self.thread_workers = thread_workers
+        self.timeout = timeout
+        self._threads = ThreadPoolExecutor(max_workers=thread_workers, thread_name_prefix="tool")
+        self._stats: dict[str, dict] = {}
+
+    def _counters(self, name: str) -> dict:
+        if name not in self._stats:
+            self._stats[name] = {"calls": 0, "running": 0, "timeouts": 0, "errors": 0}
+        return self._stats[name]
+
+    def offload(
+        self,
+        fn: Callable,
+        *,
+        timeout: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+    ) -> Callable:
+        """
+        Wraps a sync tool so that ADK awaits it on a worker instead of the event loop.
+
+        The wrapper keeps the name, docstring and signature of `fn`, so the
+        function declaration sent to the model does not change.
+
+        Args:
+            fn (Callable): The synchronous tool function.
+            timeout (float, optional): Seconds before the call is abandoned. Defaults to the executor timeout.
+            max_concurrency (int, optional): Maximum number of simultaneous calls of this tool.
+
+        Returns:
+            Callable: A coroutine function to register as the tool.
+        """
+        if inspect.iscoroutinefunction(fn):
+            return fn
+
+        name = fn.__name__
+        limit = timeout if timeout is not None else self.timeout
+        # asyncio primitives are bound to one loop; keep a semaphore per running loop
+        semaphores = weakref.WeakKeyDictionary()
+
+        async def run(loop: asyncio.AbstractEventLoop, args: tuple, kwargs: dict):
+            ctx = contextvars.copy_context()
+            return await loop.run_in_executor(self._threads, functools.partial(ctx.run, fn, *args, **kwargs))
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            counters = self._counters(name)
+            counters["calls"] += 1
+            semaphore = None
+            if max_concurrency:
+                semaphore = semaphores.get(loop)
+                if semaphore is None:
+                    semaphore = semaphores[loop] = asyncio.Semaphore(max_concurrency)
+            try:
+                if semaphore is not None:
+                    await asyncio.wait_for(semaphore.acquire(), timeout=limit)
+                counters["running"] += 1
+                try:
+                    return await asyncio.wait_for(run(loop, args, kwargs), timeout=limit)
+                finally:
+                    counters["running"] -= 1
+                    if semaphore is not None:
+                        semaphore.release()
+            except asyncio.TimeoutError:
+                counters["timeouts"] += 1
+                logger.warning(f"Tool '{name}' timed out after {limit} seconds.")
+                return {"error": f"Tool '{name}' timed out after {limit} seconds."}
+            except Exception:
+                counters["errors"] += 1
+                raise
+
+        return wrapper
+
+    def stats(self) -> dict:
+        """Returns call, in-flight, timeout and error counters per tool."""
+        return {name: dict(counters) for name, counters in self._stats.items()}
+
+    def shutdown(self):
+        """Stops the worker pool without waiting for running calls."""
+        self._threads.shutdown(wait=False, cancel_futures=True)
+
+
+# Global executor shared across users
+tool_executor = ToolExecutor(
+    thread_workers=int(os.environ.get("TOOL_THREAD_WORKERS", "16")),
+    timeout=float(os.environ.get("TOOL_TIMEOUT", "60")),
+)
+offload = tool_executor.offload
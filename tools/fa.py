@@ -1,7 +1,8 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, Union
+from typing import Dict, Any, Union, List, Optional
+from tools.fa_cache import fa_cache
+from tools.shaping import statement_to_columnar, table_to_columnar, token_budget
 
 def replace_nan_with_none(data: Any) -> Any:
     """
@@ -24,8 +25,7 @@ def get_company_info(ticker: str) -> Dict[str, Any]:
     Retrieves company information and business summary.
     """
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
+        info = fa_cache.get_info(ticker)
         return {
             "symbol": info.get("symbol"),
             "longName": info.get("longName"),
@@ -44,8 +44,7 @@ def get_financial_summary(ticker: str) -> Dict[str, Any]:
     Retrieves key financial summary data (P/E, EPS, etc.).
     """
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
+        info = fa_cache.get_info(ticker)
         return {
             "marketCap": info.get("marketCap"),
             "enterpriseValue": info.get("enterpriseValue"),
@@ -75,8 +74,7 @@ def get_advanced_financial_metrics(ticker: str) -> Dict[str, Any]:
     Calculates advanced financial metrics: ROIC, FCF, Altman Z-Score, Piotroski F-Score, PEG, and Cost of Debt.
     """
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
+        info = fa_cache.get_info(ticker)
         
         # Helper to get safe float
         def get_val(df, key, idx=0, default=0.0):
@@ -88,9 +86,9 @@ def get_advanced_financial_metrics(ticker: str) -> Dict[str, Any]:
                 return default
 
         # Fetch Financials
-        balance_sheet = stock.balance_sheet
-        income_stmt = stock.income_stmt
-        cash_flow = stock.cash_flow
+        balance_sheet = fa_cache.get("balance_sheet", ticker)
+        income_stmt = fa_cache.get("income_stmt", ticker)
+        cash_flow = fa_cache.get("cashflow", ticker)
         
         if balance_sheet.empty or income_stmt.empty or cash_flow.empty:
             return {"error": "Insufficient financial data for advanced metrics."}
@@ -259,78 +257,84 @@ def get_analyst_recommendations(ticker: str) -> Dict[str, Any]:
     Returns:
         Any: A summary of the latest analyst recommendations, usually a DataFrame.
     """
-    stock = yf.Ticker(ticker)
-    recommendations = stock.recommendations
+    recommendations = fa_cache.get("recommendations", ticker)
     if recommendations is not None and not recommendations.empty:
         return replace_nan_with_none(recommendations.tail(5).to_dict('records'))
     return "No analyst recommendations found."
 
-def get_income_statement(ticker: str, period: str = 'annual') -> Any:
+@token_budget()
+def get_income_statement(ticker: str, period: str = 'annual', line_items: Optional[List[str]] = None, max_periods: int = 4) -> Any:
     """
     Retrieves the income statement for a given stock ticker.
 
     Args:
         ticker (str): The stock ticker symbol.
         period (str): 'annual' or 'quarterly'. Defaults to 'annual'.
+        line_items (List[str], optional): Only return the line items whose name contains one of
+            these (case-insensitive), e.g. ["Revenue", "Net Income"]. Defaults to all line items.
+        max_periods (int): The number of most recent periods to return. Defaults to 4.
 
     Returns:
-        Any: The income statement, usually a DataFrame.
+        Any: {"periods": [...], "line_items": {name: [value per period]}}, newest period first.
     """
-    stock = yf.Ticker(ticker)
     if period == 'quarterly':
-        income_stmt = stock.quarterly_income_stmt
+        income_stmt = fa_cache.get("quarterly_income_stmt", ticker)
     else:
-        income_stmt = stock.income_stmt
+        income_stmt = fa_cache.get("income_stmt", ticker)
     
     if income_stmt is not None and not income_stmt.empty:
-        income_stmt.columns = income_stmt.columns.astype(str)
-        return replace_nan_with_none(income_stmt.to_dict())
+        return statement_to_columnar(income_stmt, line_items=line_items, max_periods=max_periods)
     return "No income statement found."
 
-def get_balance_sheet(ticker: str, period: str = 'annual') -> Any:
+@token_budget()
+def get_balance_sheet(ticker: str, period: str = 'annual', line_items: Optional[List[str]] = None, max_periods: int = 4) -> Any:
     """
     Retrieves the balance sheet for a given stock ticker.
 
     Args:
         ticker (str): The stock ticker symbol.
         period (str): 'annual' or 'quarterly'. Defaults to 'annual'.
+        line_items (List[str], optional): Only return the line items whose name contains one of
+            these (case-insensitive), e.g. ["Total Assets", "Total Debt"]. Defaults to all line items.
+        max_periods (int): The number of most recent periods to return. Defaults to 4.
 
     Returns:
-        Any: The balance sheet, usually a DataFrame.
+        Any: {"periods": [...], "line_items": {name: [value per period]}}, newest period first.
     """
-    stock = yf.Ticker(ticker)
     if period == 'quarterly':
-        balance_sheet = stock.quarterly_balance_sheet
+        balance_sheet = fa_cache.get("quarterly_balance_sheet", ticker)
     else:
-        balance_sheet = stock.balance_sheet
+        balance_sheet = fa_cache.get("balance_sheet", ticker)
     
     if balance_sheet is not None and not balance_sheet.empty:
-        balance_sheet.columns = balance_sheet.columns.astype(str)
-        return replace_nan_with_none(balance_sheet.to_dict())
+        return statement_to_columnar(balance_sheet, line_items=line_items, max_periods=max_periods)
     return "No balance sheet found."
 
-def get_cash_flow(ticker: str, period: str = 'annual') -> Any:
+@token_budget()
+def get_cash_flow(ticker: str, period: str = 'annual', line_items: Optional[List[str]] = None, max_periods: int = 4) -> Any:
     """
     Retrieves the cash flow statement for a given stock ticker.
 
     Args:
         ticker (str): The stock ticker symbol.
         period (str): 'annual' or 'quarterly'. Defaults to 'annual'.
+        line_items (List[str], optional): Only return the line items whose name contains one of
+            these (case-insensitive), e.g. ["Operating Cash Flow", "Free Cash Flow"]. Defaults to all line items.
+        max_periods (int): The number of most recent periods to return. Defaults to 4.
 
     Returns:
-        Any: The cash flow statement, usually a DataFrame.
+        Any: {"periods": [...], "line_items": {name: [value per period]}}, newest period first.
     """
-    stock = yf.Ticker(ticker)
     if period == 'quarterly':
-        cash_flow = stock.quarterly_cashflow
+        cash_flow = fa_cache.get("quarterly_cashflow", ticker)
     else:
-        cash_flow = stock.cashflow
+        cash_flow = fa_cache.get("cashflow", ticker)
     
     if cash_flow is not None and not cash_flow.empty:
-        cash_flow.columns = cash_flow.columns.astype(str)
-        return replace_nan_with_none(cash_flow.to_dict())
+        return statement_to_columnar(cash_flow, line_items=line_items, max_periods=max_periods)
     return "No cash flow statement found."
 
+@token_budget()
 def get_major_shareholders(ticker: str) -> Any:
     """
     Retrieves major institutional shareholders for a given stock ticker.
@@ -339,29 +343,31 @@ def get_major_shareholders(ticker: str) -> Any:
         ticker (str): The stock ticker symbol.
 
     Returns:
-        Any: Major shareholders data, usually a DataFrame.
+        Any: Major shareholders data as {"columns": [...], "rows": [[...]]}.
     """
-    stock = yf.Ticker(ticker)
-    major_holders = stock.major_holders
+    major_holders = fa_cache.get("major_holders", ticker)
     if major_holders is not None and not major_holders.empty:
-        return replace_nan_with_none(major_holders.to_dict())
+        return table_to_columnar(major_holders)
     return "No major shareholders found."
 
-def get_insider_transactions(ticker: str) -> Any:
+@token_budget()
+def get_insider_transactions(ticker: str, max_rows: int = 20) -> Any:
     """
     Retrieves insider transactions for a given stock ticker.
 
     Args:
         ticker (str): The stock ticker symbol.
+        max_rows (int): The number of most recent transactions to return. Defaults to 20.
 
     Returns:
-        Any: Insider transactions data, usually a DataFrame.
+        Any: Insider transactions as {"columns": [...], "rows": [[...]]}, most recent first.
     """
 
-    stock = yf.Ticker(ticker)
-    insider_transactions = stock.insider_transactions
+    insider_transactions = fa_cache.get("insider_transactions", ticker)
     if insider_transactions is not None and not insider_transactions.empty:
-        return replace_nan_with_none(insider_transactions.to_dict())
+        # Links to the filings only cost tokens
+        columns = [column for column in insider_transactions.columns if column != "URL"]
+        return table_to_columnar(insider_transactions, max_rows=max_rows, columns=columns)
     return "No insider transactions found."
 
 def get_beta(ticker: str) -> float:
@@ -376,6 +382,5 @@ def get_beta(ticker: str) -> float:
         float: The beta value of the stock. Returns None if not available.
     """
 
-    stock = yf.Ticker(ticker)
-    beta = stock.info.get("beta")
+    beta = fa_cache.get_info(ticker).get("beta")
     return replace_nan_with_none(beta)
\ No newline at end of file
@@ -0,0 +1,221 @@
+"""
+Cache layer for the yfinance data used by tools/fa.py.
+
+Quote-driven `.info` fields expire quickly, while financial statements only
+change when a new filing appears. Entries are kept in memory and persisted
+to SQLite on the `db/` volume so that they survive restarts.
+"""
+import os
+import pickle
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime
+from typing import Any, Optional
+
+import pandas as pd
+import yfinance as yf
+
+from apis.tracing import record_cache
+
+logger = logging.getLogger("jm.tools.fa_cache")
+
+# Attribute of yf.Ticker -> (TTL group, fiscal period the data belongs to)
+KINDS = {
+    "info": ("info", None),
+    "income_stmt": ("statement", "annual"),
+    "balance_sheet": ("statement", "annual"),
+    "cashflow": ("statement", "annual"),
+    "quarterly_income_stmt": ("statement", "quarterly"),
+    "quarterly_balance_sheet": ("statement", "quarterly"),
+    "quarterly_cashflow": ("statement", "quarterly"),
+    "recommendations": ("aux", None),
+    "major_holders": ("aux", None),
+    "insider_transactions": ("aux", None),
+}
+
+# `.info` fields announcing the end date of the latest reported period
+FISCAL_PERIOD_FIELDS = {
+    "annual": "lastFiscalYearEnd",
+    "quarterly": "mostRecentQuarter",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fa_cache (
+    ticker TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (ticker, kind)
+);
+"""
+
+
+def latest_period_end(df: Any) -> Optional[pd.Timestamp]:
+    """Returns the newest period column of a statement DataFrame, if any."""
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return None
+    dates = pd.to_datetime(pd.Index(df.columns), errors="coerce").dropna()
+    return dates.max() if len(dates) else None
+
+
+def _is_empty(value: Any) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, pd.DataFrame):
+        return value.empty
+    return isinstance(value, dict) and not value
+
+
+class FundamentalsCache:
+    """
+    A two-level (memory + SQLite) cache of yfinance `.info` and statement data.
+
+    - `.info` entries expire after `info_ttl` seconds.
+    - Statements expire after `statement_ttl` seconds, and are refreshed early
+      when `.info` reports a fiscal period newer than the cached statement.
+    - Other data (recommendations, holders, insider transactions) uses `aux_ttl`.
+    - An empty result, often a transient Yahoo failure, is kept in memory only
+      and for `info_ttl`, so it cannot blank a ticker's data for a whole week.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "db/fundamentals.db",
+        info_ttl: int = 600,
+        statement_ttl: int = 7 * 24 * 3600,
+        aux_ttl: int = 24 * 3600,
+    ):
+        self.db_path = db_path
+        self.ttls = {"info": info_ttl, "statement": statement_ttl, "aux": aux_ttl}
+        self._memory: dict[tuple, tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._stats = {kind: {"hits": 0, "misses": 0, "refreshes": 0} for kind in KINDS}
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._initialized = True
+        return conn
+
+    def _load(self, ticker: str, kind: str) -> Optional[tuple[float, Any]]:
+        key = (ticker, kind)
+        if key in self._memory:
+            return self._memory[key]
+        try:
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT fetched_at, payload FROM fa_cache WHERE ticker = ? AND kind = ?", key
+                ).fetchone()
+            if row is None:
+                return None
+            entry = (row[0], pickle.loads(row[1]))
+        except Exception as e:
+            # A corrupt or incompatible entry (e.g. after a pandas upgrade) is treated as a miss
+            logger.warning(f"Ignoring unreadable cache entry {key}: {e}")
+            return None
+        self._memory[key] = entry
+        return entry
+
+    def _save(self, ticker: str, kind: str, value: Any):
+        entry = (time.time(), value)
+        self._memory[(ticker, kind)] = entry
+        if _is_empty(value):
+            return
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO fa_cache VALUES (?, ?, ?, ?)",
+                    (ticker, kind, entry[0], pickle.dumps(value)),
+                )
+        except Exception as e:
+            logger.warning(f"Failed to persist cache entry ({ticker}, {kind}): {e}")
+
+    def _has_newer_filing(self, ticker: str, kind: str, cached: Any) -> bool:
+        period = KINDS[kind][1]
+        if period is None:
+            return False
+        cached_end = latest_period_end(cached)
+        announced = self.get("info", ticker).get(FISCAL_PERIOD_FIELDS[period])
+        if not announced:
+            return False
+        if cached_end is None:
+            # A period is reported but the cached statement has none
+            return True
+        announced_end = pd.Timestamp(datetime.fromtimestamp(announced)).normalize()
+        return announced_end > cached_end.normalize()
+
+    def get(self, kind: str, ticker: str, force_refresh: bool = False) -> Any:
+        """
+        Returns `yf.Ticker(ticker).<kind>`, served from the cache when still valid.
+        DataFrames are returned as copies, so callers may modify them freely.
+        """
+        if kind not in KINDS:
+            raise ValueError(f"Unsupported kind '{kind}'. Available: {', '.join(KINDS)}")
+        with self._lock:
+            entry = None if force_refresh else self._load(ticker, kind)
+        ttl = self.ttls[KINDS[kind][0]]
+        if entry is not None and _is_empty(entry[1]):
+            ttl = min(ttl, self.ttls["info"])
+        if entry is not None and time.time() - entry[0] < ttl:
+            # Yahoo may announce a period before its statements are published, so
+            # re-check an entry for a newer filing at most once per info TTL.
+            age = time.time() - entry[0]
+            if age >= self.ttls["info"] and self._has_newer_filing(ticker, kind, entry[1]):
+                logger.info(f"Newer fiscal period reported for {ticker}; refreshing {kind}.")
+                self._stats[kind]["refreshes"] += 1
+                record_cache("fa_cache", hit=False)
+            else:
+                self._stats[kind]["hits"] += 1
+                record_cache("fa_cache", hit=True)
+                value = entry[1]
+                return value.copy() if isinstance(value, (pd.DataFrame, dict)) else value
+        else:
+            self._stats[kind]["misses"] += 1
+            record_cache("fa_cache", hit=False)
+
+        value = getattr(yf.Ticker(ticker), kind)
+        if value is None:
+            value = {} if kind == "info" else pd.DataFrame()
+        with self._lock:
+            self._save(ticker, kind, value)
+        return value.copy() if isinstance(value, (pd.DataFrame, dict)) else value
+
+    def get_info(self, ticker: str) -> dict:
+        """Shortcut for the `.info` dictionary of a ticker."""
+        return self.get("info", ticker)
+
+    def invalidate(self, ticker: Optional[str] = None):
+        """Drops every entry, or only the entries of one ticker, from memory and disk."""
+        with self._lock:
+            for key in [k for k in self._memory if ticker is None or k[0] == ticker]:
+                del self._memory[key]
+            with closing(self._connect()) as conn, conn:
+                if ticker is None:
+                    conn.execute("DELETE FROM fa_cache")
+                else:
+                    conn.execute("DELETE FROM fa_cache WHERE ticker = ?", (ticker,))
+
+    def stats(self) -> dict:
+        """Returns hit/miss/refresh counters per kind and in total."""
+        total = {"hits": 0, "misses": 0, "refreshes": 0}
+        for counters in self._stats.values():
+            for name, value in counters.items():
+                total[name] += value
+        return {"total": total, "by_kind": {kind: dict(c) for kind, c in self._stats.items()}}
+
+
+# Global instance on the persistent db volume
+fa_cache = FundamentalsCache(
+    db_path=os.environ.get("FA_CACHE_PATH", "db/fundamentals.db"),
+    info_ttl=int(os.environ.get("FA_CACHE_INFO_TTL", "600")),
+    statement_ttl=int(os.environ.get("FA_CACHE_STATEMENT_TTL", str(7 * 24 * 3600))),
+    aux_ttl=int(os.environ.get("FA_CACHE_AUX_TTL", str(24 * 3600))),
+)
@@ -1,5 +1,11 @@
+import logging
 import yfinance as yf
+import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
+from tools.price_store import price_store
+
+logger = logging.getLogger("jm.tools.market")
 
 def get_exchange_rate(from_currency: str, to_currency: str) -> float | None:
     """
@@ -16,9 +22,8 @@ def get_exchange_rate(from_currency: str, to_currency: str) -> float | None:
         return 1.0
     try:
         ticker_symbol = f"{from_currency.upper()}{to_currency.upper()}=X"
-        ticker = yf.Ticker(ticker_symbol)
         # Use a recent period to get the latest rate
-        data = ticker.history(period="5d")
+        data = price_store.get_history(ticker_symbol, period="5d")
         if not data.empty:
             return float(data['Close'].iloc[-1])
         else:
@@ -28,9 +33,67 @@ def get_exchange_rate(from_currency: str, to_currency: str) -> float | None:
         print(f"Error fetching exchange rate for {from_currency} to {to_currency}: {e}")
         return None
 
+# Currencies implied by the exchange suffix of a ticker; other tickers are looked up once.
+SUFFIX_CURRENCIES = {
+    ".KS": "KRW",
+    ".KQ": "KRW",
+}
+
+# Process-wide ticker -> trading currency map. A listing's currency does not change.
+_ticker_currencies: dict[str, str] = {}
+
+
+def _last_closes(symbols: list[str]) -> pd.Series:
+    """
+    Returns the latest available close for each symbol, fetched with a single download.
+    Symbols whose market is open are always downloaded again, so their close is the
+    live price; the others come from the stored last session. A failed download
+    leaves every symbol without a close (NaN).
+    """
+    if not symbols:
+        return pd.Series(dtype=float)
+    try:
+        closes = price_store.get_closes(symbols, period="5d", max_age=0)
+    except Exception as e:
+        logger.error(f"Error fetching closes for {symbols}: {e}")
+        return pd.Series(np.nan, index=symbols)
+    if closes.empty:
+        return pd.Series(np.nan, index=symbols)
+    return closes.ffill().iloc[-1].reindex(symbols)
+
+
+def _ticker_currency(ticker: str) -> str | None:
+    if ticker not in _ticker_currencies:
+        currency = next((c for suffix, c in SUFFIX_CURRENCIES.items() if ticker.upper().endswith(suffix)), None)
+        if currency is None:
+            try:
+                currency = yf.Ticker(ticker).fast_info.get('currency')
+            except Exception as e:
+                logger.warning(f"Error fetching currency for {ticker}: {e}")
+        if not currency:
+            return None
+        _ticker_currencies[ticker] = currency.upper()
+    return _ticker_currencies[ticker]
+
+
+def _exchange_rates(currencies: set[str], output_currency: str) -> dict[str, float]:
+    """Fetches every distinct FX pair into `output_currency` once, with a single download."""
+    output_currency = output_currency.upper()
+    pairs = {c: f"{c}{output_currency}=X" for c in {c.upper() for c in currencies} if c != output_currency}
+    closes = _last_closes(sorted(pairs.values()))
+    rates = {output_currency: 1.0}
+    for currency, pair in pairs.items():
+        rate = closes.get(pair)
+        if rate is not None and not pd.isna(rate):
+            rates[currency] = float(rate)
+    return rates
+
+
 def get_current_prices(items: list[str], output_currency: str = "KRW") -> dict[str, float | None]:
     """
     Retrieves the current market price for a list of stock tickers and currency symbols.
+    All stock quotes are fetched in one batch and each distinct exchange rate only once.
+    Prices of markets that are open are live; the others are the last session's close.
 
     Args:
         items (list[str]): A list of stock tickers (e.g., "005930.KS", "AAPL") or
@@ -43,46 +106,38 @@ def get_current_prices(items: list[str], output_currency: str = "KRW") -> dict[s
                                  prices in the specified currency. A value is None if the price
                                  or exchange rate could not be fetched.
     """
+    items = list(dict.fromkeys(items))
+    # Each phase below handles its own failures (a currency lookup per ticker, the FX and
+    # close downloads per batch), so one bad item or download leaves the others priced.
+    # Heuristic: If item is a 3-letter uppercase string, try treating it as a currency first.
+    currency_items = [item for item in items if len(item) == 3 and item.isupper()]
+    stock_items = [item for item in items if item not in currency_items]
+    currencies = {ticker: _ticker_currency(ticker) for ticker in stock_items}
+    rates = _exchange_rates(set(currency_items) | {c for c in currencies.values() if c}, output_currency)
+
+    # Currency symbols without a rate are processed as stock tickers instead.
+    fallback = [item for item in currency_items if item not in rates]
+    currencies.update({ticker: _ticker_currency(ticker) for ticker in fallback})
+    missing = {c for c in currencies.values() if c and c not in rates}
+    if missing:
+        rates.update(_exchange_rates(missing, output_currency))
+
+    tickers = stock_items + fallback
+    last_prices = _last_closes(tickers)
+    fx = pd.Series({t: rates.get(currencies[t], np.nan) if currencies[t] else np.nan for t in tickers}, dtype=float)
+    converted = last_prices * fx.reindex(last_prices.index)
+
     prices = {}
     for item in items:
-        # Heuristic: If item is a 3-letter uppercase string, try treating it as a currency first.
-        if len(item) == 3 and item.isupper():
-            rate = get_exchange_rate(item, output_currency)
-            # If a rate is found, we assume it's a currency and move to the next item.
-            if rate is not None:
-                prices[item] = rate
-                continue
-
-        # If not treated as a currency, process as a stock ticker.
-        try:
-            stock = yf.Ticker(item)
-            hist = stock.history(period="2d")
-            if hist.empty:
-                print(f"Warning: No history found for ticker {item}")
-                prices[item] = None
-                continue
-            
-            last_price = hist['Close'].iloc[-1]
-            
-            stock_currency = stock.info.get('currency')
-            if not stock_currency:
-                print(f"Warning: Could not determine currency for {item}.")
-                prices[item] = None
-                continue
-
-            if stock_currency.upper() == output_currency.upper():
-                prices[item] = last_price
-            else:
-                exchange_rate = get_exchange_rate(stock_currency, output_currency)
-                if exchange_rate is not None:
-                    prices[item] = last_price * exchange_rate
-                else:
-                    prices[item] = None
-        
-        except Exception as e:
-            print(f"Error fetching price for {item}: {e}")
+        if item in rates and item in currency_items:
+            prices[item] = rates[item]
+            continue
+        value = converted.get(item)
+        if value is None or pd.isna(value):
+            logger.warning(f"Could not determine price for {item}.")
             prices[item] = None
-            
+        else:
+            prices[item] = float(value)
     return prices
 
 def evaluate_portfolio(portfolio: dict, output_currency: str = "KRW") -> float | None:
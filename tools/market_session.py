@@ -0,0 +1,104 @@
+import re
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+KR_SUFFIXES = ('.KS', '.KQ')
+KR_INDICES = ('^KS11', '^KQ11', '^KS200')
+
+# Yahoo Finance symbols: 005930.KS, 035720.KQ, AAPL, BRK-B, 7203.T ...
+# The boundaries are ASCII only, so a Korean particle may follow a symbol ("TSLA를"),
+# and a sentence-ending period does not hide it.
+TICKER_PATTERN = re.compile(
+    r"(?<![A-Za-z0-9_.])(\d{6}\.K[SQ]|[A-Z][A-Z0-9]{0,5}(?:-[A-Z])?(?:\.[A-Z]{1,3})?)(?![A-Za-z0-9_]|\.[A-Za-z0-9])"
+)
+
+# Symbols that cannot be an ordinary capitalised word: exchange suffixes, share classes, digits
+UNAMBIGUOUS_TICKER = re.compile(r".*[-.\d].*")
+
+# Regular trading hours per market. Exchange holidays are not modelled; a
+# holiday is treated like a regular session that never prints new bars.
+SESSIONS = {
+    "KR": (ZoneInfo('Asia/Seoul'), time(9, 0), time(15, 30)),
+    "US": (ZoneInfo('America/New_York'), time(9, 30), time(16, 0)),
+    # Currency pairs (e.g. "USDKRW=X") trade around the clock on weekdays.
+    "FX": (ZoneInfo('UTC'), time(0, 0), time.max),
+}
+
+
+def market_for_ticker(ticker: str) -> str:
+    """
+    Returns the market code ("KR", "US" or "FX") whose session drives the given ticker.
+    """
+    ticker = ticker.upper()
+    if ticker.endswith('=X'):
+        return "FX"
+    if ticker.endswith(KR_SUFFIXES) or ticker in KR_INDICES:
+        return "KR"
+    return "US"
+
+
+def find_tickers(text: str) -> list[str]:
+    """
+    Returns the distinct tokens of a text shaped like Yahoo Finance ticker symbols, in order of appearance.
+    Any all-caps word qualifies (e.g. "ETF"); see tools/tickers.py to keep only real symbols.
+    """
+    return list(dict.fromkeys(TICKER_PATTERN.findall(text)))
+
+
+def is_unambiguous_ticker(symbol: str) -> bool:
+    """True for symbols that cannot be mistaken for a word, e.g. "005930.KS" or "BRK-B" but not "NVDA"."""
+    return bool(UNAMBIGUOUS_TICKER.fullmatch(symbol))
+
+
+def _local_now(market: str, now: datetime | None = None) -> datetime:
+    tz = SESSIONS[market][0]
+    if now is None:
+        return datetime.now(tz=tz)
+    return now.astimezone(tz)
+
+
+def is_market_open(market: str, now: datetime | None = None) -> bool:
+    """
+    Returns True if the regular session of the given market is currently open.
+    """
+    _, open_time, close_time = SESSIONS[market]
+    local = _local_now(market, now)
+    return local.weekday() < 5 and open_time <= local.time() < close_time
+
+
+def next_market_open(market: str, now: datetime | None = None) -> datetime:
+    """
+    Returns the (timezone-aware) start of the next regular session after `now`.
+    """
+    tz, open_time, _ = SESSIONS[market]
+    local = _local_now(market, now)
+    candidate = datetime.combine(local.date(), open_time, tzinfo=tz)
+    if candidate <= local:
+        candidate += timedelta(days=1)
+    while candidate.weekday() >= 5:
+        candidate += timedelta(days=1)
+    return candidate
+
+
+def session_date(market: str, now: datetime | None = None) -> date:
+    """
+    Returns the date of the most recent session that has already started.
+    Before the open (or on weekends) this is the previous weekday.
+    """
+    _, open_time, _ = SESSIONS[market]
+    local = _local_now(market, now)
+    day = local.date()
+    if local.time() < open_time:
+        day -= timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+
+def last_session_close(market: str, now: datetime | None = None) -> datetime:
+    """
+    Returns the (timezone-aware) close of the most recent session that has started.
+    While the market is open this lies in the future.
+    """
+    tz, _, close_time = SESSIONS[market]
+    return datetime.combine(session_date(market, now), close_time, tzinfo=tz)
@@ -0,0 +1,256 @@
+"""
+Process-wide cache for OHLCV price histories.
+
+Entries are keyed by (ticker, period, interval, auto_adjust). A request for a
+narrower period is served as a slice of any wider, still-fresh entry for the
+same ticker, so a full technical analysis pass costs one download per ticker.
+"""
+import os
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+import pandas as pd
+import yfinance as yf
+from pandas import DataFrame
+
+from apis.tracing import record_cache
+from tools.market_session import market_for_ticker, is_market_open, next_market_open
+
+logger = logging.getLogger("jm.tools.ohlcv_cache")
+
+# Approximate span of each yfinance period string, used for ranking and slicing.
+PERIOD_OFFSETS = {
+    "1d": pd.DateOffset(days=1),
+    "5d": pd.DateOffset(days=5),
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "4mo": pd.DateOffset(months=4),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+
+INTRADAY_INTERVALS = ("1m", "2m", "5m", "15m", "30m", "60m", "90m", "1h")
+
+
+def period_days(period: str) -> float:
+    """
+    Returns the approximate length of a yfinance period string in days.
+    Unknown periods rank as the widest possible span.
+    """
+    if period == "max":
+        return float("inf")
+    if period == "ytd":
+        today = datetime.now().date()
+        return (today - today.replace(month=1, day=1)).days + 1
+    offset = PERIOD_OFFSETS.get(period)
+    if offset is None:
+        return float("inf")
+    anchor = pd.Timestamp("2000-01-01")
+    return float(((anchor + offset) - anchor).days)
+
+
+def slice_period(df: DataFrame, period: str) -> DataFrame:
+    """
+    Returns the trailing `period` of a price history, anchored at its last bar.
+    """
+    if df.empty or period == "max":
+        return df
+    last = df.index[-1]
+    if period == "ytd":
+        start = last.normalize().replace(month=1, day=1)
+    else:
+        offset = PERIOD_OFFSETS.get(period)
+        if offset is None:
+            return df
+        start = last.normalize() - offset
+    return df[df.index >= start]
+
+
+def download_ohlcv(ticker: str, period: str, interval: str = "1d", auto_adjust: bool = True) -> DataFrame:
+    """
+    Downloads a single-ticker OHLCV history from Yahoo Finance with flat columns.
+    """
+    df = yf.download(ticker, period=period, interval=interval, auto_adjust=auto_adjust, progress=False)
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.droplevel(1)
+    return df
+
+
+def load_ohlcv(ticker: str, period: str, interval: str = "1d", auto_adjust: bool = True) -> DataFrame:
+    """
+    Loads a history for the cache: daily bars come from the persistent price
+    store, other intervals are downloaded directly.
+    """
+    if interval == "1d":
+        from tools.price_store import price_store
+        return price_store.get_history(ticker, period=period, auto_adjust=auto_adjust)
+    return download_ohlcv(ticker, period, interval=interval, auto_adjust=auto_adjust)
+
+
+class _Entry:
+    __slots__ = ("data", "expires_at", "size")
+
+    def __init__(self, data: DataFrame, expires_at: datetime):
+        self.data = data
+        self.expires_at = expires_at
+        self.size = int(data.memory_usage(index=True, deep=True).sum())
+
+
+class OHLCVCache:
+    """
+    An LRU cache of OHLCV histories bounded by memory, with TTLs that follow
+    the trading session of each ticker's market.
+
+    - While the market is open, daily bars expire after `open_ttl` seconds and
+      intraday bars after `intraday_ttl` seconds, since the last bar is still moving.
+    - While the market is closed, entries stay valid until the next session opens.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 1024 * 1024,
+        open_ttl: int = 300,
+        intraday_ttl: int = 60,
+        min_daily_period: Optional[str] = "2y",
+        loader: Callable[..., DataFrame] = load_ohlcv,
+    ):
+        self.max_bytes = max_bytes
+        self.open_ttl = open_ttl
+        self.intraday_ttl = intraday_ttl
+        self.min_daily_period = min_daily_period
+        self.loader = loader
+        self._entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self._inflight: dict[tuple, Future] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _expiry(self, ticker: str, interval: str) -> datetime:
+        market = market_for_ticker(ticker)
+        now = datetime.now().astimezone()
+        if is_market_open(market, now):
+            ttl = self.intraday_ttl if interval in INTRADAY_INTERVALS else self.open_ttl
+            return now + timedelta(seconds=ttl)
+        return next_market_open(market, now)
+
+    def _fetch_period(self, period: str, interval: str) -> str:
+        # Widen daily downloads so that every indicator of one analysis pass,
+        # including long moving averages, can be sliced from a single download.
+        if interval == "1d" and self.min_daily_period and period_days(period) < period_days(self.min_daily_period):
+            return self.min_daily_period
+        return period
+
+    def _lookup(self, ticker: str, period: str, interval: str, auto_adjust: bool) -> Optional[DataFrame]:
+        """Finds the narrowest fresh entry covering `period`. Caller must hold the lock."""
+        now = datetime.now().astimezone()
+        wanted = period_days(period)
+        best_key, best_days = None, None
+        for key, entry in list(self._entries.items()):
+            if key[0] != ticker or key[2] != interval or key[3] != auto_adjust:
+                continue
+            if entry.expires_at <= now:
+                self._remove(key)
+                continue
+            days = period_days(key[1])
+            if days >= wanted and (best_days is None or days < best_days):
+                best_key, best_days = key, days
+        if best_key is None:
+            return None
+        self._entries.move_to_end(best_key)
+        data = self._entries[best_key].data
+        return data if best_key[1] == period else slice_period(data, period)
+
+    def _remove(self, key: tuple):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _store(self, key: tuple, data: DataFrame):
+        self._remove(key)
+        entry = _Entry(data, self._expiry(key[0], key[2]))
+        if entry.size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def get(self, ticker: str, period: str = "4mo", interval: str = "1d", auto_adjust: bool = True) -> DataFrame:
+        """
+        Returns the OHLCV history for a ticker, downloading it only on a cache miss.
+        Concurrent misses for the same key share a single download.
+
+        Returns:
+            DataFrame: A copy of the cached history, ordered from oldest to newest.
+        """
+        fetch_period = self._fetch_period(period, interval)
+        key = (ticker, fetch_period, interval, auto_adjust)
+        with self._lock:
+            data = self._lookup(ticker, period, interval, auto_adjust)
+            if data is not None:
+                self.hits += 1
+                record_cache("ohlcv_cache", hit=True)
+                return data.copy()
+            self.misses += 1
+            record_cache("ohlcv_cache", hit=False)
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            return slice_period(future.result(), period).copy()
+
+        try:
+            data = self.loader(ticker, period=fetch_period, interval=interval, auto_adjust=auto_adjust)
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._inflight.pop(key, None)
+            if not data.empty:
+                self._store(key, data)
+        future.set_result(data)
+        return slice_period(data, period).copy()
+
+    def invalidate(self, ticker: Optional[str] = None):
+        """Drops every entry, or only the entries of one ticker."""
+        with self._lock:
+            for key in [k for k in self._entries if ticker is None or k[0] == ticker]:
+                self._remove(key)
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and current memory usage."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# Global instance shared by all tools in this process
+ohlcv_cache = OHLCVCache(
+    max_bytes=int(os.environ.get("OHLCV_CACHE_MAX_MB", "256")) * 1024 * 1024,
+    open_ttl=int(os.environ.get("OHLCV_CACHE_OPEN_TTL", "300")),
+    intraday_ttl=int(os.environ.get("OHLCV_CACHE_INTRADAY_TTL", "60")),
+    min_daily_period=os.environ.get("OHLCV_CACHE_MIN_PERIOD", "2y") or None,
+)
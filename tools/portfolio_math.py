@@ -1,19 +1,143 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any
+from statistics import NormalDist
+from typing import List, Dict, Any, Optional, Tuple
 from tools.fa import replace_nan_with_none
+from tools.shaping import matrix_to_columnar
+from tools.price_store import price_store
 
-def get_portfolio_analysis(portfolio: List[Dict[str, Any]]) -> Dict[str, Any]:
+# Above this many holdings the full matrix is left out; clusters and the strongest pairs carry the signal
+MAX_MATRIX_TICKERS = 12
+# Pairs reported for a portfolio above MAX_MATRIX_TICKERS when no top_k is given
+LARGE_PORTFOLIO_PAIRS = 20
+
+PAIR_COLUMNS = ["ticker_a", "ticker_b", "correlation", "risk"]
+
+TRADING_DAYS = 252
+# Holdings with fewer daily returns than this are left out of the risk model
+MIN_RISK_OBSERVATIONS = 60
+# Holdings reported for a portfolio above MAX_MATRIX_TICKERS when no top_k is given
+LARGE_PORTFOLIO_HOLDINGS = 20
+
+CONTRIBUTION_COLUMNS = ["ticker", "weight", "volatility", "marginal_contribution", "component_contribution", "risk_share"]
+
+
+def _significant_pairs(corr_matrix: pd.DataFrame, high: float, negative: float, top_k: Optional[int]) -> Dict[str, Any]:
+    """
+    Pairs of the upper triangle with a correlation above `high` or below `negative`,
+    strongest first, as {"columns": [...], "rows": [[...]], "total": n}.
+    """
+    values = corr_matrix.to_numpy(dtype=float)
+    # NaN compares False, so pairs without overlapping history drop out
+    with np.errstate(invalid="ignore"):
+        mask = np.triu((values > high) | (values < negative), k=1)
+    rows, cols = np.nonzero(mask)
+    correlations = values[rows, cols]
+    order = np.argsort(-np.abs(correlations), kind="stable")
+    if top_k is not None and top_k < len(order):
+        order = order[:max(top_k, 0)]
+    labels = [str(label) for label in corr_matrix.columns]
+    pairs = {
+        "columns": PAIR_COLUMNS,
+        "rows": [
+            [labels[rows[k]], labels[cols[k]], round(float(correlations[k]), 4),
+             "High" if correlations[k] > high else "Hedge/Negative"]
+            for k in order
+        ],
+        "total": int(len(correlations)),
+    }
+    if len(order) < len(correlations):
+        pairs["omitted"] = int(len(correlations) - len(order))
+    return pairs
+
+
+def _average_linkage_clusters(distance: np.ndarray, max_distance: float) -> List[List[int]]:
+    """
+    Average-linkage hierarchical clustering cut at `max_distance`, by the nearest-neighbour
+    chain algorithm: O(N^2) time and one N x N matrix, updated in place (Lance-Williams).
+    Returns the clusters as lists of row indices.
+    """
+    d = np.array(distance, dtype=float)
+    n = len(d)
+    np.fill_diagonal(d, np.inf)
+    active = np.ones(n, dtype=bool)
+    size = np.ones(n)
+    members = [[i] for i in range(n)]
+    chain: List[int] = []
+    while True:
+        if not chain:
+            remaining = np.flatnonzero(active)
+            if len(remaining) < 2:
+                break
+            chain.append(int(remaining[0]))
+        a = chain[-1]
+        row = np.where(active, d[a], np.inf)
+        b = int(np.argmin(row))
+        if len(chain) > 1 and row[chain[-2]] <= row[b]:
+            b = chain[-2]
+        if row[b] > max_distance:
+            # The average distance to a merged cluster never falls below the nearest one, so `a` is final
+            active[a] = False
+            chain.pop()
+            continue
+        if len(chain) > 1 and b == chain[-2]:
+            chain.pop()
+            chain.pop()
+            merged = (size[a] * d[a] + size[b] * d[b]) / (size[a] + size[b])
+            d[a, :] = merged
+            d[:, a] = merged
+            d[a, a] = np.inf
+            active[b] = False
+            size[a] += size[b]
+            members[a] += members[b]
+            members[b] = []
+        else:
+            chain.append(b)
+    return [group for group in members if group]
+
+
+def _correlation_clusters(corr_matrix: pd.DataFrame, weights: Dict[str, float], min_correlation: float) -> List[Dict[str, Any]]:
+    """Groups of holdings whose average pairwise correlation is at least `min_correlation`, heaviest first."""
+    values = np.nan_to_num(corr_matrix.to_numpy(dtype=float), nan=0.0)
+    labels = [str(label) for label in corr_matrix.columns]
+    clusters = []
+    for group in _average_linkage_clusters(1.0 - values, 1.0 - min_correlation):
+        if len(group) < 2:
+            continue
+        block = values[np.ix_(group, group)]
+        average = (block.sum() - np.trace(block)) / (len(group) * (len(group) - 1))
+        tickers = [labels[i] for i in group]
+        clusters.append({
+            "tickers": tickers,
+            "average_correlation": round(float(average), 4),
+            "weight": round(sum(weights.get(t, 0.0) for t in tickers), 4),
+        })
+    return sorted(clusters, key=lambda c: c["weight"], reverse=True)
+
+
+def get_portfolio_analysis(
+    portfolio: List[Dict[str, Any]],
+    high_correlation: float = 0.7,
+    negative_correlation: float = 0.0,
+    top_k: Optional[int] = None,
+) -> Dict[str, Any]:
     """
     Performs scientific portfolio analysis including Correlation Matrix, 
     Weights, and Concentration Risk (HHI).
+    The correlation matrix is returned as {"labels": [...], "matrix": [[...]]} for up to 12 holdings.
+    Larger portfolios get `correlation_clusters` instead: groups of holdings whose average
+    correlation is above `high_correlation`, with their combined weight.
     
     Args:
         portfolio: List of dicts with 'ticker' and 'market_value'.
+        high_correlation (float): Pairs above this correlation are reported as "High". Defaults to 0.7.
+        negative_correlation (float): Pairs below this correlation are reported as "Hedge/Negative". Defaults to 0.
+        top_k (int, optional): Report only the k strongest pairs. Defaults to all pairs for up to
+            12 holdings and to the 20 strongest above that.
         
     Returns:
-        Dict: Analysis results.
+        Dict: Analysis results. `significant_pairs` is {"columns": [...], "rows": [[...]], "total": n},
+        strongest correlation first.
     """
     try:
         if not portfolio:
@@ -34,47 +158,194 @@ def get_portfolio_analysis(portfolio: List[Dict[str, Any]]) -> Dict[str, Any]:
         # 3. Correlation Matrix
         # Fetch 1-year daily returns
         if len(tickers) > 1:
-            data = yf.download(tickers, period="1y", interval="1d", auto_adjust=True)['Close']
-            
-            # Handle Single Ticker if yfinance returns Series instead of DataFrame
-            if isinstance(data, pd.Series):
-                data = data.to_frame()
-                
+            data = price_store.get_closes(tickers, period="1y")
+
             returns = data.pct_change().dropna()
-            corr_matrix = returns.corr()
-            
-            # Find highly correlated pairs (> 0.7)
-            high_corr_pairs = []
-            cols = corr_matrix.columns
-            for i in range(len(cols)):
-                for j in range(i + 1, len(cols)):
-                    val = corr_matrix.iloc[i, j]
-                    if val > 0.7:
-                        high_corr_pairs.append({
-                            "pair": [cols[i], cols[j]],
-                            "correlation": round(val, 4),
-                            "risk": "High"
-                        })
-                    elif val < 0:
-                        high_corr_pairs.append({
-                            "pair": [cols[i], cols[j]],
-                            "correlation": round(val, 4),
-                            "risk": "Hedge/Negative"
-                        })
-            
-            corr_dict = corr_matrix.to_dict()
+            # No NaNs are left, so one BLAS pass gives what DataFrame.corr computes pair by pair
+            n = len(returns.columns)
+            if len(returns) > 1:
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    corr_values = np.atleast_2d(np.corrcoef(returns.to_numpy(dtype=float), rowvar=False))
+            else:
+                corr_values = np.full((n, n), np.nan)
+            corr_matrix = pd.DataFrame(corr_values, index=returns.columns, columns=returns.columns)
+            large = len(corr_matrix.columns) > MAX_MATRIX_TICKERS
+
+            if top_k is None and large:
+                top_k = LARGE_PORTFOLIO_PAIRS
+            high_corr_pairs = _significant_pairs(corr_matrix, high_correlation, negative_correlation, top_k)
+
+            if not large:
+                corr_dict = matrix_to_columnar(corr_matrix, decimals=2)
+            else:
+                corr_dict = {"omitted": f"The matrix of {len(corr_matrix.columns)} holdings is omitted; see correlation_clusters."}
+                clusters = _correlation_clusters(corr_matrix, weights, high_correlation)
         else:
             corr_dict = {}
-            high_corr_pairs = []
+            high_corr_pairs = {"columns": PAIR_COLUMNS, "rows": [], "total": 0}
+            large = False
 
-        return replace_nan_with_none({
+        result = {
             "weights": {t: round(w, 4) for t, w in weights.items()},
             "hhi": round(hhi, 2),
             "concentration_level": "High" if hhi > 2500 else "Moderate" if hhi > 1500 else "Low",
             "correlation_matrix": corr_dict,
             "significant_pairs": high_corr_pairs,
             "total_market_value": total_value
-        })
+        }
+        if large:
+            result["correlation_clusters"] = clusters
+        return replace_nan_with_none(result)
 
     except Exception as e:
         return {"error": f"Failed to analyze portfolio: {str(e)}"}
+
+
+def ledoit_wolf_covariance(returns: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Ledoit-Wolf (2004) covariance of `returns` (observations x assets), shrunk towards
+    a scaled identity. Returns the covariance and the shrinkage intensity in [0, 1].
+    Costs one X'X product, so it stays fast for thousands of assets.
+    """
+    t, n = returns.shape
+    x = returns - returns.mean(axis=0)
+    sample = x.T @ x / t
+    mu = np.trace(sample) / n
+    # Squared Frobenius distance of the sample from the target, per asset
+    delta = (np.sum(sample ** 2) - 2 * mu * np.trace(sample) + n * mu ** 2) / n
+    # sum_t ||x_t x_t' - S||^2 = sum_t ||x_t||^4 - t ||S||^2
+    beta = (np.sum(np.sum(x ** 2, axis=1) ** 2) / t - np.sum(sample ** 2)) / (n * t)
+    shrinkage = 0.0 if delta <= 0 else min(max(beta / delta, 0.0), 1.0)
+    covariance = (1 - shrinkage) * sample
+    covariance[np.diag_indices(n)] += shrinkage * mu
+    return covariance, float(shrinkage)
+
+
+def _value_at_risk(portfolio_returns: np.ndarray, volatility: float, confidence: float, horizon_days: int) -> Dict[str, Any]:
+    """Historical and parametric (normal) VaR and CVaR over `horizon_days`, as positive loss fractions."""
+    # Overlapping horizon returns from the cumulative daily returns
+    cumulative = np.concatenate([[0.0], np.cumsum(portfolio_returns)])
+    horizon = cumulative[horizon_days:] - cumulative[:-horizon_days]
+    historical_var = -float(np.quantile(horizon, 1 - confidence))
+    tail = horizon[horizon <= -historical_var]
+    historical_cvar = -float(tail.mean()) if len(tail) else historical_var
+
+    normal = NormalDist()
+    z = normal.inv_cdf(confidence)
+    mean = float(portfolio_returns.mean()) * horizon_days
+    sigma = volatility * np.sqrt(horizon_days)
+    return {
+        "historical": {"var": round(historical_var, 5), "cvar": round(historical_cvar, 5)},
+        "parametric": {
+            "var": round(z * sigma - mean, 5),
+            "cvar": round(sigma * normal.pdf(z) / (1 - confidence) - mean, 5),
+        },
+    }
+
+
+def get_portfolio_risk(
+    portfolio: List[Dict[str, Any]],
+    confidence: float = 0.95,
+    horizon_days: int = 1,
+    top_k: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Quantifies the risk of a portfolio from one year of daily returns of all holdings:
+    a Ledoit-Wolf shrunk covariance, portfolio volatility, historical and parametric
+    Value at Risk / Conditional VaR, each holding's contribution to the portfolio risk,
+    and the diversification ratio.
+
+    Args:
+        portfolio: List of dicts with 'ticker' and 'market_value'.
+        confidence (float): VaR confidence level. Defaults to 0.95.
+        horizon_days (int): VaR horizon in trading days. Defaults to 1.
+        top_k (int, optional): Report only the k holdings contributing the most risk. Defaults to all
+            holdings for up to 12 and to the top 20 above that.
+
+    Returns:
+        Dict: Annualized volatility, "value_at_risk" (loss fractions and amounts), and
+        "risk_contributions" as {"columns": [...], "rows": [[...]], "total": n}, largest risk share first.
+        Risk shares sum to 1; a negative share means the holding hedges the rest.
+    """
+    try:
+        if not portfolio:
+            return {"error": "Portfolio is empty."}
+        if not 0.5 < confidence < 1:
+            return {"error": "confidence must be between 0.5 and 1, e.g. 0.95 or 0.99."}
+        horizon_days = max(int(horizon_days), 1)
+
+        market_values: Dict[str, float] = {}
+        for item in portfolio:
+            market_values[item['ticker']] = market_values.get(item['ticker'], 0.0) + float(item['market_value'])
+
+        data = price_store.get_closes(list(market_values), period="1y")
+        returns = data.pct_change().iloc[1:]
+        observations = returns.count()
+        included = [t for t in market_values if t in returns.columns and observations[t] >= MIN_RISK_OBSERVATIONS]
+        excluded = [t for t in market_values if t not in included]
+        if not included:
+            return {"error": "Not enough price history to model the risk of any holding."}
+
+        matrix = returns[included].dropna().to_numpy(dtype=float)
+        if len(matrix) < MIN_RISK_OBSERVATIONS or len(matrix) <= horizon_days:
+            return {"error": "The holdings share too little common price history to model their risk."}
+
+        values = np.array([market_values[t] for t in included])
+        total_value = float(values.sum())
+        weights = values / total_value
+
+        covariance, shrinkage = ledoit_wolf_covariance(matrix)
+        sigma_w = covariance @ weights
+        variance = float(weights @ sigma_w)
+        volatility = np.sqrt(variance)
+        asset_volatility = np.sqrt(np.diag(covariance))
+
+        # Euler decomposition: the component contributions sum to the portfolio volatility
+        marginal = sigma_w / volatility if volatility > 0 else np.zeros_like(weights)
+        component = weights * marginal
+        share = component / volatility if volatility > 0 else np.zeros_like(weights)
+
+        var = _value_at_risk(matrix @ weights, volatility, confidence, horizon_days)
+        for method in var.values():
+            method["var_amount"] = round(method["var"] * total_value, 2)
+            method["cvar_amount"] = round(method["cvar"] * total_value, 2)
+
+        order = np.argsort(-share, kind="stable")
+        if top_k is None and len(included) > MAX_MATRIX_TICKERS:
+            top_k = LARGE_PORTFOLIO_HOLDINGS
+        if top_k is not None and top_k < len(order):
+            order = order[:max(top_k, 0)]
+        annualize = np.sqrt(TRADING_DAYS)
+        contributions = {
+            "columns": CONTRIBUTION_COLUMNS,
+            "rows": [
+                [included[i], round(float(weights[i]), 4), round(float(asset_volatility[i] * annualize), 4),
+                 round(float(marginal[i] * annualize), 4), round(float(component[i] * annualize), 4),
+                 round(float(share[i]), 4)]
+                for i in order
+            ],
+            "total": len(included),
+        }
+        if len(order) < len(included):
+            contributions["omitted"] = len(included) - len(order)
+
+        weighted_volatility = float(weights @ asset_volatility)
+        result = {
+            "holdings": len(included),
+            "observations": len(matrix),
+            "shrinkage": round(shrinkage, 4),
+            "annual_volatility": round(float(volatility * annualize), 4),
+            "diversification_ratio": round(weighted_volatility / volatility, 4) if volatility > 0 else None,
+            "value_at_risk": {"confidence": confidence, "horizon_days": horizon_days, **var},
+            "risk_contributions": contributions,
+            "total_market_value": total_value,
+        }
+        if excluded:
+            result["excluded"] = {
+                "tickers": excluded,
+                "note": f"Left out for lacking {MIN_RISK_OBSERVATIONS} days of price history; weights are over the rest.",
+            }
+        return replace_nan_with_none(result)
+
+    except Exception as e:
+        return {"error": f"Failed to compute portfolio risk: {str(e)}"}
@@ -0,0 +1,126 @@
+"""
+Concurrent per-holding analysis for the PortfolioAnalyzer agent.
+
+Calling the single-asset analyzer through its AgentTool makes the LLM analyze
+holdings one tool turn at a time. `HoldingsAnalyzer.analyze_holdings` runs the
+analyses concurrently under a parallelism limit instead, so a portfolio takes
+about as long as its slowest holding. The analyses share the price store,
+fundamentals cache, prefetcher and report cache.
+"""
+import time
+import asyncio
+import logging
+
+from google.adk.agents import BaseAgent
+from google.adk.tools.agent_tool import AgentTool
+from google.adk.tools.tool_context import ToolContext
+
+from apis.progress import report_progress
+from tools.executor import offload
+from tools.ohlcv_cache import ohlcv_cache
+from tools.price_store import price_store
+
+logger = logging.getLogger("jm.tools.portfolio_pipeline")
+
+
+def _summary(report: str, max_chars: int) -> tuple[str, bool]:
+    """
+    Keeps the beginning of a report, where the single-asset analyzer puts its summary.
+    Returns the text and whether it was cut; a cut text says how much of the report it shows.
+    """
+    report = report.strip()
+    if len(report) <= max_chars:
+        return report, False
+    kept = report[:max_chars].rsplit("\n", 1)[0]
+    return f"{kept}\n… (truncated: {len(kept)} of {len(report)} characters)", True
+
+
+def _merge_actions(tool_context: ToolContext, child: ToolContext):
+    """Applies the state and artifact changes of one nested analysis to the calling tool's context."""
+    tool_context.state.update(child.actions.state_delta)
+    tool_context.actions.artifact_delta.update(child.actions.artifact_delta)
+
+
+class HoldingsAnalyzer:
+    """
+    Runs a single-asset analysis agent for many holdings at once.
+
+    At most `concurrency` analyses run at the same time. Each one is abandoned
+    after `timeout` seconds. A report is shortened to `max_report_chars` characters,
+    keeping the summary it opens with, so the combined tool response stays readable
+    for the model. Each analysis runs with a tool context of its own, whose changes
+    are merged into the caller's once it finishes, so concurrent runs do not write
+    into the same event actions.
+    """
+
+    def __init__(self, agent: BaseAgent, concurrency: int = 4, timeout: float = 600.0, max_report_chars: int = 2000):
+        self.agent_tool = AgentTool(agent=agent)
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_report_chars = max_report_chars
+        self._sync_prices = offload(price_store.sync, timeout=timeout)
+
+    async def analyze_holdings(self, tickers: list[str], tool_context: ToolContext) -> dict:
+        """
+        Runs a comprehensive (fundamental, technical and news) analysis of several holdings
+        in parallel. Use this instead of analyzing holdings one by one.
+
+        Args:
+            tickers (list[str]): The yfinance ticker symbols of the holdings to analyze
+                (e.g., ["005930.KS", "AAPL"]).
+
+        Returns:
+            dict: "reports" maps each analyzed ticker to the summary of its report, "truncated"
+                  lists the tickers whose report was cut (the full report is available from
+                  `SingleAssetAnalyzer`), "failed" maps tickers whose analysis failed to the
+                  reason, and "elapsed_seconds" is the total time taken.
+        """
+        started = time.monotonic()
+        tickers = list(dict.fromkeys(t.strip() for t in tickers if t and t.strip()))
+        if not tickers:
+            return {"error": "No tickers were given."}
+
+        # Warm the shared daily histories with a single download for all holdings,
+        # covering the longest period the indicator and risk tools read.
+        try:
+            await self._sync_prices(tickers, period=ohlcv_cache.min_daily_period or "1y")
+        except Exception as e:
+            logger.warning(f"Failed to warm price histories: {e}")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        completed = 0
+
+        async def analyze(ticker: str) -> tuple[str, str | None, str | None]:
+            nonlocal completed
+            async with semaphore:
+                child = ToolContext(tool_context._invocation_context, function_call_id=tool_context.function_call_id)
+                try:
+                    report = await asyncio.wait_for(
+                        self.agent_tool.run_async(args={"request": ticker}, tool_context=child),
+                        timeout=self.timeout,
+                    )
+                    error = None if report else "The analysis returned no report."
+                    _merge_actions(tool_context, child)
+                except asyncio.TimeoutError:
+                    report, error = None, f"Timed out after {self.timeout} seconds."
+                except Exception as e:
+                    logger.error(f"Analysis of {ticker} failed: {e}")
+                    report, error = None, str(e)
+            completed += 1
+            if report:
+                headline, _ = _summary(str(report), 300)
+                await report_progress(f"[{completed}/{len(tickers)}] *{ticker}*\n{headline}")
+            else:
+                await report_progress(f"[{completed}/{len(tickers)}] *{ticker}*: analysis failed ({error})")
+            return ticker, report, error
+
+        results = await asyncio.gather(*(analyze(ticker) for ticker in tickers))
+        elapsed = round(time.monotonic() - started, 1)
+        logger.info(f"Analyzed {len(tickers)} holdings in {elapsed}s")
+        summaries = {t: _summary(str(r), self.max_report_chars) for t, r, _ in results if r}
+        return {
+            "reports": {t: text for t, (text, _) in summaries.items()},
+            "truncated": [t for t, (_, cut) in summaries.items() if cut],
+            "failed": {t: e for t, r, e in results if not r},
+            "elapsed_seconds": elapsed,
+        }
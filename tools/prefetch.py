@@ -0,0 +1,199 @@
+"""
+Deterministic prefetch of everything a single-asset analysis needs.
+
+As soon as a ticker is resolved, all data sources are fetched concurrently on
+the tool worker pool, instead of one tool call per LLM round trip. The results
+are kept in memory per ticker; the specialist agents read them with
+`get_fundamental_snapshot` and `get_technical_snapshot`, and the individual
+fetch tools hit warm caches afterwards.
+"""
+import os
+import time
+import asyncio
+import logging
+
+from google.adk.agents.callback_context import CallbackContext
+
+from tools.executor import offload
+from tools.fa_cache import fa_cache
+from tools.fa import (
+    get_company_info,
+    get_financial_summary,
+    get_advanced_financial_metrics,
+    get_analyst_recommendations,
+)
+from tools.ta import get_indicator_bundle, get_risk_metrics
+from tools.na import get_company_news
+from tools.market_session import find_tickers
+from tools.tickers import remember_resolved_ticker, requested_ticker
+
+logger = logging.getLogger("jm.tools.prefetch")
+
+# Raw yfinance data shared by several fa tools; fetched first so that the tools
+# below do not download the same statement concurrently.
+RAW_KINDS = (
+    "info",
+    "income_stmt",
+    "balance_sheet",
+    "cashflow",
+    "quarterly_income_stmt",
+    "quarterly_balance_sheet",
+    "quarterly_cashflow",
+)
+
+FUNDAMENTAL_SOURCES = {
+    "company_info": get_company_info,
+    "financial_summary": get_financial_summary,
+    "advanced_metrics": get_advanced_financial_metrics,
+    "analyst_recommendations": get_analyst_recommendations,
+}
+
+# Sources that do not depend on the fundamentals cache
+INDEPENDENT_SOURCES = {
+    "indicators": get_indicator_bundle,
+    "risk_metrics": get_risk_metrics,
+    "news": get_company_news,
+}
+
+TECHNICAL_KEYS = ("indicators", "risk_metrics")
+
+
+class TickerPrefetcher:
+    """
+    Runs and remembers one prefetch per ticker.
+
+    A prefetch is a task on the running event loop; callers that arrive while it
+    is in flight await the same task. Results are reused for `ttl` seconds.
+    """
+
+    def __init__(self, ttl: int = 600, timeout: float = 60.0):
+        self.ttl = ttl
+        self.timeout = timeout
+        self._entries: dict[str, tuple[float, asyncio.Task]] = {}
+        self._raw = offload(fa_cache.get, timeout=timeout)
+        self._fundamentals = {key: offload(fn, timeout=timeout) for key, fn in FUNDAMENTAL_SOURCES.items()}
+        self._independent = {key: offload(fn, timeout=timeout) for key, fn in INDEPENDENT_SOURCES.items()}
+
+    async def _fetch_fundamentals(self, ticker: str) -> dict:
+        await asyncio.gather(*(self._raw(kind, ticker) for kind in RAW_KINDS), return_exceptions=True)
+        results = await asyncio.gather(*(fn(ticker) for fn in self._fundamentals.values()), return_exceptions=True)
+        return dict(zip(self._fundamentals, results))
+
+    async def _fetch(self, ticker: str) -> dict:
+        started = time.monotonic()
+        fundamentals, *independent = await asyncio.gather(
+            self._fetch_fundamentals(ticker),
+            *(fn(ticker) for fn in self._independent.values()),
+            return_exceptions=True,
+        )
+        if isinstance(fundamentals, Exception):
+            fundamentals = {key: fundamentals for key in self._fundamentals}
+        snapshot = {**fundamentals, **dict(zip(self._independent, independent))}
+        for key, value in snapshot.items():
+            if isinstance(value, Exception):
+                snapshot[key] = {"error": f"Failed to fetch {key}: {value}"}
+        logger.info(f"Prefetched {ticker} in {time.monotonic() - started:.2f}s")
+        return snapshot
+
+    @staticmethod
+    def _reusable(task: asyncio.Task) -> bool:
+        if not task.done():
+            return True
+        if task.cancelled() or task.exception() is not None:
+            return False
+        # Do not keep serving a snapshot in which some source failed
+        return not any(isinstance(v, dict) and "error" in v for v in task.result().values())
+
+    def start(self, ticker: str) -> asyncio.Task:
+        """Starts prefetching a ticker on the running loop, unless a fresh prefetch exists."""
+        loop = asyncio.get_running_loop()
+        entry = self._entries.get(ticker)
+        if entry is not None:
+            created_at, task = entry
+            if time.monotonic() - created_at < self.ttl and task.get_loop() is loop and self._reusable(task):
+                return task
+        task = loop.create_task(self._fetch(ticker))
+        self._entries[ticker] = (time.monotonic(), task)
+        # Drop expired entries so that the map does not grow with every ticker ever asked
+        for key, (created_at, _) in list(self._entries.items()):
+            if time.monotonic() - created_at >= self.ttl:
+                del self._entries[key]
+        return task
+
+    async def get(self, ticker: str) -> dict:
+        """Returns the prefetched data of a ticker, fetching it now if needed."""
+        return await asyncio.shield(self.start(ticker))
+
+
+# Global prefetcher shared across users
+ticker_prefetcher = TickerPrefetcher(
+    ttl=int(os.environ.get("PREFETCH_TTL", "600")),
+    timeout=float(os.environ.get("PREFETCH_TIMEOUT", "60")),
+)
+
+
+async def get_fundamental_snapshot(ticker: str) -> dict:
+    """
+    Retrieves all fundamental data of a ticker in one call: company information and
+    business summary, financial summary, advanced financial metrics (ROIC, FCF,
+    Altman Z-Score, Piotroski F-Score, ...), analyst recommendations and recent news.
+    Call this first; the detailed statement tools are only needed for line items
+    not covered here.
+
+    Args:
+        ticker (str): The stock ticker symbol.
+
+    Returns:
+        dict: One entry per data source. An entry holding an "error" key failed to load.
+    """
+    snapshot = await ticker_prefetcher.get(ticker)
+    return {key: value for key, value in snapshot.items() if key not in TECHNICAL_KEYS}
+
+
+async def get_technical_snapshot(ticker: str) -> dict:
+    """
+    Retrieves all technical data of a ticker in one call: the default indicator bundle
+    (close price, RSI, MACD, Bollinger Bands, OBV, Stochastic and the 20/50/200-day SMA)
+    and the risk metrics (Volatility, MDD, Beta, Sharpe and Sortino ratios).
+
+    Args:
+        ticker (str): The stock ticker symbol.
+
+    Returns:
+        dict: "indicators" and "risk_metrics". An entry holding an "error" key failed to load.
+    """
+    snapshot = await ticker_prefetcher.get(ticker)
+    return {key: snapshot[key] for key in TECHNICAL_KEYS}
+
+
+async def prefetch_resolved_ticker(callback_context: CallbackContext) -> None:
+    """
+    after_agent_callback of TickerLookupAgent: remembers the ticker it resolved in the
+    session state, where the report cache and later prefetches look it up, and starts
+    prefetching it.
+    """
+    for event in reversed(callback_context.session.events):
+        if event.invocation_id != callback_context.invocation_id:
+            break
+        if event.author == callback_context.agent_name and event.is_final_response() and event.content and event.content.parts:
+            # The agent answers with the ticker alone, so its one symbol-shaped token is the ticker
+            tickers = find_tickers("".join(part.text for part in event.content.parts if part.text))
+            if len(tickers) == 1:
+                remember_resolved_ticker(callback_context.state, tickers[0])
+                ticker_prefetcher.start(tickers[0])
+            break
+    return None
+
+
+async def prefetch_requested_ticker(callback_context: CallbackContext) -> None:
+    """
+    before_agent_callback: starts prefetching the ticker named in the agent's request,
+    so that its sub-agents find the data ready.
+    """
+    content = callback_context.user_content
+    if content and content.parts:
+        text = " ".join(part.text for part in content.parts if part.text)
+        ticker = await asyncio.to_thread(requested_ticker, text, callback_context.state)
+        if ticker:
+            ticker_prefetcher.start(ticker)
+    return None
@@ -0,0 +1,314 @@
+"""
+Persistent on-disk store for daily price histories.
+
+Bars are kept in SQLite on the `db/` volume, partitioned by ticker through the
+primary key. Reads are served from disk; only the bars missing since the last
+stored date are downloaded from Yahoo Finance. A ticker whose stored history
+starts at its listing serves any longer period from disk, and a ticker Yahoo
+returned nothing for is not asked again until the refresh interval has passed.
+"""
+import os
+import logging
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import pandas as pd
+import yfinance as yf
+from pandas import DataFrame
+
+from tools.market_session import market_for_ticker, is_market_open, last_session_close
+from tools.ohlcv_cache import PERIOD_OFFSETS
+
+logger = logging.getLogger("jm.tools.price_store")
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ohlcv (
+    ticker TEXT NOT NULL,
+    auto_adjust INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume REAL,
+    PRIMARY KEY (ticker, auto_adjust, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sync_state (
+    ticker TEXT NOT NULL,
+    auto_adjust INTEGER NOT NULL,
+    first_date TEXT,
+    last_date TEXT,
+    synced_at TEXT NOT NULL,
+    complete INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (ticker, auto_adjust)
+);
+"""
+
+# A full download starting this long after the requested start means the provider has no earlier bars
+LISTING_SLACK = timedelta(days=5)
+
+
+def period_start(period: str, today: Optional[date] = None) -> Optional[date]:
+    """Returns the first calendar date covered by a yfinance period string, or None for "max"."""
+    today = today or date.today()
+    if period == "max":
+        return None
+    if period == "ytd":
+        return today.replace(month=1, day=1)
+    offset = PERIOD_OFFSETS.get(period)
+    if offset is None:
+        return None
+    return (pd.Timestamp(today) - offset).date()
+
+
+def _split_download(df: DataFrame, tickers: list[str]) -> dict[str, DataFrame]:
+    """Splits a (possibly multi-ticker) yf.download result into one flat frame per ticker."""
+    frames = {}
+    if df is None or df.empty:
+        return frames
+    if isinstance(df.columns, pd.MultiIndex):
+        available = df.columns.get_level_values(1)
+        for ticker in tickers:
+            if ticker in available:
+                frames[ticker] = df.xs(ticker, axis=1, level=1).dropna(how="all")
+    elif len(tickers) == 1:
+        frames[tickers[0]] = df.dropna(how="all")
+    return frames
+
+
+class PriceStore:
+    """
+    Daily OHLCV bars persisted in SQLite with incremental appends.
+
+    The last few stored bars are always re-downloaded when syncing, since the
+    latest bar may have been partial. If a re-downloaded, completed bar no longer
+    matches the stored one (e.g. a split or dividend changed the adjusted prices),
+    the ticker's history is reloaded in full.
+
+    `sync_state.complete` marks a history that starts at the ticker's first bar
+    (a "max" download, or a full download that began later than requested), so
+    it covers any earlier start. A row without dates records a download that
+    returned nothing.
+    """
+
+    def __init__(self, db_path: str = "db/market_data.db", refresh_interval: int = 300, overlap_days: int = 7):
+        self.db_path = db_path
+        self.refresh_interval = refresh_interval
+        self.overlap_days = overlap_days
+        self._write_lock = threading.Lock()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            # Tools call in from several worker threads; only the first creates the schema
+            with self._init_lock:
+                if not self._initialized:
+                    os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+                    with closing(sqlite3.connect(self.db_path, timeout=30)) as conn:
+                        conn.execute("PRAGMA journal_mode=WAL")
+                        conn.executescript(SCHEMA)
+                    self._initialized = True
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _sync_state(self, conn, ticker: str, auto_adjust: bool) -> Optional[tuple]:
+        return conn.execute(
+            "SELECT first_date, last_date, synced_at, complete FROM sync_state WHERE ticker = ? AND auto_adjust = ?",
+            (ticker, int(auto_adjust)),
+        ).fetchone()
+
+    def _is_fresh(self, ticker: str, synced_at: str, max_age: Optional[float] = None) -> bool:
+        market = market_for_ticker(ticker)
+        synced = datetime.fromisoformat(synced_at)
+        now = datetime.now().astimezone()
+        if is_market_open(market, now):
+            return (now - synced).total_seconds() < (self.refresh_interval if max_age is None else max_age)
+        return synced >= last_session_close(market, now)
+
+    def _plan(self, conn, ticker: str, start: Optional[date], auto_adjust: bool, max_age: Optional[float] = None) -> Optional[str]:
+        """Returns "full", "incremental" or None if the stored bars already cover the request."""
+        state = self._sync_state(conn, ticker, auto_adjust)
+        if state is None:
+            return "full"
+        first_date, _, synced_at, complete = state
+        if first_date is None:
+            # The last download returned nothing; ask again once the refresh interval has passed
+            synced = datetime.fromisoformat(synced_at)
+            age = (datetime.now().astimezone() - synced).total_seconds()
+            return None if age < self.refresh_interval else "full"
+        # Allow a few days of slack for weekends and holidays at the start of the range
+        covered = complete or (start is not None and date.fromisoformat(first_date) <= start + LISTING_SLACK)
+        if not covered:
+            return "full"
+        if not self._is_fresh(ticker, synced_at, max_age):
+            return "incremental"
+        return None
+
+    def _write(self, conn, ticker: str, df: DataFrame, auto_adjust: bool, replace: bool, complete: Optional[bool] = None):
+        """Stores the bars of `df`. `complete` None keeps the stored completeness flag."""
+        rows = [
+            (ticker, int(auto_adjust), ts.strftime("%Y-%m-%d"),
+             *(None if pd.isna(row.get(col)) else float(row.get(col)) for col in COLUMNS))
+            for ts, row in df.iterrows()
+        ]
+        if not rows:
+            return
+        with self._write_lock, conn:
+            if complete is None:
+                state = self._sync_state(conn, ticker, auto_adjust)
+                complete = bool(state and state[3])
+            if replace:
+                conn.execute("DELETE FROM ohlcv WHERE ticker = ? AND auto_adjust = ?", (ticker, int(auto_adjust)))
+            conn.executemany("INSERT OR REPLACE INTO ohlcv VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            first, last = conn.execute(
+                "SELECT MIN(date), MAX(date) FROM ohlcv WHERE ticker = ? AND auto_adjust = ?",
+                (ticker, int(auto_adjust)),
+            ).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?, ?, ?)",
+                (ticker, int(auto_adjust), first, last, datetime.now().astimezone().isoformat(), int(complete)),
+            )
+
+    def _mark_empty(self, conn, ticker: str, auto_adjust: bool):
+        """Records that a download returned no bars for a ticker with nothing stored."""
+        with self._write_lock, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?, NULL, NULL, ?, 0)",
+                (ticker, int(auto_adjust), datetime.now().astimezone().isoformat()),
+            )
+
+    def _mark_synced(self, conn, ticker: str, auto_adjust: bool):
+        with self._write_lock, conn:
+            conn.execute(
+                "UPDATE sync_state SET synced_at = ? WHERE ticker = ? AND auto_adjust = ?",
+                (datetime.now().astimezone().isoformat(), ticker, int(auto_adjust)),
+            )
+
+    def _is_consistent(self, conn, ticker: str, df: DataFrame, auto_adjust: bool) -> bool:
+        """Checks that the oldest re-downloaded bar still matches the stored one."""
+        if df.empty:
+            return True
+        first = df.index[0].strftime("%Y-%m-%d")
+        stored = conn.execute(
+            "SELECT close FROM ohlcv WHERE ticker = ? AND auto_adjust = ? AND date = ?",
+            (ticker, int(auto_adjust), first),
+        ).fetchone()
+        new_close = df["Close"].iloc[0]
+        if stored is None or stored[0] is None or pd.isna(new_close):
+            return True
+        return abs(stored[0] - new_close) <= 1e-4 * max(abs(stored[0]), 1.0)
+
+    def sync(self, tickers: list[str], period: str = "1y", auto_adjust: bool = True, max_age: Optional[float] = None):
+        """
+        Makes sure the store covers `period` for every ticker and is up to date.
+        Missing tickers are fetched in one download, stale ones in one incremental download.
+        While a ticker's market is open its bars are stale after `max_age` seconds
+        (the refresh interval by default).
+        """
+        start = period_start(period)
+        with closing(self._connect()) as conn:
+            plans = {ticker: self._plan(conn, ticker, start, auto_adjust, max_age) for ticker in dict.fromkeys(tickers)}
+            full = [t for t, plan in plans.items() if plan == "full"]
+            incremental = [t for t, plan in plans.items() if plan == "incremental"]
+
+            if incremental:
+                last_dates = [date.fromisoformat(self._sync_state(conn, t, auto_adjust)[1]) for t in incremental]
+                fetch_start = min(last_dates) - timedelta(days=self.overlap_days)
+                logger.debug(f"Incremental price sync for {incremental} since {fetch_start}")
+                frames = _split_download(
+                    yf.download(incremental, start=fetch_start.isoformat(), interval="1d", auto_adjust=auto_adjust, progress=False),
+                    incremental,
+                )
+                for ticker in incremental:
+                    df = frames.get(ticker)
+                    if df is None:
+                        self._mark_synced(conn, ticker, auto_adjust)
+                    elif self._is_consistent(conn, ticker, df, auto_adjust):
+                        self._write(conn, ticker, df, auto_adjust, replace=False)
+                    else:
+                        logger.info(f"Adjusted prices changed for {ticker}; reloading full history.")
+                        full.append(ticker)
+
+            if full:
+                # Always keep at least the covered range of a reloaded ticker
+                fetch_period = period if start is not None else "max"
+                for ticker in full:
+                    state = self._sync_state(conn, ticker, auto_adjust)
+                    if state and state[0] and start is not None and date.fromisoformat(state[0]) < start:
+                        fetch_period = "max"
+                fetch_start = period_start(fetch_period)
+                logger.debug(f"Full price sync for {full} ({fetch_period})")
+                frames = _split_download(
+                    yf.download(full, period=fetch_period, interval="1d", auto_adjust=auto_adjust, progress=False),
+                    full,
+                )
+                for ticker in full:
+                    df = frames.get(ticker)
+                    if df is None or df.empty:
+                        if self._sync_state(conn, ticker, auto_adjust) is None:
+                            self._mark_empty(conn, ticker, auto_adjust)
+                        else:
+                            self._mark_synced(conn, ticker, auto_adjust)
+                        continue
+                    # A history that begins after the requested start is the whole history
+                    complete = fetch_start is None or df.index[0].date() > fetch_start + LISTING_SLACK
+                    self._write(conn, ticker, df, auto_adjust, replace=True, complete=complete)
+
+    def _read(self, conn, ticker: str, start: Optional[date], auto_adjust: bool) -> DataFrame:
+        query = "SELECT date, open, high, low, close, volume FROM ohlcv WHERE ticker = ? AND auto_adjust = ?"
+        params = [ticker, int(auto_adjust)]
+        if start is not None:
+            query += " AND date >= ?"
+            params.append(start.isoformat())
+        rows = conn.execute(query + " ORDER BY date", params).fetchall()
+        df = DataFrame(rows, columns=["Date"] + COLUMNS)
+        df.index = pd.DatetimeIndex(pd.to_datetime(df.pop("Date")), name="Date")
+        return df
+
+    def known_tickers(self, tickers: list[str], auto_adjust: bool = True) -> set[str]:
+        """Returns the tickers among `tickers` whose price history is stored, i.e. real symbols."""
+        if not tickers:
+            return set()
+        placeholders = ", ".join("?" for _ in tickers)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT ticker FROM sync_state WHERE auto_adjust = ? AND first_date IS NOT NULL AND ticker IN ({placeholders})",
+                (int(auto_adjust), *tickers),
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def get_history(self, ticker: str, period: str = "1y", auto_adjust: bool = True) -> DataFrame:
+        """
+        Returns the daily OHLCV history of a ticker from disk, syncing it first if needed.
+
+        Returns:
+            DataFrame: Columns Open, High, Low, Close, Volume, ordered from oldest to newest.
+        """
+        self.sync([ticker], period=period, auto_adjust=auto_adjust)
+        with closing(self._connect()) as conn:
+            return self._read(conn, ticker, period_start(period), auto_adjust)
+
+    def get_closes(self, tickers: list[str], period: str = "1y", auto_adjust: bool = True,
+                   max_age: Optional[float] = None) -> DataFrame:
+        """
+        Returns a panel of daily close prices with one column per ticker.
+        Tickers without any stored data are left out. `max_age` is passed to `sync`.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        self.sync(tickers, period=period, auto_adjust=auto_adjust, max_age=max_age)
+        start = period_start(period)
+        closes = {}
+        with closing(self._connect()) as conn:
+            for ticker in tickers:
+                df = self._read(conn, ticker, start, auto_adjust)
+                if not df.empty:
+                    closes[ticker] = df["Close"]
+        return DataFrame(closes)
+
+
+# Global instance on the persistent db volume
+price_store = PriceStore(
+    db_path=os.environ.get("PRICE_STORE_PATH", "db/market_data.db"),
+    refresh_interval=int(os.environ.get("PRICE_STORE_REFRESH_INTERVAL", "300")),
+)
@@ -0,0 +1,209 @@
+"""
+Cache of the reports produced by the SingleAssetAnalyzer agent.
+
+A report is keyed by ticker, report language and market session date, so a
+popular ticker is analyzed once per session instead of once per question.
+Entries expire after a TTL, or earlier when the price has moved notably since
+the report was written. Including a refresh token such as "[refresh]" in the
+request bypasses the cache.
+"""
+import os
+import re
+import time
+import asyncio
+import logging
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Any, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
+
+from apis.tracing import record_cache
+from tools.market_session import market_for_ticker, session_date
+from tools.price_store import price_store
+from tools.tickers import requested_ticker
+
+logger = logging.getLogger("jm.tools.report_cache")
+
+DEFAULT_LANGUAGE = "ko"
+
+LANGUAGE_PATTERN = re.compile(r"\[lang=([a-z]{2})\]", re.IGNORECASE)
+REFRESH_PATTERN = re.compile(r"\[refresh\]|--refresh|force[_ ]refresh", re.IGNORECASE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    ticker TEXT NOT NULL,
+    language TEXT NOT NULL,
+    session_date TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    reference_price REAL,
+    report TEXT NOT NULL,
+    PRIMARY KEY (ticker, language, session_date)
+);
+"""
+
+
+def parse_report_request(request: str, state: Any = None) -> Optional[dict]:
+    """
+    Extracts the cache key parts from a SingleAssetAnalyzer request. The ticker is
+    the one the session resolved, when the request names it (see tools/tickers.py).
+
+    Returns None when the request does not name exactly one ticker, in which case
+    it is not cacheable.
+    """
+    ticker = requested_ticker(LANGUAGE_PATTERN.sub(" ", request), state)
+    if ticker is None:
+        return None
+    language = LANGUAGE_PATTERN.search(request)
+    return {
+        "ticker": ticker,
+        "language": language.group(1).lower() if language else DEFAULT_LANGUAGE,
+        "force_refresh": bool(REFRESH_PATTERN.search(request)),
+    }
+
+
+def _last_price(ticker: str) -> Optional[float]:
+    try:
+        closes = price_store.get_closes([ticker], period="5d")
+    except Exception as e:
+        logger.warning(f"Could not fetch the price of {ticker}: {e}")
+        return None
+    if ticker not in closes or closes[ticker].dropna().empty:
+        return None
+    return float(closes[ticker].dropna().iloc[-1])
+
+
+class ReportCache:
+    """
+    SQLite-backed store of single-asset reports on the `db/` volume.
+
+    - Entries belong to the market session date of their ticker and expire after `ttl` seconds.
+    - An entry is dropped when the price has moved by more than `max_price_move`
+      (as a fraction) since it was written.
+    """
+
+    def __init__(self, db_path: str = "db/report_cache.db", ttl: int = 3600, max_price_move: float = 0.03):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_price_move = max_price_move
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "price_moves": 0, "forced": 0, "stored": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._initialized = True
+        return conn
+
+    @staticmethod
+    def _session(ticker: str) -> str:
+        return session_date(market_for_ticker(ticker)).isoformat()
+
+    def get(self, ticker: str, language: str = DEFAULT_LANGUAGE, force_refresh: bool = False) -> Optional[str]:
+        """Returns the cached report if it is fresh and the price has not moved notably."""
+        if force_refresh:
+            self._stats["forced"] += 1
+            return None
+        key = (ticker, language, self._session(ticker))
+        with self._lock, closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT created_at, reference_price, report FROM reports "
+                "WHERE ticker = ? AND language = ? AND session_date = ?", key
+            ).fetchone()
+        if row is None:
+            self._stats["misses"] += 1
+            return None
+        created_at, reference_price, report = row
+        if time.time() - created_at >= self.ttl:
+            self._stats["expired"] += 1
+            self.invalidate(ticker)
+            return None
+        if reference_price:
+            price = _last_price(ticker)
+            if price is not None and abs(price / reference_price - 1) > self.max_price_move:
+                logger.info(f"{ticker} moved {price / reference_price - 1:+.2%} since its report; invalidating.")
+                self._stats["price_moves"] += 1
+                self.invalidate(ticker)
+                return None
+        self._stats["hits"] += 1
+        return report
+
+    def put(self, ticker: str, language: str, report: str):
+        """Stores a report together with the price it was written at."""
+        price = _last_price(ticker)
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?, ?, ?)",
+                (ticker, language, self._session(ticker), time.time(), price, report),
+            )
+        self._stats["stored"] += 1
+
+    def invalidate(self, ticker: Optional[str] = None):
+        """Drops every report, or only the reports of one ticker."""
+        with self._lock, closing(self._connect()) as conn, conn:
+            if ticker is None:
+                conn.execute("DELETE FROM reports")
+            else:
+                conn.execute("DELETE FROM reports WHERE ticker = ?", (ticker,))
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and the reasons entries were discarded."""
+        return dict(self._stats)
+
+
+# Global instance on the persistent db volume
+report_cache = ReportCache(
+    db_path=os.environ.get("REPORT_CACHE_PATH", "db/report_cache.db"),
+    ttl=int(os.environ.get("REPORT_CACHE_TTL", "3600")),
+    max_price_move=float(os.environ.get("REPORT_CACHE_MAX_PRICE_MOVE", "0.03")),
+)
+
+
+def _request_text(callback_context: CallbackContext) -> str:
+    content = callback_context.user_content
+    if not content or not content.parts:
+        return ""
+    return " ".join(part.text for part in content.parts if part.text)
+
+
+async def serve_cached_report(callback_context: CallbackContext) -> Optional[types.Content]:
+    """
+    before_agent_callback: answers with a cached report, which skips the sub-agents entirely.
+    """
+    request = await asyncio.to_thread(parse_report_request, _request_text(callback_context), callback_context.state)
+    if request is None:
+        return None
+    report = await asyncio.to_thread(
+        report_cache.get, request["ticker"], request["language"], request["force_refresh"]
+    )
+    record_cache("report_cache", hit=report is not None)
+    if report is None:
+        return None
+    logger.info(f"Serving cached report for {request['ticker']} ({request['language']})")
+    return types.Content(role="model", parts=[types.Part(text=report)])
+
+
+async def store_report(callback_context: CallbackContext) -> None:
+    """
+    after_agent_callback: caches the final report of the agent run.
+    """
+    request = await asyncio.to_thread(parse_report_request, _request_text(callback_context), callback_context.state)
+    if request is None:
+        return None
+    report = None
+    for event in reversed(callback_context.session.events):
+        if event.invocation_id != callback_context.invocation_id:
+            break
+        if event.author == callback_context.agent_name and event.is_final_response() and event.content and event.content.parts:
+            report = "".join(part.text for part in event.content.parts if part.text)
+            break
+    if report:
+        await asyncio.to_thread(report_cache.put, request["ticker"], request["language"], report)
+    return None
@@ -0,0 +1,193 @@
+"""
+Response shaping for data-heavy tools.
+
+Tool results are sent back to the model and stay in the session for every later
+turn, so whole DataFrames as nested dicts are costly. The helpers here turn them
+into compact columnar payloads (labels once, values as lists), round numbers,
+limit periods and rows, and `token_budget` truncates a result that is still over
+its tool's token budget, telling the model what was left out.
+"""
+import os
+import json
+import math
+import logging
+import functools
+from typing import Any, Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from apis.tracing import record_shaping
+
+logger = logging.getLogger("jm.tools.shaping")
+
+# Rough size of a token in characters of JSON, good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+DEFAULT_TOKEN_BUDGET = int(os.environ.get("TOOL_TOKEN_BUDGET", "2000"))
+
+def estimate_tokens(payload: Any) -> int:
+    """Estimates the number of tokens the payload takes once serialized for the model."""
+    return math.ceil(len(json.dumps(payload, default=str, ensure_ascii=False)) / CHARS_PER_TOKEN)
+
+
+def round_value(value: Any, digits: int = 4) -> Any:
+    """
+    Rounds a number to `digits` significant digits, or to a whole number when it is
+    larger than that. NaN and infinities become None; timestamps become dates.
+    """
+    if isinstance(value, (np.integer, np.floating, np.bool_)):
+        value = value.item()
+    if isinstance(value, float):
+        if math.isnan(value) or math.isinf(value):
+            return None
+        if abs(value) >= 10 ** digits:
+            return int(round(value))
+        return float(f"{value:.{digits}g}")
+    if value is pd.NaT or value is None:
+        return None
+    if hasattr(value, "strftime"):
+        return _label(value)
+    return value
+
+
+def _label(value: Any) -> str:
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m-%d")
+    return str(value)
+
+
+def select_rows(df: pd.DataFrame, line_items: Optional[list[str]]) -> pd.DataFrame:
+    """Keeps the rows whose label contains one of `line_items` (case-insensitive)."""
+    if not line_items:
+        return df
+    wanted = [item.lower() for item in line_items if item]
+    mask = [any(item in str(label).lower() for item in wanted) for label in df.index]
+    return df[mask]
+
+
+def statement_to_columnar(
+    df: pd.DataFrame,
+    line_items: Optional[list[str]] = None,
+    max_periods: Optional[int] = 4,
+    digits: int = 4,
+) -> dict:
+    """
+    Encodes a financial statement (line items x periods, newest period first) as
+    {"periods": [...], "line_items": {name: [value per period]}}.
+    """
+    df = select_rows(df, line_items)
+    if max_periods:
+        df = df.iloc[:, :max_periods]
+    df = df.dropna(how="all")
+    return {
+        "periods": [_label(column) for column in df.columns],
+        "line_items": {
+            str(label): [round_value(v, digits) for v in row]
+            for label, row in zip(df.index, df.to_numpy(dtype=object))
+        },
+    }
+
+
+def table_to_columnar(
+    df: pd.DataFrame,
+    max_rows: Optional[int] = None,
+    columns: Optional[list[str]] = None,
+    digits: int = 4,
+) -> dict:
+    """Encodes a table as {"columns": [...], "rows": [[...]]}, keeping a meaningful index as the first column."""
+    if columns:
+        df = df[[column for column in columns if column in df.columns]]
+    if max_rows:
+        df = df.head(max_rows)
+    names = [str(column) for column in df.columns]
+    values = df.to_numpy(dtype=object).tolist()
+    if not isinstance(df.index, pd.RangeIndex):
+        names = [str(df.index.name or "index")] + names
+        values = [[label] + row for label, row in zip(df.index, values)]
+    return {
+        "columns": names,
+        "rows": [[round_value(v, digits) for v in row] for row in values],
+    }
+
+
+def matrix_to_columnar(matrix: pd.DataFrame, decimals: int = 2) -> dict:
+    """
+    Encodes a square labelled matrix (e.g. correlations) as {"labels": [...], "matrix": [[...]]},
+    rounded to `decimals` decimal places.
+    """
+    values = np.round(matrix.to_numpy(dtype=float), decimals)
+    return {
+        "labels": [str(label) for label in matrix.columns],
+        "matrix": [[None if np.isnan(v) else float(v) for v in row] for row in values],
+    }
+
+
+def _fit_container(payload: dict, key: str, max_tokens: int) -> Optional[dict]:
+    container = payload[key]
+    items = list(container.items()) if isinstance(container, dict) else list(container)
+
+    hint = "Request fewer periods or specific line items to see them." if key == "line_items" else "Request fewer rows to see them."
+
+    def build(n: int) -> dict:
+        kept = dict(items[:n]) if isinstance(container, dict) else items[:n]
+        return {
+            **payload,
+            key: kept,
+            "truncated": {
+                "omitted": len(items) - n,
+                "note": f"{len(items) - n} of {len(items)} {key.replace('_', ' ')} were left out to save space. {hint}",
+            },
+        }
+
+    # Largest prefix that fits, by binary search
+    low, high = 0, len(items)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(build(middle)) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return build(low) if low else None
+
+
+def fit_budget(payload: Any, max_tokens: int) -> Any:
+    """
+    Returns the payload unchanged if it fits in `max_tokens`. Otherwise drops the
+    trailing line items or rows of a columnar payload until it fits, or, for any
+    other payload, cuts its JSON text.
+    """
+    if estimate_tokens(payload) <= max_tokens:
+        return payload
+    if isinstance(payload, dict):
+        for key in ("line_items", "rows"):
+            if payload.get(key):
+                fitted = _fit_container(payload, key, max_tokens)
+                if fitted is not None:
+                    return fitted
+    text = json.dumps(payload, default=str, ensure_ascii=False)
+    return {
+        "preview": text[:max_tokens * CHARS_PER_TOKEN],
+        "truncated": {"note": f"The result was cut from about {estimate_tokens(payload)} tokens to {max_tokens}."},
+    }
+
+
+def token_budget(max_tokens: Optional[int] = None) -> Callable:
+    """
+    Decorates a tool so that its result is cut down to at most `max_tokens` tokens
+    (TOOL_TOKEN_BUDGET by default). Error results and plain strings pass through.
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            result = fn(*args, **kwargs)
+            if not isinstance(result, (dict, list)) or (isinstance(result, dict) and "error" in result):
+                return result
+            limit = max_tokens or DEFAULT_TOKEN_BUDGET
+            shaped = fit_budget(result, limit)
+            record_shaping(estimate_tokens(shaped), truncated=shaped is not result)
+            if shaped is not result:
+                logger.info(f"{fn.__name__} result truncated to {limit} tokens")
+            return shaped
+        return wrapper
+    return decorator
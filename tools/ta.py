@@ -4,22 +4,24 @@ import yfinance as yf
 import pandas as pd
 import numpy as np
 from tools.fa import replace_nan_with_none
+from tools.ohlcv_cache import ohlcv_cache
+from tools.price_store import price_store
 
-def get_ohlcv(ticker: str, period: str = "4mo") -> DataFrame:
+def get_ohlcv(ticker: str, period: str = "4mo", interval: str = "1d") -> DataFrame:
     """
     Get historical market data (OHLCV) for a given ticker.
+    Data is served from the process-wide OHLCV cache, so repeated calls within
+    one analysis download the history only once.
 
     Args:
         ticker (str): The stock ticker symbol.
         period (str): The period for which to download data (e.g., "1y", "6mo").
+        interval (str): The bar interval (e.g., "1d", "1h").
 
     Returns:
         DataFrame: A pandas DataFrame containing the OHLCV data. The data is ordered from oldest to newest.
     """
-    df = yf.download(ticker, period=period, auto_adjust=True)
-    if isinstance(df.columns, pd.MultiIndex):
-        df.columns = df.columns.droplevel(1)
-    return df
+    return ohlcv_cache.get(ticker, period=period, interval=interval, auto_adjust=True)
 
 
 def get_ohlcv_dict(ticker: str, limit: str = 30) -> DataFrame:
@@ -182,76 +184,241 @@ def get_stoch(ticker: str, k: int = 14, d: int = 3, smooth_k: int = 3, limit: in
     return stoch.tail(limit).to_dict('records')
 
 
-def get_risk_metrics(ticker: str) -> dict:
+# Indicator name -> (default parameters, output column names).
+# Parameters in a spec entry are appended with underscores, e.g. "sma_200" or "macd_12_26_9",
+# and parsed to the type of their default.
+INDICATOR_DEFAULTS = {
+    "close": ((), ["Close"]),
+    "volume": ((), ["Volume"]),
+    "rsi": ((14,), ["RSI"]),
+    "macd": ((12, 26, 9), ["MACD", "Histogram", "Signal"]),
+    "sma": ((20,), ["SMA"]),
+    "bbands": ((20, 2.0), ["BBL", "BBM", "BBU", "BBB", "BBP"]),
+    "obv": ((), ["OBV"]),
+    "stoch": ((14, 3, 3), ["STOCH_K", "STOCH_D", "STOCH_H"]),
+}
+
+DEFAULT_INDICATOR_SPEC = ["close", "rsi", "macd", "bbands", "obv", "stoch", "sma_20", "sma_50", "sma_200"]
+
+
+def _parse_indicator(entry: str) -> tuple[str, tuple]:
+    name, *params = entry.strip().lower().split("_")
+    if name not in INDICATOR_DEFAULTS:
+        raise ValueError(f"Unknown indicator '{entry}'. Available: {', '.join(INDICATOR_DEFAULTS)}")
+    defaults = INDICATOR_DEFAULTS[name][0]
+    if len(params) > len(defaults):
+        raise ValueError(f"Too many parameters for indicator '{entry}'.")
+    try:
+        values = tuple(type(defaults[i])(p) for i, p in enumerate(params)) + defaults[len(params):]
+    except ValueError:
+        raise ValueError(f"Invalid parameters for indicator '{entry}'.") from None
+    return name, values
+
+
+def _compute_indicator(df: DataFrame, name: str, params: tuple) -> DataFrame | None:
+    if name == "close":
+        return df[["Close"]]
+    if name == "volume":
+        return df[["Volume"]]
+    if name == "rsi":
+        result = df.ta.rsi(length=params[0])
+    elif name == "macd":
+        result = df.ta.macd(fast=params[0], slow=params[1], signal=params[2])
+    elif name == "sma":
+        result = df.ta.sma(length=params[0])
+    elif name == "bbands":
+        result = df.ta.bbands(length=params[0], std=params[1])
+    elif name == "obv":
+        result = df.ta.obv()
+    else:
+        result = df.ta.stoch(k=params[0], d=params[1], smooth_k=params[2])
+    if result is None:
+        return None
+    return result.to_frame() if isinstance(result, pd.Series) else result
+
+
+def get_indicator_bundle(ticker: str, spec: list[str] | None = None, limit: int = 30) -> dict:
     """
-    Calculates key risk and quantitative metrics for a given ticker.
-    Includes Volatility, MDD, Beta, Sharpe Ratio, and Sortino Ratio.
+    Calculate several technical indicators for a given ticker in a single call.
+    The price history is fetched once and every requested indicator is computed on it.
+    Prefer this tool over calling the individual indicator tools one by one.
+
+    Args:
+        ticker (str): The stock ticker symbol.
+        spec (list[str]): The indicators to compute. Supported names are "close", "volume",
+            "rsi", "macd", "sma", "bbands", "obv" and "stoch". Parameters may be appended with
+            underscores, e.g. "rsi_14", "sma_200", "macd_12_26_9", "bbands_20_2.5", "stoch_14_3_3".
+            Defaults to close price, RSI, MACD, Bollinger Bands, OBV, Stochastic and the 20/50/200-day SMA.
+        limit (int): The number of recent data points to return.
+
+    Returns:
+        dict: A columnar payload with the shared date index ("index") and one list of values per
+              indicator column ("columns"), ordered from oldest to newest. Columns of parameterized
+              indicators carry their parameters as suffix when they differ from the defaults
+              (e.g. "SMA_200"). Indicators that could not be computed are listed in "unavailable".
     """
     try:
-        # 1. Market Detection & Benchmark Selection
-        is_kr = ticker.endswith(('.KS', '.KQ'))
-        benchmark_ticker = "^KS11" if is_kr else "^GSPC"
-        
-        # 2. Risk-Free Rate Fetching
-        # Default fallback values
-        risk_free_rate = 0.035 if is_kr else 0.045
-        try:
-            tnx = yf.Ticker("^TNX")
-            tnx_info = tnx.info
-            current_tnx = tnx_info.get('regularMarketPrice') or tnx_info.get('previousClose')
-            if current_tnx:
-                risk_free_rate = current_tnx / 100.0
-        except:
-            pass # Keep defaults
-
-        # 3. Fetch 1-year history
-        prices = yf.download([ticker, benchmark_ticker], period="1y", interval="1d", auto_adjust=True)['Close']
-        if prices.empty or ticker not in prices.columns or benchmark_ticker not in prices.columns:
-            return {"error": "Insufficient data to calculate risk metrics."}
-        
-        # 4. Return Calculations
-        returns = prices.pct_change().dropna()
-        stock_ret = returns[ticker]
-        mkt_ret = returns[benchmark_ticker]
-        
-        # Annualized metrics
-        ann_factor = 252
-        annual_vol = stock_ret.std() * np.sqrt(ann_factor)
-        
+        requested = [_parse_indicator(entry) for entry in (spec or DEFAULT_INDICATOR_SPEC)]
+    except ValueError as e:
+        return {"error": str(e)}
+
+    # Long moving averages need more history than the default 4 months.
+    longest = max((max(params) for _, params in requested if params), default=0)
+    period = "2y" if longest > 50 else "4mo"
+    df = get_ohlcv(ticker, period=period)
+    if df.empty:
+        return {"error": f"No price history found for {ticker}."}
+
+    columns = {}
+    unavailable = []
+    for name, params in requested:
+        defaults, labels = INDICATOR_DEFAULTS[name]
+        suffix = "" if params == defaults else "_" + "_".join(str(p) for p in params)
+        result = _compute_indicator(df, name, params)
+        if result is None or result.shape[1] != len(labels):
+            unavailable.append(name + suffix)
+            continue
+        for label, column in zip(labels, result.columns):
+            columns[label + suffix] = result[column].tail(limit).round(4).tolist()
+
+    index = df.index[-limit:]
+    return replace_nan_with_none({
+        "ticker": ticker,
+        "index": [ts.strftime("%Y-%m-%d") for ts in index],
+        "columns": columns,
+        "unavailable": unavailable,
+    })
+
+
+RISK_FREE_RATE_DEFAULTS = {"^KS11": 0.035, "^GSPC": 0.045}
+
+
+def _benchmark_for(ticker: str) -> str:
+    return "^KS11" if ticker.endswith(('.KS', '.KQ')) else "^GSPC"
+
+
+def _fetch_risk_free_rate() -> float | None:
+    """Fetches the current 10-year Treasury yield (^TNX) as a decimal, or None if unavailable."""
+    try:
+        tnx_info = yf.Ticker("^TNX").info
+        current_tnx = tnx_info.get('regularMarketPrice') or tnx_info.get('previousClose')
+        if current_tnx:
+            return current_tnx / 100.0
+    except Exception:
+        pass
+    return None
+
+
+def _compute_risk_metrics(prices: DataFrame, benchmark: pd.Series, risk_free_rate: float) -> dict:
+    """
+    Computes risk metrics for every column of `prices` against one benchmark at once.
+    Each column only uses the days on which both it and the benchmark have a return.
+    """
+    ann_factor = 252
+    stock_ret = prices.pct_change().to_numpy()[1:]
+    mkt_ret = benchmark.pct_change().to_numpy()[1:]
+    valid = ~np.isnan(stock_ret) & ~np.isnan(mkt_ret)[:, None]
+    n = valid.sum(axis=0)
+
+    r = np.where(valid, stock_ret, 0.0)
+    m = np.where(valid, mkt_ret[:, None], 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r_mean = r.sum(axis=0) / n
+        m_mean = m.sum(axis=0) / n
+        r_dev = np.where(valid, r - r_mean, 0.0)
+        m_dev = np.where(valid, m - m_mean, 0.0)
+        annual_vol = np.sqrt((r_dev ** 2).sum(axis=0) / (n - 1)) * np.sqrt(ann_factor)
+
+        # Beta = Cov(stock, market) / Var(market)
+        covariance = (r_dev * m_dev).sum(axis=0) / (n - 1)
+        market_variance = (m_dev ** 2).sum(axis=0) / (n - 1)
+        beta = np.where(market_variance != 0, covariance / market_variance, 1.0)
+
+        # Sortino uses the standard deviation of negative returns only
+        down = valid & (stock_ret < 0)
+        n_down = down.sum(axis=0)
+        d = np.where(down, stock_ret, 0.0)
+        d_dev = np.where(down, d - d.sum(axis=0) / n_down, 0.0)
+        downside_std = np.sqrt((d_dev ** 2).sum(axis=0) / (n_down - 1)) * np.sqrt(ann_factor)
+
+    # Max Drawdown on the cumulative return path
+    cum_returns = np.cumprod(1 + r, axis=0)
+    running_max = np.maximum.accumulate(cum_returns, axis=0)
+    mdd = ((cum_returns - running_max) / running_max).min(axis=0) if len(r) else np.full(prices.shape[1], np.nan)
+
+    results = {}
+    for i, ticker in enumerate(prices.columns):
+        series = prices[ticker].dropna()
+        if n[i] < 2 or len(series) < 2:
+            results[ticker] = {"error": "Insufficient data to calculate risk metrics."}
+            continue
         # CAGR (Cumulative Annual Growth Rate)
-        total_return = (prices[ticker].iloc[-1] / prices[ticker].iloc[0]) - 1
-        days = (prices.index[-1] - prices.index[0]).days
+        total_return = (series.iloc[-1] / series.iloc[0]) - 1
+        days = (series.index[-1] - series.index[0]).days
         cagr = (1 + total_return)**(365.25/days) - 1 if days > 0 else total_return
 
-        # 5. Beta Calculation
-        covariance = stock_ret.cov(mkt_ret)
-        market_variance = mkt_ret.var()
-        beta = covariance / market_variance if market_variance != 0 else 1.0
-        
-        # 6. Risk-Adjusted Returns
-        sharpe = (cagr - risk_free_rate) / annual_vol if annual_vol != 0 else 0
-        
-        # Sortino (Downside Deviation)
-        downside_rets = stock_ret[stock_ret < 0]
-        downside_std = downside_rets.std() * np.sqrt(ann_factor)
-        sortino = (cagr - risk_free_rate) / downside_std if downside_std != 0 else 0
-        
-        # 7. Max Drawdown (MDD)
-        cum_returns = (1 + stock_ret).cumprod()
-        running_max = cum_returns.cummax()
-        drawdown = (cum_returns - running_max) / running_max
-        mdd = drawdown.min()
-
-        return replace_nan_with_none({
+        vol = annual_vol[i]
+        sharpe = (cagr - risk_free_rate) / vol if vol != 0 else 0
+        sortino = (cagr - risk_free_rate) / downside_std[i] if downside_std[i] != 0 else 0
+        results[ticker] = replace_nan_with_none({
             "ticker": ticker,
-            "benchmark": benchmark_ticker,
+            "benchmark": benchmark.name,
             "risk_free_rate": round(risk_free_rate, 4),
-            "annualized_volatility": round(annual_vol, 4),
-            "cagr": round(cagr, 4),
-            "beta": round(beta, 4),
-            "sharpe_ratio": round(sharpe, 4),
-            "sortino_ratio": round(sortino, 4),
-            "max_drawdown": round(mdd, 4)
+            "annualized_volatility": round(float(vol), 4),
+            "cagr": round(float(cagr), 4),
+            "beta": round(float(beta[i]), 4),
+            "sharpe_ratio": round(float(sharpe), 4),
+            "sortino_ratio": round(float(sortino), 4),
+            "max_drawdown": round(float(mdd[i]), 4)
         })
-    except Exception as e:
-        return {"error": f"Failed to calculate risk metrics: {str(e)}"}
\ No newline at end of file
+    return results
+
+
+def get_risk_metrics_batch(tickers: list[str]) -> dict:
+    """
+    Calculates key risk and quantitative metrics for several tickers at once.
+    Includes Volatility, CAGR, MDD, Beta, Sharpe Ratio, and Sortino Ratio.
+    Tickers are grouped by benchmark (^KS11 for Korean stocks, ^GSPC otherwise) and each group
+    is synced from the local price store with a single download. Prefer this over calling `get_risk_metrics` per ticker.
+
+    Args:
+        tickers (list[str]): The stock ticker symbols.
+
+    Returns:
+        dict: A dictionary keyed by ticker. Each value holds that ticker's risk metrics,
+              or an "error" key if they could not be calculated.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return {}
+
+    groups: dict[str, list[str]] = {}
+    for ticker in tickers:
+        groups.setdefault(_benchmark_for(ticker), []).append(ticker)
+
+    # The risk-free rate is looked up once for the whole batch
+    fetched_rate = _fetch_risk_free_rate()
+
+    results = {}
+    for benchmark_ticker, members in groups.items():
+        risk_free_rate = fetched_rate if fetched_rate is not None else RISK_FREE_RATE_DEFAULTS[benchmark_ticker]
+        try:
+            prices = price_store.get_closes(members + [benchmark_ticker], period="1y")
+            if prices.empty or benchmark_ticker not in prices.columns:
+                raise ValueError("Insufficient data to calculate risk metrics.")
+            available = [t for t in members if t in prices.columns]
+            group_results = _compute_risk_metrics(prices[available], prices[benchmark_ticker], risk_free_rate)
+            for ticker in members:
+                results[ticker] = group_results.get(ticker, {"error": "Insufficient data to calculate risk metrics."})
+        except Exception as e:
+            for ticker in members:
+                results[ticker] = {"error": f"Failed to calculate risk metrics: {str(e)}"}
+    return {ticker: results[ticker] for ticker in tickers}
+
+
+def get_risk_metrics(ticker: str) -> dict:
+    """
+    Calculates key risk and quantitative metrics for a given ticker.
+    Includes Volatility, MDD, Beta, Sharpe Ratio, and Sortino Ratio.
+    """
+    return get_risk_metrics_batch([ticker])[ticker]
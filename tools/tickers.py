@@ -0,0 +1,55 @@
+"""
+Which ticker a request is about.
+
+Requests mix ticker symbols with ordinary capitalised words ("AI 관련 ETF 중
+TSLA", "NVIDIA ... NVDA"). A candidate found by `find_tickers` only counts when:
+
+- the TickerLookupAgent resolved it earlier in the session (kept in the session
+  state under `RESOLVED_TICKERS_KEY`), which takes precedence over the rules below,
+- its form cannot be an ordinary word (005930.KS, BRK-B),
+- it is the whole request, as when the root agent delegates with the resolved ticker, or
+- the price store already holds its history.
+"""
+import logging
+from typing import Any, Optional
+
+from tools.market_session import find_tickers, is_unambiguous_ticker
+from tools.price_store import price_store
+
+logger = logging.getLogger("jm.tools.tickers")
+
+RESOLVED_TICKERS_KEY = "resolved_tickers"
+# Resolved tickers remembered per session, newest last
+MAX_RESOLVED_TICKERS = 20
+
+
+def remember_resolved_ticker(state: Any, ticker: str):
+    """Records a ticker the TickerLookupAgent resolved in the session state."""
+    resolved = [t for t in (state.get(RESOLVED_TICKERS_KEY) or []) if t != ticker]
+    state[RESOLVED_TICKERS_KEY] = (resolved + [ticker])[-MAX_RESOLVED_TICKERS:]
+
+
+def requested_tickers(text: str, state: Any = None) -> list[str]:
+    """Returns the real ticker symbols named in `text`, in order of appearance."""
+    candidates = find_tickers(text)
+    if not candidates:
+        return []
+    resolved = set((state.get(RESOLVED_TICKERS_KEY) or []) if state is not None else [])
+    matches = [t for t in candidates if t in resolved]
+    if matches:
+        return matches
+    if candidates == [text.strip().rstrip(".")]:
+        return candidates
+    ambiguous = [t for t in candidates if not is_unambiguous_ticker(t)]
+    try:
+        known = price_store.known_tickers(ambiguous)
+    except Exception as e:
+        logger.warning(f"Could not look up stored tickers: {e}")
+        known = set()
+    return [t for t in candidates if is_unambiguous_ticker(t) or t in known]
+
+
+def requested_ticker(text: str, state: Any = None) -> Optional[str]:
+    """Returns the ticker `text` is about, or None when it names none or several."""
+    tickers = requested_tickers(text, state)
+    return tickers[0] if len(tickers) == 1 else None